@@ -1,12 +1,23 @@
 """The Goodwe inverter component."""
 
-from goodwe import Inverter, InverterError, connect
+import logging
+
+from goodwe import DT_FAMILY, ES_FAMILY, ET_FAMILY, Inverter, InverterError, connect
 from goodwe.const import GOODWE_TCP_PORT, GOODWE_UDP_PORT
 from homeassistant.const import CONF_HOST, CONF_PORT, CONF_PROTOCOL, CONF_SCAN_INTERVAL
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 
+from .cache import (
+    GoodweCacheStore,
+    cached_settings,
+    create_cache,
+    preferred_port,
+    record_port_success,
+)
 from .config_flow import GoodweFlowHandler
 from .const import (
     CONF_KEEP_ALIVE,
@@ -14,14 +25,26 @@ from .const import (
     CONF_MODEL_FAMILY,
     CONF_NETWORK_RETRIES,
     CONF_NETWORK_TIMEOUT,
+    CONF_WRITE_SETTLE_WINDOW,
     DEFAULT_MODBUS_ID,
     DEFAULT_NETWORK_RETRIES,
     DEFAULT_NETWORK_TIMEOUT,
+    DEFAULT_WRITE_SETTLE_WINDOW,
     DOMAIN,
     PLATFORMS,
+    SIGNAL_SETTINGS_UPDATED,
 )
+from .connection import InverterConnection, uses_tcp
 from .coordinator import GoodweConfigEntry, GoodweRuntimeData, GoodweUpdateCoordinator
+from .fleet import async_get_fleet
+from .inverters import async_get_inverter_index
+from .probe import async_probe_settings, entity_values, platform_probes
+from .schedule import InverterSchedule, async_remove_schedule
 from .services import async_setup_services, async_unload_services
+from .values import SensorValueStore
+from .writes import InverterWriteQueue
+
+_LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: GoodweConfigEntry) -> bool:
@@ -35,11 +58,24 @@ async def async_setup_entry(hass: HomeAssistant, entry: GoodweConfigEntry) -> bo
             CONF_PORT, GOODWE_TCP_PORT if protocol == "TCP" else GOODWE_UDP_PORT
         ),
     )
-    keep_alive = entry.options.get(CONF_KEEP_ALIVE, False)
+    keep_alive = entry.options.get(CONF_KEEP_ALIVE, protocol == "TCP")
     model_family = entry.options.get(CONF_MODEL_FAMILY, entry.data[CONF_MODEL_FAMILY])
     network_retries = entry.options.get(CONF_NETWORK_RETRIES, DEFAULT_NETWORK_RETRIES)
     network_timeout = entry.options.get(CONF_NETWORK_TIMEOUT, DEFAULT_NETWORK_TIMEOUT)
     modbus_id = entry.options.get(CONF_MODBUS_ID, DEFAULT_MODBUS_ID)
+    write_settle_window = entry.options.get(
+        CONF_WRITE_SETTLE_WINDOW, DEFAULT_WRITE_SETTLE_WINDOW
+    )
+
+    # Load the inverter capabilities known from previous runs
+    cache_store = GoodweCacheStore(hass, entry.unique_id or entry.entry_id)
+    cache = await cache_store.async_load()
+    port_scores = dict(cache.port_scores or {cache.port: 1}) if cache else {}
+    if cache and model_family not in (*ET_FAMILY, *ES_FAMILY, *DT_FAMILY):
+        # With a known family connect() reads just the device info (needed to
+        # validate the cache), the family detection runs only for entries
+        # without one (e.g. "none" set in options) - skip it using the cache
+        model_family = cache.family
 
     # Connect to Goodwe inverter
     try:
@@ -51,12 +87,20 @@ async def async_setup_entry(hass: HomeAssistant, entry: GoodweConfigEntry) -> bo
             timeout=network_timeout,
             retries=network_retries,
         )
-        inverter.set_keep_alive(keep_alive)
     except InverterError as err:
+        # Probe both ports, the one which worked most often first
         try:
-            inverter = await async_check_port(hass, entry, host)
+            inverter, port = await async_check_port(
+                hass,
+                entry,
+                host,
+                cache.family if cache else None,
+                preferred_port(port_scores),
+            )
         except InverterError:
             raise ConfigEntryNotReady from err
+    record_port_success(port_scores, port)
+    inverter.set_keep_alive(keep_alive)
 
     device_info = DeviceInfo(
         configuration_url="https://semsplus.goodwe.com/",
@@ -70,32 +114,164 @@ async def async_setup_entry(hass: HomeAssistant, entry: GoodweConfigEntry) -> bo
 
     # Create update coordinator
     coordinator = GoodweUpdateCoordinator(hass, entry, inverter)
+    await coordinator.values.async_load()
+
+    if keep_alive and uses_tcp(port):
+        # Single long-lived TCP session shared by all the inverter requests
+        connection = InverterConnection(hass, inverter, coordinator.scheduler)
+        connection.async_start()
+        entry.async_on_unload(connection.async_close)
 
     # Fetch initial data so we have data when entities subscribe
     await coordinator.async_config_entry_first_refresh()
 
+    # Probe the settings supported by the inverter once for all platforms
+    probe_settings, probe_readers = platform_probes()
+    probed = probe_settings | probe_readers.keys()
+    revalidate = bool(cache and cache.matches(inverter))
+    if revalidate:
+        # Start from the cached state, read only values which could not be cached
+        settings = cached_settings(cache)
+        unknown = {
+            key
+            for key in probed
+            if key not in cache.probed
+            or (key in cache.supported and key not in settings)
+        }
+        settings.update(
+            await async_probe_settings(
+                inverter,
+                probe_settings & unknown,
+                {k: r for k, r in probe_readers.items() if k in unknown},
+                coordinator.scheduler,
+            )
+        )
+    else:
+        failed: set[str] = set()
+        settings = await async_probe_settings(
+            inverter, probe_settings, probe_readers, coordinator.scheduler, failed
+        )
+        # Settings which could not be read are probed again on next start
+        await cache_store.async_save(
+            create_cache(inverter, port, probed - failed, settings, port_scores)
+        )
+
+    writes = InverterWriteQueue(
+        hass, inverter, coordinator.scheduler, write_settle_window
+    )
+    schedule = InverterSchedule(
+        hass,
+        entry.unique_id or entry.entry_id,
+        inverter,
+        coordinator.scheduler,
+        writes,
+        settings,
+    )
+    await schedule.async_load()
+
     entry.runtime_data = GoodweRuntimeData(
         inverter=inverter,
         coordinator=coordinator,
         device_info=device_info,
+        settings=settings,
+        writes=writes,
+        schedule=schedule,
     )
-
     hass.data[DOMAIN][entry.entry_id] = entry.runtime_data
+    # Index the inverter by its device, services resolve their targets by it
+    device = dr.async_get(hass).async_get_or_create(
+        config_entry_id=entry.entry_id, **device_info
+    )
+    entry.async_on_unload(
+        async_get_inverter_index(hass).async_add(device.id, entry.runtime_data)
+    )
 
     entry.async_on_unload(entry.add_update_listener(update_listener))
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    # Follow the time-of-use schedule (once the entities follow its writes)
+    schedule.async_start()
+    entry.async_on_unload(schedule.async_stop)
+
+    if revalidate:
+        # Cached settings might be outdated (e.g. after firmware update)
+        entry.async_create_background_task(
+            hass,
+            _async_revalidate_settings(
+                hass, entry, cache_store, port, port_scores, set(settings)
+            ),
+            f"{DOMAIN} {entry.title} settings revalidation",
+        )
+
     await async_setup_services(hass)
 
     return True
 
 
+async def _async_revalidate_settings(
+    hass: HomeAssistant,
+    entry: GoodweConfigEntry,
+    cache_store: GoodweCacheStore,
+    port: int,
+    port_scores: dict[int, int],
+    cached: set[str],
+) -> None:
+    """Re-probe the inverter settings and refresh the capabilities cache.
+
+    When the set of supported settings differs from the cached one,
+    the entry is reloaded to (re)create the proper entities, otherwise
+    the fresh values are pushed to the setting entities.
+    Settings which could not be read (e.g. timeout) keep their cached values,
+    only settings rejected by the inverter are considered unsupported.
+    """
+    inverter = entry.runtime_data.inverter
+    probe_settings, probe_readers = platform_probes()
+    failed: set[str] = set()
+    settings = await async_probe_settings(
+        inverter,
+        probe_settings,
+        probe_readers,
+        entry.runtime_data.coordinator.scheduler,
+        failed,
+    )
+    known = entry.runtime_data.settings
+    settings.update({key: known[key] for key in failed if key in known})
+    await cache_store.async_save(
+        create_cache(
+            inverter,
+            port,
+            (probe_settings | probe_readers.keys()) - (failed - settings.keys()),
+            settings,
+            port_scores,
+        )
+    )
+    known.update(settings)
+    if set(settings) != cached:
+        _LOGGER.debug("Inverter supported settings changed, reloading entry")
+        hass.config_entries.async_schedule_reload(entry.entry_id)
+        return
+    async_dispatcher_send(
+        hass,
+        SIGNAL_SETTINGS_UPDATED.format(inverter.serial_number),
+        entity_values(settings),
+    )
+
+
 async def async_check_port(
-    hass: HomeAssistant, entry: GoodweConfigEntry, host: str
-) -> Inverter:
-    """Check the communication port of the inverter, it may have changed after a firmware update."""
-    inverter, port = await GoodweFlowHandler.async_detect_inverter_port(host=host)
+    hass: HomeAssistant,
+    entry: GoodweConfigEntry,
+    host: str,
+    family: str | None = None,
+    port: int | None = None,
+) -> tuple[Inverter, int]:
+    """Check the communication port of the inverter, it may have changed after a firmware update.
+
+    Both ports are probed concurrently, the (preferred) port gets a head start.
+    """
+    inverter, port = await GoodweFlowHandler.async_detect_inverter_port(
+        host=host, family=family, preferred_port=port
+    )
     family = type(inverter).__name__
     hass.config_entries.async_update_entry(
         entry,
@@ -105,19 +281,24 @@ async def async_check_port(
             CONF_MODEL_FAMILY: family,
         },
     )
-    return inverter
+    return inverter, port
 
 
 async def async_unload_entry(
     hass: HomeAssistant, config_entry: GoodweConfigEntry
 ) -> bool:
     """Unload a config entry."""
+    # Do not lose the settings changes still waiting in the queue, the writes
+    # have to be sent before the entry background tasks (scheduler) are cancelled
+    await config_entry.runtime_data.writes.async_flush()
     unload_ok = await hass.config_entries.async_unload_platforms(
         config_entry, PLATFORMS
     )
 
     if unload_ok:
         hass.data[DOMAIN].pop(config_entry.entry_id)
+        # Persist the last known values before the entry is (re)loaded
+        await config_entry.runtime_data.coordinator.values.async_flush()
 
         if not hass.data[DOMAIN]:
             await async_unload_services(hass)
@@ -125,6 +306,17 @@ async def async_unload_entry(
     return unload_ok
 
 
+async def async_remove_entry(
+    hass: HomeAssistant, config_entry: GoodweConfigEntry
+) -> None:
+    """Remove the persisted inverter data (capabilities, values, schedule) of the entry."""
+    async_get_fleet(hass).async_release_sensors(config_entry)
+    key = config_entry.unique_id or config_entry.entry_id
+    await GoodweCacheStore(hass, key).async_remove()
+    await SensorValueStore(hass, key).async_remove()
+    await async_remove_schedule(hass, key)
+
+
 async def update_listener(hass: HomeAssistant, config_entry: GoodweConfigEntry) -> None:
     """Handle options update."""
     await hass.config_entries.async_reload(config_entry.entry_id)
@@ -171,4 +363,12 @@ async def async_migrate_entry(
         }
         hass.config_entries.async_update_entry(config_entry, data=new_data, version=2)
 
+    if config_entry.minor_version < 3:
+        # Keep-alive used to be off by default, keep it so for the existing entries
+        hass.config_entries.async_update_entry(
+            config_entry,
+            options={CONF_KEEP_ALIVE: False, **config_entry.options},
+            minor_version=3,
+        )
+
     return True
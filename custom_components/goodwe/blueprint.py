@@ -0,0 +1,40 @@
+"""Entity blueprints of the inverter models."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from goodwe import Inverter
+
+type _ModelKey = tuple[str, str | None, str | None, str | None]
+
+
+@dataclass(slots=True)
+class ModelBlueprint:
+    """Entity attributes shared by all the inverters of the same model and firmware.
+
+    The sensor entities blueprints (by sensor id) are added by the sensor platform.
+    """
+
+    sensors: dict[str, Any] = field(default_factory=dict)
+    setting_units: dict[str, str] = field(default_factory=dict)
+
+
+# Blueprints of the inverter models (computed once per model and firmware)
+_BLUEPRINTS: dict[_ModelKey, ModelBlueprint] = {}
+
+
+def model_blueprint(inverter: Inverter) -> ModelBlueprint:
+    """Answer the blueprint of the inverter model, create it if needed."""
+    key = (
+        type(inverter).__name__,
+        inverter.model_name,
+        inverter.firmware,
+        inverter.arm_firmware,
+    )
+    if (blueprint := _BLUEPRINTS.get(key)) is None:
+        blueprint = _BLUEPRINTS[key] = ModelBlueprint(
+            setting_units={s.id_: s.unit for s in inverter.settings()}
+        )
+    return blueprint
@@ -5,7 +5,7 @@ from dataclasses import dataclass
 from datetime import datetime
 import logging
 
-from goodwe import Inverter, InverterError
+from goodwe import Inverter
 from homeassistant.components.button import ButtonEntity, ButtonEntityDescription
 from homeassistant.const import EntityCategory
 from homeassistant.core import HomeAssistant
@@ -14,6 +14,7 @@ from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 
 from .const import DOMAIN
 from .coordinator import GoodweConfigEntry
+from .writes import InverterWriteQueue
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -57,21 +58,21 @@ async def async_setup_entry(
     """Set up the inverter button entities from a config entry."""
     inverter = config_entry.runtime_data.inverter
     device_info = config_entry.runtime_data.device_info
+    settings = config_entry.runtime_data.settings
 
     entities = []
 
     for description in BUTTONS:
-        try:
-            await inverter.read_setting(description.setting)
-        except (InverterError, ValueError):
+        if description.setting not in settings:
             # Inverter model does not support this feature
-            _LOGGER.debug("Could not read %s value", description.setting)
+            _LOGGER.debug("Inverter setting %s not supported", description.setting)
         else:
             entities.append(
                 GoodweButtonEntity(
                     device_info,
                     description,
                     inverter,
+                    config_entry.runtime_data.writes,
                 )
             )
 
@@ -90,13 +91,17 @@ class GoodweButtonEntity(ButtonEntity):
         device_info: DeviceInfo,
         description: GoodweButtonEntityDescription,
         inverter: Inverter,
+        writes: InverterWriteQueue,
     ) -> None:
         """Initialize the inverter operation mode setting entity."""
         self.entity_description = description
         self._attr_unique_id = f"{DOMAIN}-{description.key}-{inverter.serial_number}"
         self._attr_device_info = device_info
         self._inverter: Inverter = inverter
+        self._writes: InverterWriteQueue = writes
 
     async def async_press(self) -> None:
         """Triggers the button press service."""
-        await self.entity_description.action(self._inverter)
+        await self._writes.async_write(
+            self.entity_description.key, self.entity_description.action
+        )
@@ -0,0 +1,147 @@
+"""Persistent cache of the inverter capabilities and settings."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import logging
+from typing import Any
+
+from goodwe import Inverter
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# Only plain values (and lists of them) can be persisted, the rest is re-read
+_PLAIN_TYPES = (bool, int, float, str)
+# Max success score of the inverter communication port
+_MAX_PORT_SCORE = 10
+
+
+@dataclass
+class GoodweCache:
+    """Cached inverter capabilities and last known settings values."""
+
+    family: str
+    port: int
+    firmware: str | None
+    arm_firmware: str | None
+    probed: set[str] = field(default_factory=set)
+    supported: set[str] = field(default_factory=set)
+    values: dict[str, Any] = field(default_factory=dict)
+    port_scores: dict[int, int] = field(default_factory=dict)
+
+    def matches(self, inverter: Inverter) -> bool:
+        """Answer if the cache is (still) valid for the inverter firmware."""
+        return (
+            self.firmware == inverter.firmware
+            and self.arm_firmware == inverter.arm_firmware
+        )
+
+
+class GoodweCacheStore:
+    """Per inverter (serial number) store of the capabilities cache."""
+
+    def __init__(self, hass: HomeAssistant, serial_number: str) -> None:
+        """Initialize the store."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{serial_number}"
+        )
+
+    async def async_load(self) -> GoodweCache | None:
+        """Load the cache, answer None if there is none (yet)."""
+        data = await self._store.async_load()
+        if not data:
+            return None
+        try:
+            return GoodweCache(
+                family=data["family"],
+                port=data["port"],
+                firmware=data.get("firmware"),
+                arm_firmware=data.get("arm_firmware"),
+                probed=set(data.get("probed", ())),
+                supported=set(data.get("supported", ())),
+                values=data.get("values", {}),
+                port_scores={
+                    int(port): score
+                    for port, score in data.get("port_scores", {}).items()
+                },
+            )
+        except KeyError:
+            _LOGGER.debug("Ignoring invalid inverter cache %s", data)
+            return None
+
+    async def async_save(self, cache: GoodweCache) -> None:
+        """Persist the cache."""
+        await self._store.async_save(
+            {
+                "family": cache.family,
+                "port": cache.port,
+                "firmware": cache.firmware,
+                "arm_firmware": cache.arm_firmware,
+                "probed": sorted(cache.probed),
+                "supported": sorted(cache.supported),
+                "values": {
+                    key: value
+                    for key, value in cache.values.items()
+                    if _is_plain(value)
+                },
+                "port_scores": {
+                    str(port): score for port, score in cache.port_scores.items()
+                },
+            }
+        )
+
+    async def async_remove(self) -> None:
+        """Remove the persisted cache."""
+        await self._store.async_remove()
+
+
+def create_cache(
+    inverter: Inverter,
+    port: int,
+    probed: set[str],
+    settings: dict[str, Any],
+    port_scores: dict[int, int] | None = None,
+) -> GoodweCache:
+    """Create cache of the (just) probed inverter settings."""
+    return GoodweCache(
+        family=type(inverter).__name__,
+        port=port,
+        firmware=inverter.firmware,
+        arm_firmware=inverter.arm_firmware,
+        probed=set(probed),
+        supported=set(settings),
+        values=dict(settings),
+        port_scores=dict(port_scores or {port: 1}),
+    )
+
+
+def record_port_success(port_scores: dict[int, int], port: int) -> None:
+    """Raise the success score of the port the inverter responded on, lower the others."""
+    for other, score in port_scores.items():
+        if other != port:
+            port_scores[other] = max(score - 1, 0)
+    port_scores[port] = min(port_scores.get(port, 0) + 1, _MAX_PORT_SCORE)
+
+
+def preferred_port(port_scores: dict[int, int]) -> int | None:
+    """Answer the port with the best success score (None if there is none)."""
+    port, score = max(port_scores.items(), key=lambda item: item[1], default=(None, 0))
+    return port if score > 0 else None
+
+
+def _is_plain(value: Any) -> bool:
+    """Answer if the value can be persisted (as JSON) and loaded back as it is."""
+    if isinstance(value, list):
+        return all(_is_plain(item) for item in value)
+    return value is None or type(value) in _PLAIN_TYPES
+
+
+def cached_settings(cache: GoodweCache) -> dict[str, Any]:
+    """Answer the cached values of the supported settings which could be persisted."""
+    return {key: value for key, value in cache.values.items() if key in cache.supported}
@@ -20,20 +20,37 @@ from homeassistant.core import callback
 from homeassistant.helpers import config_validation as cv
 
 from .const import (
+    CONF_ADAPTIVE_TIMEOUT,
+    CONF_DEFERRED_ENTITIES,
+    CONF_EXTENDED_DIAGNOSTICS,
     CONF_KEEP_ALIVE,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MEDIUM_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
     CONF_MODBUS_ID,
     CONF_MODEL_FAMILY,
     CONF_NETWORK_RETRIES,
     CONF_NETWORK_TIMEOUT,
+    CONF_SLOW_SCAN_INTERVAL,
+    CONF_STATE_DEADBANDS,
+    CONF_WRITE_SETTLE_WINDOW,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MEDIUM_SCAN_INTERVAL,
     DEFAULT_MODBUS_ID,
     DEFAULT_NAME,
     DEFAULT_NETWORK_RETRIES,
     DEFAULT_NETWORK_TIMEOUT,
     DEFAULT_SCAN_INTERVAL,
+    DEFAULT_SLOW_SCAN_INTERVAL,
+    DEFAULT_WRITE_SETTLE_WINDOW,
     DOMAIN,
 )
+from .discovery import async_discover_inverters, async_identify_inverter
 
 PROTOCOL_CHOICES = ["UDP", "TCP"]
+CONF_INVERTER = "inverter"
+# Choice of the discovered inverters to enter the inverter manually
+MANUAL_INVERTER = "manual"
 CONFIG_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_HOST): str,
@@ -49,9 +66,18 @@ OPTIONS_SCHEMA = vol.Schema(
         vol.Required(CONF_KEEP_ALIVE): cv.boolean,
         vol.Required(CONF_MODEL_FAMILY): str,
         vol.Optional(CONF_SCAN_INTERVAL): int,
+        vol.Optional(CONF_MIN_SCAN_INTERVAL): cv.positive_int,
+        vol.Optional(CONF_MAX_SCAN_INTERVAL): cv.positive_int,
+        vol.Optional(CONF_MEDIUM_SCAN_INTERVAL): cv.positive_int,
+        vol.Optional(CONF_SLOW_SCAN_INTERVAL): cv.positive_int,
+        vol.Optional(CONF_STATE_DEADBANDS): cv.boolean,
+        vol.Optional(CONF_DEFERRED_ENTITIES): cv.boolean,
+        vol.Optional(CONF_WRITE_SETTLE_WINDOW): cv.positive_float,
         vol.Optional(CONF_MODBUS_ID): int,
         vol.Optional(CONF_NETWORK_RETRIES): cv.positive_int,
         vol.Optional(CONF_NETWORK_TIMEOUT): cv.positive_int,
+        vol.Optional(CONF_ADAPTIVE_TIMEOUT): cv.boolean,
+        vol.Optional(CONF_EXTENDED_DIAGNOSTICS): cv.boolean,
     }
 )
 
@@ -75,7 +101,7 @@ class OptionsFlowHandler(OptionsFlow):
         protocol = self.entry.options.get(
             CONF_PROTOCOL, self.entry.data.get(CONF_PROTOCOL, "UDP")
         )
-        keep_alive = self.entry.options.get(CONF_KEEP_ALIVE, False)
+        keep_alive = self.entry.options.get(CONF_KEEP_ALIVE, protocol == "TCP")
         model_family = self.entry.options.get(
             CONF_MODEL_FAMILY, self.entry.data[CONF_MODEL_FAMILY]
         )
@@ -86,6 +112,9 @@ class OptionsFlowHandler(OptionsFlow):
             CONF_NETWORK_TIMEOUT, DEFAULT_NETWORK_TIMEOUT
         )
         modbus_id = self.entry.options.get(CONF_MODBUS_ID, DEFAULT_MODBUS_ID)
+        scan_interval = self.entry.options.get(
+            CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL
+        )
 
         return self.async_show_form(
             step_id="init",
@@ -97,11 +126,36 @@ class OptionsFlowHandler(OptionsFlow):
                     CONF_PROTOCOL: protocol,
                     CONF_KEEP_ALIVE: keep_alive,
                     CONF_MODEL_FAMILY: model_family,
-                    CONF_SCAN_INTERVAL: self.entry.options.get(
-                        CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL
+                    CONF_SCAN_INTERVAL: scan_interval,
+                    CONF_MIN_SCAN_INTERVAL: self.entry.options.get(
+                        CONF_MIN_SCAN_INTERVAL, scan_interval
+                    ),
+                    CONF_MAX_SCAN_INTERVAL: self.entry.options.get(
+                        CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL
+                    ),
+                    CONF_MEDIUM_SCAN_INTERVAL: self.entry.options.get(
+                        CONF_MEDIUM_SCAN_INTERVAL, DEFAULT_MEDIUM_SCAN_INTERVAL
+                    ),
+                    CONF_SLOW_SCAN_INTERVAL: self.entry.options.get(
+                        CONF_SLOW_SCAN_INTERVAL, DEFAULT_SLOW_SCAN_INTERVAL
+                    ),
+                    CONF_STATE_DEADBANDS: self.entry.options.get(
+                        CONF_STATE_DEADBANDS, False
+                    ),
+                    CONF_DEFERRED_ENTITIES: self.entry.options.get(
+                        CONF_DEFERRED_ENTITIES, False
+                    ),
+                    CONF_WRITE_SETTLE_WINDOW: self.entry.options.get(
+                        CONF_WRITE_SETTLE_WINDOW, DEFAULT_WRITE_SETTLE_WINDOW
                     ),
                     CONF_NETWORK_RETRIES: network_retries,
                     CONF_NETWORK_TIMEOUT: network_timeout,
+                    CONF_ADAPTIVE_TIMEOUT: self.entry.options.get(
+                        CONF_ADAPTIVE_TIMEOUT, True
+                    ),
+                    CONF_EXTENDED_DIAGNOSTICS: self.entry.options.get(
+                        CONF_EXTENDED_DIAGNOSTICS, False
+                    ),
                     CONF_MODBUS_ID: modbus_id,
                 },
             ),
@@ -111,7 +165,11 @@ class OptionsFlowHandler(OptionsFlow):
 class GoodweFlowHandler(ConfigFlow, domain=DOMAIN):
     """Handle a Goodwe config flow."""
 
-    MINOR_VERSION = 2
+    MINOR_VERSION = 3
+
+    def __init__(self) -> None:
+        """Initialize the flow."""
+        self._discovered: dict[str, dict[str, Any]] | None = None
 
     @staticmethod
     @callback
@@ -145,8 +203,16 @@ class GoodweFlowHandler(ConfigFlow, domain=DOMAIN):
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> ConfigFlowResult:
-        """Handle a flow initialized by the user."""
+        """Handle a flow initialized by the user.
+
+        Inverters on the local network are searched first, when some
+        (not configured yet) are found, they are offered for selection.
+        """
         errors = {}
+        if user_input is None and self._discovered is None:
+            await self._async_discover()
+            if self._discovered:
+                return await self.async_step_select_inverter()
         if user_input is not None:
             host = user_input[CONF_HOST]
             protocol = user_input[CONF_PROTOCOL]
@@ -176,15 +242,58 @@ class GoodweFlowHandler(ConfigFlow, domain=DOMAIN):
             step_id="user", data_schema=CONFIG_SCHEMA, errors=errors
         )
 
+    async def async_step_select_inverter(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Select one of the discovered inverters (or enter it manually)."""
+        assert self._discovered is not None
+        if user_input is not None:
+            if (serial_number := user_input[CONF_INVERTER]) == MANUAL_INVERTER:
+                return self.async_show_form(step_id="user", data_schema=CONFIG_SCHEMA)
+            await self.async_set_unique_id(serial_number)
+            self._abort_if_unique_id_configured()
+            return self.async_create_entry(
+                title=DEFAULT_NAME, data=self._discovered[serial_number]
+            )
+
+        choices = {
+            serial_number: f"{data[CONF_HOST]} - {serial_number}"
+            for serial_number, data in self._discovered.items()
+        }
+        choices[MANUAL_INVERTER] = "Enter inverter manually"
+        return self.async_show_form(
+            step_id="select_inverter",
+            data_schema=vol.Schema({vol.Required(CONF_INVERTER): vol.In(choices)}),
+            description_placeholders={"count": str(len(self._discovered))},
+        )
+
+    async def _async_discover(self) -> None:
+        """Discover the inverters on local network which are not configured yet."""
+        configured = self._async_current_ids(include_ignore=False)
+        self._discovered = {}
+        try:
+            inverters = await async_discover_inverters()
+        except (OSError, InverterError) as err:
+            # Let the user enter the inverter host manually
+            _LOGGER.debug("Inverters discovery failed: %s", err)
+            return
+        for found in inverters:
+            serial_number = found.inverter.serial_number
+            if serial_number in configured:
+                continue
+            self._discovered[serial_number] = {
+                CONF_HOST: found.discovered.host,
+                CONF_PORT: found.port,
+                CONF_PROTOCOL: found.protocol,
+                CONF_MODEL_FAMILY: type(found.inverter).__name__,
+            }
+        _LOGGER.debug("Discovered inverters: %s", self._discovered)
+
     @staticmethod
     async def async_detect_inverter_port(
         host: str,
+        family: str | None = None,
+        preferred_port: int | None = None,
     ) -> tuple[Inverter, int]:
-        """Detects the port of the Inverter."""
-        port = GOODWE_UDP_PORT
-        try:
-            inverter = await connect(host=host, port=port, retries=10)
-        except InverterError:
-            port = GOODWE_TCP_PORT
-            inverter = await connect(host=host, port=port, retries=10)
-        return inverter, port
+        """Detects the port of the Inverter (probing UDP and TCP port concurrently)."""
+        return await async_identify_inverter(host, family, preferred_port, retries=10)
@@ -0,0 +1,115 @@
+"""Long-lived TCP session of the Goodwe inverter."""
+
+from __future__ import annotations
+
+from datetime import datetime
+import logging
+
+from goodwe import Inverter, InverterError
+from goodwe.const import GOODWE_UDP_PORT
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .registers import (
+    async_read_registers,
+    register_footprint,
+    supports_register_reads,
+)
+from .scheduler import InverterScheduler, RequestPriority
+
+_LOGGER = logging.getLogger(__name__)
+
+# Idle time (s) after which the session health is checked
+IDLE_PROBE_INTERVAL = 30
+# Initial and max delay (s) of the reconnect attempts of broken session
+_RECONNECT_DELAY = 1
+_MAX_RECONNECT_DELAY = 300
+
+
+def uses_tcp(port: int) -> bool:
+    """Answer if the inverter communicates by TCP (the library uses UDP on port 8899 only)."""
+    return port != GOODWE_UDP_PORT
+
+
+class InverterConnection:
+    """Keeps the TCP session of the inverter open and healthy.
+
+    The session is shared by all the requests of the inverter (they are sent
+    one by one by the inverter scheduler). When there was no request for a while,
+    the session is probed by reading single register. Broken session is closed
+    and reconnected by the next probe, with exponential backoff while it fails.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, inverter: Inverter, scheduler: InverterScheduler
+    ) -> None:
+        """Initialize the connection."""
+        self._hass = hass
+        self._inverter = inverter
+        self._scheduler = scheduler
+        self._failures: int = 0
+        self._cancel_check: CALLBACK_TYPE | None = None
+        self._probe_register: int | None = (
+            next(
+                (
+                    footprint[0]
+                    for sensor in inverter.sensors()
+                    if (footprint := register_footprint(sensor)) is not None
+                ),
+                None,
+            )
+            if supports_register_reads(inverter)
+            else None
+        )
+
+    @callback
+    def async_start(self) -> None:
+        """Start the periodic health checks of the idle session."""
+        self._inverter.set_keep_alive(True)
+        self._schedule_check(IDLE_PROBE_INTERVAL)
+
+    async def async_close(self) -> None:
+        """Stop the health checks and close the session."""
+        if self._cancel_check is not None:
+            self._cancel_check()
+            self._cancel_check = None
+        # pylint: disable=protected-access
+        await self._inverter._protocol.close()
+
+    @callback
+    def _schedule_check(self, delay: float) -> None:
+        self._cancel_check = async_call_later(self._hass, delay, self._async_check)
+
+    async def _async_check(self, _now: datetime) -> None:
+        """Probe the session if it was idle, reconnect it if it is broken."""
+        idle = self._hass.loop.time() - self._scheduler.last_activity
+        if not self._failures and idle < IDLE_PROBE_INTERVAL:
+            self._schedule_check(IDLE_PROBE_INTERVAL - idle)
+            return
+        try:
+            await self._scheduler.async_request(
+                self._async_probe, RequestPriority.POLL, key="health_check"
+            )
+        except InverterError as err:
+            self._failures += 1
+            delay = min(
+                _RECONNECT_DELAY * 2 ** (self._failures - 1), _MAX_RECONNECT_DELAY
+            )
+            _LOGGER.debug(
+                "Inverter session broken (%s), reconnecting in %ds", err, delay
+            )
+            # pylint: disable=protected-access
+            await self._inverter._protocol.close()
+            self._schedule_check(delay)
+        else:
+            if self._failures:
+                _LOGGER.debug("Inverter session reconnected")
+            self._failures = 0
+            self._schedule_check(IDLE_PROBE_INTERVAL)
+
+    async def _async_probe(self, inverter: Inverter) -> None:
+        """Read single register (or the model info) to check the session."""
+        if self._probe_register is None:
+            await inverter.read_device_info()
+        else:
+            await async_read_registers(inverter, self._probe_register, 1)
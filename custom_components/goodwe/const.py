@@ -17,19 +17,48 @@ PLATFORMS = [
 DEFAULT_NAME = "GoodWe"
 SCAN_INTERVAL = timedelta(seconds=10)
 DEFAULT_SCAN_INTERVAL = 5
+DEFAULT_MAX_SCAN_INTERVAL = 300
+DEFAULT_MEDIUM_SCAN_INTERVAL = 30
+DEFAULT_SLOW_SCAN_INTERVAL = 120
 DEFAULT_NETWORK_RETRIES = 10
 DEFAULT_NETWORK_TIMEOUT = 1
 DEFAULT_MODBUS_ID = 0
+DEFAULT_WRITE_SETTLE_WINDOW = 0.5
 
+CONF_ADAPTIVE_TIMEOUT = "adaptive_timeout"
+CONF_EXTENDED_DIAGNOSTICS = "extended_diagnostics"
 CONF_KEEP_ALIVE = "keep_alive"
 CONF_MODEL_FAMILY = "model_family"
 CONF_NETWORK_RETRIES = "network_retries"
 CONF_NETWORK_TIMEOUT = "network_timeout"
 CONF_MODBUS_ID = "modbus_id"
+CONF_MIN_SCAN_INTERVAL = "min_scan_interval"
+CONF_MAX_SCAN_INTERVAL = "max_scan_interval"
+CONF_MEDIUM_SCAN_INTERVAL = "medium_scan_interval"
+CONF_SLOW_SCAN_INTERVAL = "slow_scan_interval"
+CONF_STATE_DEADBANDS = "state_deadbands"
+CONF_DEFERRED_ENTITIES = "deferred_entities"
+CONF_WRITE_SETTLE_WINDOW = "write_settle_window"
 
 SERVICE_GET_PARAMETER = "get_parameter"
 SERVICE_SET_PARAMETER = "set_parameter"
+SERVICE_GET_PARAMETERS = "get_parameters"
+SERVICE_SET_PARAMETERS = "set_parameters"
+SERVICE_GET_SCHEDULE = "get_schedule"
+SERVICE_SET_SCHEDULE = "set_schedule"
+ATTR_AREA_ID = "area_id"
 ATTR_DEVICE_ID = "device_id"
+ATTR_END = "end"
 ATTR_ENTITY_ID = "entity_id"
+ATTR_LAST_READ = "last_read"
+ATTR_LAST_READ_CYCLE = "last_read_cycle"
 ATTR_PARAMETER = "parameter"
+ATTR_PARAMETERS = "parameters"
+ATTR_SERIAL_NUMBER = "serial_number"
+ATTR_STALE = "stale"
+ATTR_START = "start"
 ATTR_VALUE = "value"
+ATTR_WINDOWS = "windows"
+
+# Dispatcher signal (by inverter serial number) of the settings written by schedule
+SIGNAL_SETTINGS_UPDATED = f"{DOMAIN}_settings_updated_{{}}"
@@ -2,15 +2,27 @@
 
 from __future__ import annotations
 
+import asyncio
+from collections import defaultdict
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import timedelta
+from enum import IntEnum
 import logging
-from typing import Any
+from math import inf
+from typing import TYPE_CHECKING, Any
 
-from goodwe import Inverter, InverterError, RequestFailedException
+from goodwe import (
+    Inverter,
+    InverterError,
+    RequestFailedException,
+    Sensor,
+    SensorKind,
+)
+from goodwe.exceptions import RequestRejectedException
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_SCAN_INTERVAL
+from homeassistant.const import CONF_HOST, CONF_SCAN_INTERVAL
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import sun
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.update_coordinator import (
     BaseCoordinatorEntity,
@@ -18,10 +30,106 @@ from homeassistant.helpers.update_coordinator import (
     UpdateFailed,
 )
 
-from .const import DEFAULT_SCAN_INTERVAL
+from .const import (
+    ATTR_LAST_READ,
+    ATTR_LAST_READ_CYCLE,
+    ATTR_STALE,
+    CONF_ADAPTIVE_TIMEOUT,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MEDIUM_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_NETWORK_RETRIES,
+    CONF_NETWORK_TIMEOUT,
+    CONF_SLOW_SCAN_INTERVAL,
+    CONF_STATE_DEADBANDS,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MEDIUM_SCAN_INTERVAL,
+    DEFAULT_NETWORK_RETRIES,
+    DEFAULT_NETWORK_TIMEOUT,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_SLOW_SCAN_INTERVAL,
+)
+from .fleet import async_get_fleet
+from .instrumentation import RequestInstrumentation
+from .metrics import InverterMetrics
+from .registers import (
+    RegisterRange,
+    async_read_register_range,
+    derive_range_values,
+    plan_register_ranges,
+    register_footprint,
+    supports_register_reads,
+)
+from .scheduler import InverterScheduler, RequestPriority
+from .transport import AdaptiveTransport
+from .values import SensorValueStore
+from .writes import InverterWriteQueue
+
+if TYPE_CHECKING:
+    from .schedule import InverterSchedule
 
 _LOGGER = logging.getLogger(__name__)
 
+# Change of power (W) between two polls considered as quickly changing values
+_VOLATILE_POWER_CHANGE = 50
+# Change of power (W) between two polls considered as flat values
+_FLAT_POWER_CHANGE = 10
+# Factor of polling interval increase when inverter does not respond
+_BACKOFF_FACTOR = 2
+# Factor of polling interval increase when values are flat
+_SLOWDOWN_FACTOR = 1.5
+# Max number of unused registers read between two sensors of the same tier
+_TIER_REGISTER_GAP = 16
+# Max number of registers read by single command (modbus limit)
+_TIER_MAX_REGISTERS = 125
+
+# Value changes (by sensor unit) too small to be written to the state machine
+_STATE_DEADBANDS: dict[str, float] = {
+    "W": 1,
+    "VA": 1,
+    "var": 1,
+    "V": 0.1,
+    "A": 0.1,
+    "Hz": 0.01,
+    "C": 0.1,
+}
+
+
+class PollingTier(IntEnum):
+    """Polling tier of the inverter sensors."""
+
+    FAST = 1
+    MEDIUM = 2
+    SLOW = 3
+
+
+# Polling tiers of sensors by their unit (same keys as the sensor descriptions)
+_UNIT_TIERS: dict[str, PollingTier] = {
+    "W": PollingTier.FAST,
+    "VA": PollingTier.FAST,
+    "var": PollingTier.FAST,
+    "A": PollingTier.MEDIUM,
+    "V": PollingTier.MEDIUM,
+    "Hz": PollingTier.MEDIUM,
+    "%": PollingTier.MEDIUM,
+    "kWh": PollingTier.SLOW,
+    "C": PollingTier.SLOW,
+    "h": PollingTier.SLOW,
+}
+
+
+def polling_tier(sensor: Sensor) -> PollingTier:
+    """Answer the polling tier of the sensor.
+
+    Power values are polled fast, voltages, currents, frequencies and SoC
+    in medium tier, energy totals, temperatures, BMS data and all the
+    diagnostic, text and enum values in slow tier.
+    """
+    if sensor.kind == SensorKind.BMS:
+        return PollingTier.SLOW
+    return _UNIT_TIERS.get(sensor.unit, PollingTier.SLOW)
+
+
 type GoodweConfigEntry = ConfigEntry[GoodweRuntimeData]
 
 
@@ -32,6 +140,9 @@ class GoodweRuntimeData:
     inverter: Inverter
     coordinator: GoodweUpdateCoordinator
     device_info: DeviceInfo
+    settings: dict[str, Any]
+    writes: InverterWriteQueue
+    schedule: InverterSchedule
 
 
 class GoodweUpdateCoordinator(DataUpdateCoordinator[dict[str, Any]]):
@@ -46,26 +157,92 @@ class GoodweUpdateCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         inverter: Inverter,
     ) -> None:
         """Initialize update coordinator."""
+        scan_interval = entry.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
         super().__init__(
             hass,
             _LOGGER,
             config_entry=entry,
             name=entry.title,
-            update_interval=timedelta(
-                seconds=entry.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
-            ),
+            update_interval=timedelta(seconds=scan_interval),
         )
         self.inverter: Inverter = inverter
-        self._last_data: dict[str, Any] = {}
-        self._polled_entities: dict[BaseCoordinatorEntity, datetime] = {}
+        instrumentation = RequestInstrumentation(inverter)
+        self.metrics = InverterMetrics(instrumentation)
+        # Network timeout tuned to the inverter round-trip time
+        self.transport = AdaptiveTransport(
+            instrumentation,
+            entry.options.get(CONF_NETWORK_TIMEOUT, DEFAULT_NETWORK_TIMEOUT),
+            entry.options.get(CONF_NETWORK_RETRIES, DEFAULT_NETWORK_RETRIES),
+            entry.options.get(CONF_ADAPTIVE_TIMEOUT, True),
+            # Only the polling requests share the update cycle budget
+            lambda: self.scheduler.active_priority is RequestPriority.POLL,
+        )
+        self._fleet = async_get_fleet(hass)
+        # All the requests to the inverter are sent through the scheduler
+        self.scheduler = InverterScheduler(
+            hass,
+            entry,
+            inverter,
+            self._fleet.segment_limiter(
+                entry.options.get(CONF_HOST, entry.data[CONF_HOST])
+            ),
+        )
+        entry.async_on_unload(self._fleet.async_register(entry, self))
+        # Last known values of the sensors (loaded before the first refresh)
+        self.values = SensorValueStore(
+            hass,
+            entry.unique_id or entry.entry_id,
+            (sensor.id_ for sensor in inverter.sensors()),
+        )
+        self._polled_entities: dict[BaseCoordinatorEntity, tuple[str, int]] = {}
+        self._polled_entities_due: dict[BaseCoordinatorEntity, float] = {}
+        self._scan_interval: int = scan_interval
+        self._min_scan_interval: int = entry.options.get(
+            CONF_MIN_SCAN_INTERVAL, scan_interval
+        )
+        self._max_scan_interval: int = max(
+            entry.options.get(CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL),
+            self._min_scan_interval,
+        )
+        self._power_sensors: tuple[tuple[str, int], ...] | None = None
+        self._tier_intervals: dict[PollingTier, int] = {
+            PollingTier.FAST: 0,
+            PollingTier.MEDIUM: entry.options.get(
+                CONF_MEDIUM_SCAN_INTERVAL, DEFAULT_MEDIUM_SCAN_INTERVAL
+            ),
+            PollingTier.SLOW: entry.options.get(
+                CONF_SLOW_SCAN_INTERVAL, DEFAULT_SLOW_SCAN_INTERVAL
+            ),
+        }
+        self._tier_read_at: dict[PollingTier, float] = {}
+        self._tier_ranges: dict[PollingTier, list[RegisterRange]] | None = None
+        self._tier_sensors: frozenset[str] = frozenset()
+        self._tiered_reads: bool = supports_register_reads(inverter)
+        self._enabled_sensors: set[str] = set()
+        self._notified_values: dict[str, Any] = {}
+        self._notified_stale: set[str] = set()
+        self._changed_sensors: set[str] | None = None
+        self._deadbands: dict[str, float] | None = (
+            None if entry.options.get(CONF_STATE_DEADBANDS, False) else {}
+        )
 
     async def _async_update_data(self) -> dict[str, Any]:
         """Fetch data from the inverter."""
-        await self._update_polled_entities()
+        if self.data is not None:
+            # Do not poll all the inverters at the same time
+            await self._fleet.async_wait_poll_slot(self.update_interval.total_seconds())
 
+        self.metrics.start_cycle()
+        self.values.start_cycle()
+        # Retries must not make the cycle overrun the polling interval
+        self.transport.start_cycle(self.update_interval.total_seconds())
+        failed = True
         try:
-            self._last_data = self.data or {}
-            return await self.inverter.read_runtime_data()
+            # Polled settings are read along (not ahead of) the runtime data
+            _, data = await asyncio.gather(
+                self._update_polled_entities(), self._read_runtime_data()
+            )
+            failed = False
         except RequestFailedException as ex:
             # UDP communication with inverter is by definition unreliable.
             # It is rather normal in many environments to fail to receive
@@ -76,33 +253,294 @@ class GoodweUpdateCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                 _LOGGER.debug(
                     "No response received (streak of %d)", ex.consecutive_failures_count
                 )
-                # return last known data
-                return self._last_data
+                # return last known data (including values read before the failure)
+                data = self.values.as_data()
+                self._changed_sensors = self._detect_changes(data)
+                return data
             # Inverter does not respond anymore (e.g. it went to sleep mode)
             _LOGGER.debug(
                 "Inverter not responding (streak of %d)", ex.consecutive_failures_count
             )
+            self._adapt_update_interval(None)
+            self._changed_sensors = None
             raise UpdateFailed(ex) from ex
         except InverterError as ex:
+            self._adapt_update_interval(None)
+            self._changed_sensors = None
             raise UpdateFailed(ex) from ex
+        finally:
+            self.transport.end_cycle()
+            cycle = self.metrics.end_cycle(failed)
+            if cycle.timeouts or cycle.retries:
+                _LOGGER.debug(
+                    "Update cycle with %d retries and %d timeouts took %.0fms",
+                    cycle.retries,
+                    cycle.timeouts,
+                    cycle.duration_ms,
+                )
+        self._adapt_update_interval(data)
+        self._changed_sensors = self._detect_changes(data)
+        return data
+
+    async def _read_runtime_data(self) -> dict[str, Any]:
+        """Read the runtime data of the polling tiers which are due.
+
+        The slow tier is read by the library's full runtime data read
+        (which also re-evaluates the inverter features), the faster tiers
+        by reading just the register ranges of their sensors.
+        Only the faster tiers are limited to the sensors with enabled entities,
+        the full read of slow tier always reads all the register blocks.
+        """
+        now = self.hass.loop.time()
+        due = [
+            tier
+            for tier, interval in self._tier_intervals.items()
+            if now - self._tier_read_at.get(tier, -inf) >= interval
+        ]
+        if self._tiered_reads and self.data and PollingTier.SLOW not in due:
+            # Values of the tiers not due are kept (in place)
+            data = self.data
+            tier_ranges = self._plan_tier_ranges()
+            try:
+                for tier in due:
+                    for register_range in tier_ranges[tier]:
+                        values = await self._poll(register_range)
+                        # Keep the values read even if the next range fails
+                        self.values.merge(values)
+                        data.update(values)
+                    self._tier_read_at[tier] = now
+            except RequestRejectedException:
+                _LOGGER.debug("Tiered read rejected, reading full runtime data")
+                self._tiered_reads = False
+            else:
+                # Values computed by the library's post-processing of full read
+                if derived := derive_range_values(self.inverter, data):
+                    self.values.merge(derived)
+                    data.update(derived)
+                return data
+
+        data = await self.scheduler.async_request(
+            lambda inv: inv.read_runtime_data(),
+            RequestPriority.POLL,
+            key="runtime_data",
+            deadline=self.update_interval.total_seconds(),
+        )
+        self.values.merge(data)
+        self._tier_read_at = dict.fromkeys(PollingTier, now)
+        if self._tiered_reads:
+            sensor_ids = frozenset(s.id_ for s in self.inverter.sensors())
+            if sensor_ids != self._tier_sensors:
+                # Inverter features (e.g. battery) changed
+                self._tier_sensors = sensor_ids
+                self._tier_ranges = None
+        return data
+
+    async def _poll(self, register_range: RegisterRange) -> dict[str, Any]:
+        """Read the register range (as periodic poll request)."""
+        return await self.scheduler.async_request(
+            lambda inv: async_read_register_range(inv, register_range, self.metrics),
+            RequestPriority.POLL,
+            key=("registers", register_range.offset, register_range.count),
+            deadline=self.update_interval.total_seconds(),
+        )
+
+    def _plan_tier_ranges(self) -> dict[PollingTier, list[RegisterRange]]:
+        """Answer the register ranges of the polling tiers, (re)create them if needed.
+
+        Only sensors with enabled entities are read (all of them until
+        the sensor entities are added). Sensors without registers (values
+        computed by the library's full read) are left to the slow tier.
+        """
+        if self._tier_ranges is not None:
+            return self._tier_ranges
+        tier_sensors: dict[PollingTier, list[Sensor]] = defaultdict(list)
+        without_registers: list[str] = []
+        for sensor in self.inverter.sensors():
+            if self._enabled_sensors and sensor.id_ not in self._enabled_sensors:
+                continue
+            tier = polling_tier(sensor)
+            if tier != PollingTier.SLOW and register_footprint(sensor) is None:
+                without_registers.append(sensor.id_)
+                tier = PollingTier.SLOW
+            tier_sensors[tier].append(sensor)
+        if without_registers:
+            _LOGGER.debug(
+                "Sensors %s without registers are read by the slow tier",
+                without_registers,
+            )
+        self._tier_ranges = {
+            tier: plan_register_ranges(
+                tier_sensors[tier], _TIER_REGISTER_GAP, _TIER_MAX_REGISTERS
+            )
+            for tier in (PollingTier.FAST, PollingTier.MEDIUM)
+        }
+        _LOGGER.debug(
+            "Polling tiers read plan: %s",
+            {
+                tier.name: [(r.offset, r.count) for r in ranges]
+                for tier, ranges in self._tier_ranges.items()
+            },
+        )
+        return self._tier_ranges
+
+    def _adapt_update_interval(self, data: dict[str, Any] | None) -> None:
+        """Adapt the polling interval to the inverter state and values volatility.
+
+        The interval is extended exponentially while the inverter does not respond,
+        set to maximum at night for inverters without battery (they are asleep),
+        extended while the power values are flat and shortened while they change quickly.
+        """
+        interval = self.update_interval.total_seconds()
+        if data is None:
+            interval *= _BACKOFF_FACTOR
+        elif not self.last_update_success:
+            # Inverter is responding again
+            interval = self._scan_interval
+        elif not sun.is_up(self.hass) and data.get("battery_soc") is None:
+            interval = self._max_scan_interval
+        else:
+            change = self._power_change(data)
+            if change >= _VOLATILE_POWER_CHANGE:
+                interval /= _BACKOFF_FACTOR
+            elif change <= _FLAT_POWER_CHANGE:
+                interval *= _SLOWDOWN_FACTOR
+            else:
+                interval = self._scan_interval
+        interval = min(max(interval, self._min_scan_interval), self._max_scan_interval)
+        if interval != self.update_interval.total_seconds():
+            _LOGGER.debug("Changing polling interval to %.1fs", interval)
+            self.update_interval = timedelta(seconds=interval)
+
+    def _power_change(self, data: dict[str, Any]) -> float:
+        """Answer the biggest change of power sensors since previous poll."""
+        if self._power_sensors is None:
+            self._power_sensors = tuple(
+                (s.id_, self.values.slot(s.id_))
+                for s in self.inverter.sensors()
+                if s.unit == "W"
+            )
+        change = 0
+        for sensor, slot in self._power_sensors:
+            value = data.get(sensor)
+            last_value = self.values.previous_at(slot)
+            if isinstance(value, (int, float)) and isinstance(last_value, (int, float)):
+                change = max(change, abs(value - last_value))
+        return change
+
+    def _detect_changes(self, data: dict[str, Any]) -> set[str] | None:
+        """Answer the sensors which values changed since they were last notified.
+
+        Answer None (all sensors changed) when the entities availability may change.
+        Sensor entities display last known value when the current one is missing,
+        so that value is compared. Change of the value staleness is a change too.
+        """
+        if not self.last_update_success or not self.data:
+            self._notified_values = {
+                sensor: self.values.value(sensor) for sensor in data
+            }
+            self._notified_stale = {
+                sensor for sensor, value in data.items() if value is None
+            }
+            return None
+        if self._deadbands is None:
+            self._deadbands = {
+                s.id_: _STATE_DEADBANDS[s.unit]
+                for s in self.inverter.sensors()
+                if s.unit in _STATE_DEADBANDS
+            }
+        changed: set[str] = set()
+        for sensor, current in data.items():
+            if current is None:
+                if sensor not in self._notified_stale:
+                    self._notified_stale.add(sensor)
+                    changed.add(sensor)
+            elif sensor in self._notified_stale:
+                self._notified_stale.discard(sensor)
+                changed.add(sensor)
+            value = self.values.value(sensor)
+            notified = self._notified_values.get(sensor)
+            if value == notified:
+                continue
+            deadband = self._deadbands.get(sensor)
+            if (
+                deadband
+                and isinstance(value, (int, float))
+                and isinstance(notified, (int, float))
+                and round(abs(value - notified), 6) <= deadband
+            ):
+                continue
+            self._notified_values[sensor] = value
+            changed.add(sensor)
+        return changed
+
+    def sensor_changed(self, sensor: str) -> bool:
+        """Answer if the sensor value (or availability) changed in the last update."""
+        return self._changed_sensors is None or sensor in self._changed_sensors
 
     async def _update_polled_entities(self) -> None:
-        for entity, interval in list(self._polled_entities.items()):
-            if interval:
+        """Read the settings of polled entities which are due and push them to entities."""
+        now = self.hass.loop.time()
+        due = {
+            entity: setting
+            for entity, (setting, interval) in self._polled_entities.items()
+            if self._polled_entities_due.get(entity, now) <= now
+        }
+        if not due:
+            return
+        for entity in due:
+            self._polled_entities_due[entity] = now + self._polled_entities[entity][1]
+        values = await self._read_settings(set(due.values()))
+        for entity, setting in due.items():
+            if setting in values:
+                entity.polled_setting_updated(values[setting])
+
+    async def _read_settings(self, settings: set[str]) -> dict[str, Any]:
+        """Read the settings in as few requests as possible, answer the values read."""
+        values: dict[str, Any] = {}
+        if supports_register_reads(self.inverter):
+            for register_range in plan_register_ranges(
+                s for s in self.inverter.settings() if s.id_ in settings
+            ):
                 try:
-                    await entity.async_update()
+                    values.update(await self._poll(register_range))
                 except InverterError:
-                    _LOGGER.debug("Failed to update entity %s", entity.name)
+                    _LOGGER.debug("Failed to read settings %s", register_range.sensors)
+        else:
+            for setting in settings:
+                try:
+                    values[setting] = await self.scheduler.async_request(
+                        lambda inv, s=setting: inv.read_setting(s),
+                        RequestPriority.POLL,
+                        key=("setting", setting),
+                        deadline=self.update_interval.total_seconds(),
+                    )
+                except InverterError:
+                    _LOGGER.debug("Failed to read setting %s", setting)
+        return values
+
+    def sensor_value(self, slot: int) -> Any:
+        """Answer current (or last known) value of the sensor in the values slot."""
+        return self.values.value_at(slot)
 
-    def sensor_value(self, sensor: str) -> Any:
-        """Answer current (or last known) value of the sensor."""
-        val = self.data.get(sensor)
-        return val if val is not None else self._last_data.get(sensor)
+    def total_sensor_value(self, slot: int) -> Any:
+        """Answer current value of the 'total' (never 0) sensor in the values slot."""
+        return self.values.value_at(slot) or self.values.previous_at(slot)
 
-    def total_sensor_value(self, sensor: str) -> Any:
-        """Answer current value of the 'total' (never 0) sensor."""
-        val = self.data.get(sensor)
-        return val or self._last_data.get(sensor)
+    def sensor_staleness(self, sensor: str) -> dict[str, Any] | None:
+        """Answer the staleness attributes of the sensor value (None if it was never read).
+
+        Value is stale when the inverter does not respond or did not provide it
+        in the last update, the last known value is displayed then.
+        """
+        if (known := self.values.known(sensor)) is None:
+            return None
+        if self.last_update_success and self.data.get(sensor) is not None:
+            return {ATTR_STALE: False}
+        return {
+            ATTR_STALE: True,
+            ATTR_LAST_READ: known.updated.isoformat(),
+            ATTR_LAST_READ_CYCLE: known.cycle,
+        }
 
     def reset_sensor(self, sensor: str) -> None:
         """Reset sensor value to 0.
@@ -110,14 +548,33 @@ class GoodweUpdateCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         Intended for "daily" cumulative sensors (e.g. PV energy produced today),
         which should be explicitly reset to 0 at midnight if inverter is suspended.
         """
-        self._last_data[sensor] = 0
+        self.values.reset(sensor, 0)
         self.data[sensor] = 0
 
+    def sensor_entity_enabled(self, sensor: str, enabled: bool) -> None:
+        """Register/unregister sensor with enabled entity (added to hass).
+
+        Disabled entities are never added to hass, disabling an entity removes it
+        and enabling it reloads the config entry, so this tracks the entity registry.
+        """
+        if enabled:
+            self._enabled_sensors.add(sensor)
+        else:
+            self._enabled_sensors.discard(sensor)
+        self._tier_ranges = None
+
     def entity_state_polling(
-        self, entity: BaseCoordinatorEntity, interval: int
+        self, entity: BaseCoordinatorEntity, setting: str, interval: int
     ) -> None:
-        """Enable/disable polling of entity state."""
+        """Enable/disable polling of entity state (setting) every interval seconds.
+
+        The read values are pushed to entity's polled_setting_updated(value) callback.
+        """
         if interval:
-            self._polled_entities[entity] = interval
+            if entity not in self._polled_entities_due:
+                # The entity state is known at this time
+                self._polled_entities_due[entity] = self.hass.loop.time() + interval
+            self._polled_entities[entity] = (setting, interval)
         else:
             self._polled_entities.pop(entity, None)
+            self._polled_entities_due.pop(entity, None)
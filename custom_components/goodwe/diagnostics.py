@@ -2,12 +2,42 @@
 
 from __future__ import annotations
 
+import asyncio
 from typing import Any
 
-from goodwe import Inverter, InverterError
+from goodwe import InverterError
+from goodwe.exceptions import RequestRejectedException
+from goodwe.sensor import IntegerS
 from homeassistant.core import HomeAssistant
 
-from .coordinator import GoodweConfigEntry
+from .const import CONF_EXTENDED_DIAGNOSTICS
+from .coordinator import GoodweConfigEntry, GoodweUpdateCoordinator
+from .registers import (
+    RegisterRange,
+    async_read_registers,
+    decode_register_range,
+    plan_register_ranges,
+    supports_register_reads,
+)
+from .scheduler import RequestPriority
+from .services import response_value
+
+# Communication settings registers of the inverter
+_COMMUNICATION_REGISTERS = {
+    "modbus_address": 45127,
+    "modbus_baudrate": 45132,
+    "log_data_enable": 47005,
+    "data_send_interval": 47006,
+    "wifi_or_lan": 47009,
+    "modbus_tcp_wo_internet": 47017,
+    "wifi_modbus_tcp_enable": 47040,
+}
+# Max number of register range reads of the dump queued to the inverter at a time
+_DUMP_CONCURRENCY = 2
+# Max number of unused registers read between two sensors of the same dumped range
+_DUMP_REGISTER_GAP = 64
+# Max number of registers read by single command (modbus limit)
+_DUMP_MAX_REGISTERS = 125
 
 
 async def async_get_config_entry_diagnostics(
@@ -15,8 +45,9 @@ async def async_get_config_entry_diagnostics(
 ) -> dict[str, Any]:
     """Return diagnostics for a config entry."""
     inverter = config_entry.runtime_data.inverter
+    coordinator = config_entry.runtime_data.coordinator
 
-    return {
+    diagnostics: dict[str, Any] = {
         "config_entry": config_entry.as_dict(),
         "inverter": {
             "model_name": inverter.model_name,
@@ -28,19 +59,102 @@ async def async_get_config_entry_diagnostics(
             "dsp_svn_version": inverter.dsp_svn_version,
             "arm_version": inverter.arm_version,
             "arm_svn_version": inverter.arm_svn_version,
-            "modbus_address": await _read_register(inverter, 45127),
-            "modbus_baudrate": await _read_register(inverter, 45132),
-            "log_data_enable": await _read_register(inverter, 47005),
-            "data_send_interval": await _read_register(inverter, 47006),
-            "wifi_or_lan": await _read_register(inverter, 47009),
-            "modbus_tcp_wo_internet": await _read_register(inverter, 47017),
-            "wifi_modbus_tcp_enable": await _read_register(inverter, 47040),
         },
     }
+    if config_entry.options.get(
+        CONF_EXTENDED_DIAGNOSTICS, False
+    ) and supports_register_reads(inverter):
+        dump = await _async_dump_registers(coordinator)
+        values = {
+            key: value
+            for register_range in dump
+            for key, value in register_range.get("values", {}).items()
+        }
+        for name, register in _COMMUNICATION_REGISTERS.items():
+            diagnostics["inverter"][name] = values.get(f"modbus-{register}")
+        diagnostics["register_dump"] = dump
+    else:
+        for name, register in _COMMUNICATION_REGISTERS.items():
+            diagnostics["inverter"][name] = await _read_register(coordinator, register)
+    diagnostics["polling_metrics"] = coordinator.metrics.as_dict()
+    diagnostics["transport"] = coordinator.transport.as_dict()
+    return diagnostics
 
 
-async def _read_register(inverter: Inverter, register: int) -> Any:
+async def _read_register(coordinator: GoodweUpdateCoordinator, register: int) -> Any:
     try:
-        return await inverter.read_setting(f"modbus-{register}")
+        return await coordinator.scheduler.async_request(
+            lambda inv: inv.read_setting(f"modbus-{register}"),
+            RequestPriority.INTERACTIVE,
+            key=("setting", f"modbus-{register}"),
+        )
     except InverterError:
         return None
+
+
+async def _async_dump_registers(
+    coordinator: GoodweUpdateCoordinator,
+) -> list[dict[str, Any]]:
+    """Read the registers of all the inverter sensors and settings.
+
+    Registers are read in as few coalesced ranges as possible, the raw words
+    are dumped along the sensors/settings decoded from them.
+    Range rejected by the inverter (e.g. containing unsupported registers)
+    is split to ranges without gaps.
+    All the requests are sent by the inverter scheduler, so only few ranges
+    are queued at a time to let the periodic polls interleave the dump.
+    """
+    inverter = coordinator.inverter
+    ranges = plan_register_ranges(
+        (
+            *inverter.sensors(),
+            *inverter.settings(),
+            *(
+                IntegerS(f"modbus-{register}", register, "")
+                for register in _COMMUNICATION_REGISTERS.values()
+            ),
+        ),
+        _DUMP_REGISTER_GAP,
+        _DUMP_MAX_REGISTERS,
+    )
+    limiter = asyncio.Semaphore(_DUMP_CONCURRENCY)
+
+    async def _async_dump_range(
+        register_range: RegisterRange,
+    ) -> list[dict[str, Any]]:
+        dump: dict[str, Any] = {
+            "offset": register_range.offset,
+            "count": register_range.count,
+        }
+        async with limiter:
+            try:
+                response = await coordinator.scheduler.async_request(
+                    lambda inv: async_read_registers(
+                        inv, register_range.offset, register_range.count
+                    ),
+                    RequestPriority.INTERACTIVE,
+                    key=("raw_registers", register_range.offset, register_range.count),
+                )
+            except RequestRejectedException as err:
+                parts = plan_register_ranges(register_range.sensors, 0)
+                if len(parts) < 2:
+                    dump["error"] = str(err)
+                    return [dump]
+            except InverterError as err:
+                dump["error"] = str(err)
+                return [dump]
+            else:
+                dump["words"] = response.response_data().hex(" ", 2)
+                # Settings like eco modes are decoded to objects, dump them as text
+                dump["values"] = {
+                    key: response_value(value)
+                    for key, value in decode_register_range(
+                        register_range, response
+                    ).items()
+                }
+                return [dump]
+        dumps = await asyncio.gather(*(_async_dump_range(p) for p in parts))
+        return [d for part in dumps for d in part]
+
+    dumps = await asyncio.gather(*(_async_dump_range(r) for r in ranges))
+    return [d for part in dumps for d in part]
@@ -0,0 +1,157 @@
+"""Discovery of the Goodwe inverters on local network."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import suppress
+from dataclasses import dataclass
+import logging
+
+from goodwe import Inverter, InverterError, connect
+from goodwe.const import GOODWE_TCP_PORT, GOODWE_UDP_PORT
+
+_LOGGER = logging.getLogger(__name__)
+
+# Broadcast request answered by the inverters Wi-Fi/LAN modules
+DISCOVERY_REQUEST = b"WIFIKIT-214028-READ"
+DISCOVERY_PORT = 48899
+BROADCAST_ADDRESS = "255.255.255.255"
+# Time (s) the responses to the broadcast are collected
+SEARCH_WINDOW = 2
+# Timeout (s) and retries of the inverter identification requests
+_IDENTIFY_TIMEOUT = 1
+_IDENTIFY_RETRIES = 3
+# Time (s) the preferred port is probed alone before the other one is probed too
+PREFERRED_PORT_HEAD_START = 0.5
+
+# Abandoned identification requests (kept referenced until they finish)
+_BACKGROUND_TASKS: set[asyncio.Task] = set()
+
+
+@dataclass(frozen=True)
+class DiscoveredInverter:
+    """Inverter (module) which responded to the discovery broadcast."""
+
+    host: str
+    mac: str
+    name: str
+
+
+@dataclass(frozen=True)
+class IdentifiedInverter:
+    """Discovered inverter identified on its communication port."""
+
+    discovered: DiscoveredInverter
+    inverter: Inverter
+    port: int
+
+    @property
+    def protocol(self) -> str:
+        """Answer the protocol of the inverter port."""
+        return "UDP" if self.port == GOODWE_UDP_PORT else "TCP"
+
+
+class _SearchProtocol(asyncio.DatagramProtocol):
+    """Collects the responses to the discovery broadcast."""
+
+    def __init__(self) -> None:
+        self.responses: dict[str, DiscoveredInverter] = {}
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        try:
+            host, mac, name = data.decode("utf-8").split(",")[:3]
+        except ValueError:
+            _LOGGER.debug("Unexpected discovery response %s from %s", data, addr)
+            return
+        if host not in self.responses:
+            _LOGGER.debug("Discovered inverter %s (%s) at %s", name, mac, host)
+            self.responses[host] = DiscoveredInverter(host, mac, name)
+
+
+async def async_search_inverters(
+    window: float = SEARCH_WINDOW,
+    address: str = BROADCAST_ADDRESS,
+    port: int = DISCOVERY_PORT,
+) -> list[DiscoveredInverter]:
+    """Broadcast the discovery request and answer all the inverters responding within window (s)."""
+    transport, protocol = await asyncio.get_running_loop().create_datagram_endpoint(
+        _SearchProtocol, local_addr=("0.0.0.0", 0), allow_broadcast=True
+    )
+    try:
+        transport.sendto(DISCOVERY_REQUEST, (address, port))
+        await asyncio.sleep(window)
+    finally:
+        transport.close()
+    return list(protocol.responses.values())
+
+
+def _abandon(task: asyncio.Task) -> None:
+    """Cancel the task, the library may still finish its retries in background."""
+    task.cancel()
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+async def async_identify_inverter(
+    host: str,
+    family: str | None = None,
+    preferred_port: int | None = None,
+    timeout: int = _IDENTIFY_TIMEOUT,
+    retries: int = _IDENTIFY_RETRIES,
+) -> tuple[Inverter, int]:
+    """Connect to the inverter on UDP and TCP port in parallel, answer the first one responding.
+
+    The preferred port (e.g. the one which worked before) gets a head start,
+    the other port is probed after a while or as soon as the preferred one fails.
+    The other (slower) connection attempt is cancelled.
+    Raise InverterError if the inverter does not respond on any of the ports.
+    """
+    failed = asyncio.Event()
+
+    async def _async_connect(port: int) -> Inverter:
+        if preferred_port is not None and port != preferred_port:
+            with suppress(TimeoutError):
+                await asyncio.wait_for(failed.wait(), PREFERRED_PORT_HEAD_START)
+        return await connect(
+            host=host, port=port, family=family, timeout=timeout, retries=retries
+        )
+
+    attempts = {
+        asyncio.create_task(_async_connect(port)): port
+        for port in (GOODWE_UDP_PORT, GOODWE_TCP_PORT)
+    }
+    pending = set(attempts)
+    failures: list[BaseException] = []
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if (error := task.exception()) is not None:
+                failures.append(error)
+                failed.set()
+                continue
+            for other in pending:
+                _abandon(other)
+            _LOGGER.debug("Inverter %s responded on port %d", host, attempts[task])
+            return task.result(), attempts[task]
+    raise InverterError(f"Unable to connect to inverter at {host}: {failures}")
+
+
+async def async_discover_inverters(
+    window: float = SEARCH_WINDOW,
+    address: str = BROADCAST_ADDRESS,
+    port: int = DISCOVERY_PORT,
+) -> list[IdentifiedInverter]:
+    """Search the inverters on local network and identify all of them concurrently."""
+    discovered = await async_search_inverters(window, address, port)
+    results = await asyncio.gather(
+        *(async_identify_inverter(found.host) for found in discovered),
+        return_exceptions=True,
+    )
+    identified: list[IdentifiedInverter] = []
+    for found, result in zip(discovered, results, strict=True):
+        if isinstance(result, BaseException):
+            _LOGGER.debug("Discovered inverter %s not identified: %s", found, result)
+        else:
+            identified.append(IdentifiedInverter(found, *result))
+    return identified
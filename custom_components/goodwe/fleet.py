@@ -0,0 +1,183 @@
+"""Fleet of the Goodwe inverters configured in Home Assistant."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from ipaddress import ip_network
+import logging
+from math import inf
+from typing import TYPE_CHECKING, Any
+
+from goodwe import Inverter
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from .coordinator import GoodweUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_FLEET = f"{DOMAIN}_fleet"
+
+# Max number of requests awaiting the inverters of the same network segment
+_SEGMENT_CONCURRENCY = 2
+# Inverters of the same /24 (IPv4) network are expected to share the same Wi-Fi
+_SEGMENT_PREFIX = 24
+
+
+def network_segment(host: str) -> str:
+    """Answer the network segment of the inverter host (host itself for names)."""
+    try:
+        return str(ip_network(f"{host}/{_SEGMENT_PREFIX}", strict=False))
+    except ValueError:
+        return host
+
+
+@callback
+def async_get_fleet(hass: HomeAssistant) -> GoodweFleet:
+    """Answer the (domain wide) fleet of inverters."""
+    if (fleet := hass.data.get(DATA_FLEET)) is None:
+        fleet = hass.data[DATA_FLEET] = GoodweFleet(hass)
+    return fleet
+
+
+class GoodweFleet:
+    """Coordinates the polling of all the inverters and aggregates their values.
+
+    Polls of the inverters are staggered across the polling interval,
+    the requests to inverters of the same network segment are capped
+    and the fleet totals are computed from the coordinators data.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the fleet."""
+        self._hass = hass
+        self._coordinators: dict[str, GoodweUpdateCoordinator] = {}
+        self._limiters: dict[str, asyncio.Semaphore] = {}
+        self._listeners: list[CALLBACK_TYPE] = []
+        self._next_poll_slot: float = -inf
+        self._sensors_owner: str | None = None
+
+    @property
+    def coordinators(self) -> list[GoodweUpdateCoordinator]:
+        """Answer the coordinators of all the inverters."""
+        return list(self._coordinators.values())
+
+    def segment_limiter(self, host: str) -> asyncio.Semaphore:
+        """Answer the limiter of concurrent requests to the host network segment."""
+        segment = network_segment(host)
+        if (limiter := self._limiters.get(segment)) is None:
+            limiter = self._limiters[segment] = asyncio.Semaphore(_SEGMENT_CONCURRENCY)
+        return limiter
+
+    @callback
+    def async_register(
+        self, entry: ConfigEntry, coordinator: GoodweUpdateCoordinator
+    ) -> CALLBACK_TYPE:
+        """Register the inverter coordinator, answer the unregister callback."""
+        self._coordinators[entry.entry_id] = coordinator
+        remove_listener = coordinator.async_add_listener(self._async_update_listeners)
+
+        @callback
+        def _unregister() -> None:
+            # The fleet sensors stay reserved for the entry (e.g. being reloaded)
+            remove_listener()
+            self._coordinators.pop(entry.entry_id, None)
+            self._async_update_listeners()
+
+        return _unregister
+
+    @callback
+    def async_claim_sensors(self, entry: ConfigEntry) -> bool:
+        """Answer if the entry should create the fleet sensors.
+
+        Fleet sensors are created (once) only if there are more inverters,
+        by the entry which created them before unless it was disabled since.
+        """
+        if self._sensors_owner not in (None, entry.entry_id) and (
+            (owner := self._hass.config_entries.async_get_entry(self._sensors_owner))
+            is not None
+            and owner.disabled_by is None
+        ):
+            return False
+        if (
+            len(
+                self._hass.config_entries.async_entries(
+                    DOMAIN, include_ignore=False, include_disabled=False
+                )
+            )
+            < 2
+        ):
+            return False
+        self._sensors_owner = entry.entry_id
+        return True
+
+    @callback
+    def async_release_sensors(self, entry: ConfigEntry) -> None:
+        """Hand the fleet sensors of the removed entry over to other inverter entry."""
+        if self._sensors_owner != entry.entry_id:
+            return
+        self._sensors_owner = None
+        for other in self._hass.config_entries.async_loaded_entries(DOMAIN):
+            if other.entry_id != entry.entry_id:
+                self._hass.config_entries.async_schedule_reload(other.entry_id)
+                break
+
+    async def async_wait_poll_slot(self, interval: float) -> None:
+        """Wait for the next free poll slot.
+
+        Slots are spread evenly across the (shortest) polling interval of the
+        fleet, so polls of the inverters started at the same time drift apart
+        in phase. Inverters polled less often (e.g. backed off) do not slow down
+        the others, the wait is capped by the caller's own share of its interval.
+        """
+        if (count := len(self._coordinators)) < 2:
+            return
+        base = min(
+            (
+                coordinator.update_interval.total_seconds()
+                for coordinator in self._coordinators.values()
+                if coordinator.update_interval
+            ),
+            default=interval,
+        )
+        now = self._hass.loop.time()
+        start = max(now, self._next_poll_slot)
+        self._next_poll_slot = start + base / count
+        if (delay := min(start - now, interval / count)) > 0:
+            _LOGGER.debug("Delaying inverter poll by %.2fs", delay)
+            await asyncio.sleep(delay)
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> CALLBACK_TYPE:
+        """Listen for updates of any inverter data, answer the remove callback."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def _remove_listener() -> None:
+            self._listeners.remove(update_callback)
+
+        return _remove_listener
+
+    @callback
+    def _async_update_listeners(self) -> None:
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    def total(self, value: Callable[[Inverter, dict[str, Any]], Any]) -> float | None:
+        """Answer the total of the value of all the (responding) inverters.
+
+        Answer None if the value is not available from any inverter.
+        """
+        values = [
+            val
+            for coordinator in self._coordinators.values()
+            if coordinator.last_update_success and coordinator.data
+            if isinstance(
+                val := value(coordinator.inverter, coordinator.data), (int, float)
+            )
+        ]
+        return sum(values) if values else None
@@ -0,0 +1,125 @@
+"""Instrumentation of the requests sent by the Goodwe inverter (library)."""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any
+
+from goodwe import Inverter
+from goodwe.protocol import InverterProtocol, ProtocolCommand, ProtocolResponse
+
+_LOGGER = logging.getLogger(__name__)
+
+# Library internals wrapped by the instrumentation
+_INVERTER_HOOKS = ("_read_from_socket", "_map_response", "_protocol")
+_PROTOCOL_HOOKS = ("_send_request", "_retry", "timeout", "retries")
+
+
+class RequestObserver:
+    """Observer of the inverter requests, all the hooks are optional."""
+
+    def request_started(
+        self, protocol: InverterProtocol, command: ProtocolCommand
+    ) -> None:
+        """Request is about to be sent, the protocol timeout/retries may be set."""
+
+    def request_retried(self, command: ProtocolCommand) -> None:
+        """Request is sent again (its previous attempt timed out)."""
+
+    def request_answered(
+        self,
+        command: ProtocolCommand,
+        response: ProtocolResponse,
+        elapsed: float,
+        retried: bool,
+    ) -> None:
+        """Request was answered after elapsed (s)."""
+
+    def request_failed(
+        self, command: ProtocolCommand, err: Exception, elapsed: float
+    ) -> None:
+        """Request failed after elapsed (s)."""
+
+    def response_decoded(self, elapsed: float) -> None:
+        """Response was decoded in elapsed (s)."""
+
+
+class RequestInstrumentation:
+    """Single instrumentation of the inverter internals shared by the observers.
+
+    The inverter socket reads, response decoding and protocol sends are wrapped
+    just once and the observers are notified in the order they were added.
+    When the library internals are not found (e.g. changed by an upgrade),
+    the inverter is not instrumented and the observers are never notified.
+    """
+
+    def __init__(self, inverter: Inverter) -> None:
+        """Initialize the instrumentation and wrap the inverter internals."""
+        self._observers: list[RequestObserver] = []
+        self.active = _has_hooks(inverter)
+        if self.active:
+            self._instrument(inverter)
+        else:
+            _LOGGER.warning(
+                "Inverter requests can not be instrumented, "
+                "polling metrics and adaptive timeout are not available"
+            )
+
+    def add_observer(self, observer: RequestObserver) -> None:
+        """Notify the observer of the inverter requests."""
+        self._observers.append(observer)
+
+    def _instrument(self, inverter: Inverter) -> None:
+        """Wrap the inverter socket reads, response decoding and protocol sends."""
+        # pylint: disable=protected-access
+        read_from_socket = inverter._read_from_socket
+        map_response = inverter._map_response
+        protocol = inverter._protocol
+        send_request = protocol._send_request
+        retried = False
+
+        async def _read_from_socket(command):
+            nonlocal retried
+            for observer in self._observers:
+                observer.request_started(protocol, command)
+            retried = False
+            start = time.perf_counter()
+            try:
+                response = await read_from_socket(command)
+            except Exception as err:
+                for observer in self._observers:
+                    observer.request_failed(command, err, time.perf_counter() - start)
+                raise
+            elapsed = time.perf_counter() - start
+            for observer in self._observers:
+                observer.request_answered(command, response, elapsed, retried)
+            return response
+
+        def _map_response(response, sensors):
+            start = time.perf_counter()
+            try:
+                return map_response(response, sensors)
+            finally:
+                for observer in self._observers:
+                    observer.response_decoded(time.perf_counter() - start)
+
+        def _send_request(command, response_future):
+            nonlocal retried
+            if protocol._retry > 0:
+                retried = True
+                for observer in self._observers:
+                    observer.request_retried(command)
+            send_request(command, response_future)
+
+        inverter._read_from_socket = _read_from_socket
+        inverter._map_response = _map_response
+        protocol._send_request = _send_request
+
+
+def _has_hooks(inverter: Any) -> bool:
+    """Answer if the inverter has all the internals wrapped by the instrumentation."""
+    return all(hasattr(inverter, name) for name in _INVERTER_HOOKS) and all(
+        hasattr(inverter._protocol, name)  # pylint: disable=protected-access
+        for name in _PROTOCOL_HOOKS
+    )
@@ -0,0 +1,59 @@
+"""Index of the loaded Goodwe inverters."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from .coordinator import GoodweRuntimeData
+
+DATA_INVERTERS = f"{DOMAIN}_inverters"
+
+
+@callback
+def async_get_inverter_index(hass: HomeAssistant) -> InverterIndex:
+    """Answer the (domain wide) index of the loaded inverters."""
+    if (index := hass.data.get(DATA_INVERTERS)) is None:
+        index = hass.data[DATA_INVERTERS] = InverterIndex()
+    return index
+
+
+class InverterIndex:
+    """Runtime data of the loaded inverters by their device id and serial number.
+
+    The index is kept current by the config entries setup and unload,
+    so the services resolve their targets without scanning all the entries.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the index."""
+        self._by_device_id: dict[str, GoodweRuntimeData] = {}
+        self._by_serial_number: dict[str, GoodweRuntimeData] = {}
+
+    @callback
+    def async_add(
+        self, device_id: str, runtime_data: GoodweRuntimeData
+    ) -> CALLBACK_TYPE:
+        """Add the inverter of the device, answer the remove callback."""
+        serial_number = runtime_data.inverter.serial_number
+        self._by_device_id[device_id] = runtime_data
+        self._by_serial_number[serial_number] = runtime_data
+
+        @callback
+        def _remove() -> None:
+            self._by_device_id.pop(device_id, None)
+            self._by_serial_number.pop(serial_number, None)
+
+        return _remove
+
+    def by_device_id(self, device_id: str) -> GoodweRuntimeData | None:
+        """Answer the runtime data of the inverter device (None if not loaded)."""
+        return self._by_device_id.get(device_id)
+
+    def by_serial_number(self, serial_number: str) -> GoodweRuntimeData | None:
+        """Answer the runtime data of the inverter serial number (None if not loaded)."""
+        return self._by_serial_number.get(serial_number)
@@ -0,0 +1,146 @@
+"""Performance metrics of the Goodwe inverter polling."""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields
+import math
+import time
+from typing import Any
+
+from goodwe import RequestFailedException
+from goodwe.protocol import ProtocolCommand, ProtocolResponse
+
+from .instrumentation import RequestInstrumentation, RequestObserver
+
+# Number of update cycles kept in the metrics history
+HISTORY_SIZE = 100
+
+
+@dataclass(slots=True)
+class CycleMetrics:
+    """Metrics of single update cycle (of all the requests sent during it)."""
+
+    duration_ms: float = 0
+    requests: int = 0
+    round_trip_ms: float = 0
+    retries: int = 0
+    timeouts: int = 0
+    decode_ms: float = 0
+    bytes_received: int = 0
+    failure_streak: int = 0
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    """Answer the percentile (nearest rank) of the sorted values."""
+    return values[max(math.ceil(len(values) * pct / 100) - 1, 0)]
+
+
+class InverterMetrics(RequestObserver):
+    """Collects the metrics of the inverter requests per update cycle.
+
+    The instrumented inverter requests are observed to measure their
+    round-trip time, retries, timeouts, received bytes and decoding time.
+    Metrics of the last cycles are kept in fixed-size ring buffer.
+    """
+
+    def __init__(
+        self, instrumentation: RequestInstrumentation, size: int = HISTORY_SIZE
+    ) -> None:
+        """Initialize the metrics and observe the inverter requests."""
+        self.history: deque[CycleMetrics] = deque(maxlen=size)
+        self._cycle = CycleMetrics()
+        self._cycle_start: float | None = None
+        instrumentation.add_observer(self)
+
+    @property
+    def last(self) -> CycleMetrics | None:
+        """Answer the metrics of the last finished cycle."""
+        return self.history[-1] if self.history else None
+
+    def start_cycle(self) -> None:
+        """Start collecting metrics of new update cycle."""
+        self._cycle = CycleMetrics()
+        self._cycle_start = time.perf_counter()
+
+    def end_cycle(self, failed: bool) -> CycleMetrics:
+        """Finish the update cycle and store its metrics."""
+        cycle = self._cycle
+        if self._cycle_start is not None:
+            cycle.duration_ms = (time.perf_counter() - self._cycle_start) * 1000
+        if cycle.requests:
+            # Average round-trip time of the cycle requests
+            cycle.round_trip_ms /= cycle.requests
+        last = self.last
+        cycle.failure_streak = (last.failure_streak + 1 if last else 1) if failed else 0
+        self.history.append(cycle)
+        self._cycle = CycleMetrics()
+        self._cycle_start = None
+        return cycle
+
+    @contextmanager
+    def measure_decode(self) -> Iterator[None]:
+        """Add the time spent in the block to decoding time of current cycle."""
+        cycle = self._cycle
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            cycle.decode_ms += (time.perf_counter() - start) * 1000
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Answer min/avg/max/p95 of the metrics of the cycles in history."""
+        if not self.history:
+            return {}
+        summary: dict[str, dict[str, float]] = {}
+        for field in fields(CycleMetrics):
+            values = sorted(getattr(cycle, field.name) for cycle in self.history)
+            summary[field.name] = {
+                "min": round(values[0], 3),
+                "avg": round(sum(values) / len(values), 3),
+                "max": round(values[-1], 3),
+                "p95": round(_percentile(values, 95), 3),
+            }
+        return summary
+
+    def as_dict(self) -> dict[str, Any]:
+        """Answer the summary and last cycle metrics (for diagnostics)."""
+        last = self.last
+        return {
+            "cycles": len(self.history),
+            "last": asdict(last) if last else None,
+            "summary": self.summary(),
+        }
+
+    def request_answered(
+        self,
+        command: ProtocolCommand,
+        response: ProtocolResponse,
+        elapsed: float,
+        retried: bool,
+    ) -> None:
+        """Add the answered request to the current cycle."""
+        cycle = self._cycle
+        cycle.requests += 1
+        cycle.round_trip_ms += elapsed * 1000
+        cycle.bytes_received += len(response.response_data())
+
+    def request_failed(
+        self, command: ProtocolCommand, err: Exception, elapsed: float
+    ) -> None:
+        """Add the failed request to the current cycle."""
+        cycle = self._cycle
+        cycle.requests += 1
+        cycle.round_trip_ms += elapsed * 1000
+        if isinstance(err, RequestFailedException):
+            cycle.timeouts += 1
+
+    def request_retried(self, command: ProtocolCommand) -> None:
+        """Add the retry to the current cycle."""
+        self._cycle.retries += 1
+
+    def response_decoded(self, elapsed: float) -> None:
+        """Add the decoding time to the current cycle."""
+        self._cycle.decode_ms += elapsed * 1000
@@ -5,20 +5,25 @@ from __future__ import annotations
 from collections.abc import Awaitable, Callable
 from dataclasses import dataclass
 import logging
+from typing import Any
 
-from goodwe import Inverter, InverterError
+from goodwe import Inverter
 from homeassistant.components.number import (
     NumberDeviceClass,
     NumberEntity,
     NumberEntityDescription,
 )
-from homeassistant.const import PERCENTAGE, EntityCategory, UnitOfPower
-from homeassistant.core import HomeAssistant
+from homeassistant.const import PERCENTAGE, EntityCategory, Platform, UnitOfPower
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 
-from .const import DOMAIN
+from .blueprint import model_blueprint
+from .const import DOMAIN, SIGNAL_SETTINGS_UPDATED
 from .coordinator import GoodweConfigEntry
+from .scheduler import InverterScheduler, RequestPriority
+from .writes import InverterWriteQueue
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -31,11 +36,12 @@ class GoodweNumberEntityDescription(NumberEntityDescription):
     mapper: Callable[[any], int]
     setter: Callable[[Inverter, int], Awaitable[None]]
     filter: Callable[[Inverter], bool]
+    setting: str | None = None
 
 
 def _get_setting_unit(inverter: Inverter, setting: str) -> str:
     """Return the unit of an inverter setting."""
-    return next((s.unit for s in inverter.settings() if s.id_ == setting), "")
+    return model_blueprint(inverter).setting_units.get(setting, "")
 
 
 async def set_offline_battery_dod(inverter: Inverter, dod: int) -> None:
@@ -44,11 +50,6 @@ async def set_offline_battery_dod(inverter: Inverter, dod: int) -> None:
         await inverter.write_setting("battery_discharge_depth_offline", 100 - dod)
 
 
-async def get_offline_battery_dod(inverter: Inverter) -> int:
-    """Returns offline battery dod - dod for backup output."""
-    return 100 - (await inverter.read_setting("battery_discharge_depth_offline"))
-
-
 NUMBERS = (
     # Only one of the export limits are added.
     # Availability is checked in the filter method.
@@ -65,6 +66,7 @@ NUMBERS = (
         mapper=lambda v: v,
         setter=lambda inv, val: inv.set_grid_export_limit(val),
         filter=lambda inv: _get_setting_unit(inv, "grid_export_limit") != "%",
+        setting="grid_export_limit",
     ),
     # Export limit in %
     GoodweNumberEntityDescription(
@@ -79,6 +81,7 @@ NUMBERS = (
         mapper=lambda v: v,
         setter=lambda inv, val: inv.set_grid_export_limit(val),
         filter=lambda inv: _get_setting_unit(inv, "grid_export_limit") == "%",
+        setting="grid_export_limit",
     ),
     GoodweNumberEntityDescription(
         key="battery_discharge_depth",
@@ -105,6 +108,7 @@ NUMBERS = (
         mapper=lambda v: v,
         setter=lambda inv, val: inv.write_setting("soc_upper_limit", val),
         filter=lambda inv: True,
+        setting="soc_upper_limit",
     ),
     GoodweNumberEntityDescription(
         key="battery_discharge_depth_offline",
@@ -114,10 +118,11 @@ NUMBERS = (
         native_step=1,
         native_min_value=0,
         native_max_value=99,
-        getter=lambda inv: get_offline_battery_dod(inv),
-        mapper=lambda v: v,
+        getter=lambda inv: inv.read_setting("battery_discharge_depth_offline"),
+        mapper=lambda v: 100 - v,
         setter=lambda inv, val: set_offline_battery_dod(inv, val),
         filter=lambda inv: True,
+        setting="battery_discharge_depth_offline",
     ),
     GoodweNumberEntityDescription(
         key="eco_mode_power",
@@ -131,6 +136,7 @@ NUMBERS = (
         mapper=lambda v: abs(v.get_power()) if v.get_power() else 0,
         setter=None,
         filter=lambda inv: True,
+        setting="eco_mode_1",
     ),
     GoodweNumberEntityDescription(
         key="eco_mode_soc",
@@ -144,6 +150,7 @@ NUMBERS = (
         mapper=lambda v: v.soc or 0,
         setter=None,
         filter=lambda inv: True,
+        setting="eco_mode_1",
     ),
     GoodweNumberEntityDescription(
         key="fast_charging_power",
@@ -156,6 +163,7 @@ NUMBERS = (
         mapper=lambda v: v,
         setter=lambda inv, val: inv.write_setting("fast_charging_power", val),
         filter=lambda inv: True,
+        setting="fast_charging_power",
     ),
     GoodweNumberEntityDescription(
         key="fast_charging_soc",
@@ -168,6 +176,7 @@ NUMBERS = (
         mapper=lambda v: v,
         setter=lambda inv, val: inv.write_setting("fast_charging_soc", val),
         filter=lambda inv: True,
+        setting="fast_charging_soc",
     ),
     GoodweNumberEntityDescription(
         key="ems_power_limit",
@@ -181,6 +190,7 @@ NUMBERS = (
         mapper=lambda v: v,
         setter=lambda inv, val: inv.write_setting("ems_power_limit", val),
         filter=lambda inv: True,
+        setting="ems_power_limit",
     ),
     GoodweNumberEntityDescription(
         key="battery_soc_protection",
@@ -195,6 +205,7 @@ NUMBERS = (
         mapper=lambda v: v,
         setter=lambda inv, val: inv.write_setting("battery_soc_protection", val),
         filter=lambda inv: True,
+        setting="battery_soc_protection",
     ),
 )
 
@@ -207,18 +218,27 @@ async def async_setup_entry(
     """Set up the inverter select entities from a config entry."""
     inverter = config_entry.runtime_data.inverter
     device_info = config_entry.runtime_data.device_info
+    settings = config_entry.runtime_data.settings
+    scheduler = config_entry.runtime_data.coordinator.scheduler
+    writes = config_entry.runtime_data.writes
 
     entities = []
 
     for description in filter(lambda dsc: dsc.filter(inverter), NUMBERS):
-        try:
-            current_value = description.mapper(await description.getter(inverter))
-        except (InverterError, ValueError):
+        probe_key = description.setting or description.key
+        if probe_key not in settings:
             # Inverter model does not support this setting
+            _LOGGER.debug("Inverter setting %s not supported", description.key)
+            continue
+        try:
+            current_value = description.mapper(settings[probe_key])
+        except (TypeError, ValueError):
             _LOGGER.debug("Could not read inverter setting %s", description.key)
             continue
 
-        entity = InverterNumberEntity(device_info, description, inverter, current_value)
+        entity = InverterNumberEntity(
+            device_info, description, inverter, scheduler, writes, current_value
+        )
         # Set the max value of grid_export_limit and ems_power_limit (W version)
         if (
             description.key in ("grid_export_limit", "ems_power_limit")
@@ -244,6 +264,8 @@ class InverterNumberEntity(NumberEntity):
         device_info: DeviceInfo,
         description: GoodweNumberEntityDescription,
         inverter: Inverter,
+        scheduler: InverterScheduler,
+        writes: InverterWriteQueue,
         current_value: int,
     ) -> None:
         """Initialize the number inverter setting entity."""
@@ -252,15 +274,39 @@ class InverterNumberEntity(NumberEntity):
         self._attr_device_info = device_info
         self._attr_native_value = float(current_value)
         self._inverter: Inverter = inverter
+        self._scheduler: InverterScheduler = scheduler
+        self._writes: InverterWriteQueue = writes
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the settings written by the schedule."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_SETTINGS_UPDATED.format(self._inverter.serial_number),
+                self._async_settings_updated,
+            )
+        )
+
+    @callback
+    def _async_settings_updated(self, values: dict[str, Any]) -> None:
+        if (value := values.get(self.entity_description.key)) is not None:
+            self._attr_native_value = float(value)
+            self.async_write_ha_state()
 
     async def async_update(self) -> None:
         """Get the current value from inverter."""
-        value = await self.entity_description.getter(self._inverter)
-        self._attr_native_value = float(value)
+        value = await self._scheduler.async_request(
+            self.entity_description.getter,
+            RequestPriority.INTERACTIVE,
+            key=(Platform.NUMBER, self.entity_description.key),
+        )
+        self._attr_native_value = float(self.entity_description.mapper(value))
 
     async def async_set_native_value(self, value: float) -> None:
         """Set new value to inverter."""
-        if self.entity_description.setter:
-            await self.entity_description.setter(self._inverter, int(value))
+        if setter := self.entity_description.setter:
+            await self._writes.async_write(
+                self.entity_description.key, lambda inv: setter(inv, int(value))
+            )
         self._attr_native_value = value
         self.async_write_ha_state()
@@ -0,0 +1,260 @@
+"""Bulk reads and writes of the inverter parameters (settings)."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from functools import partial
+import logging
+from typing import Any
+
+from goodwe import Inverter, InverterError, Sensor
+from goodwe.exceptions import RequestRejectedException
+from homeassistant.exceptions import HomeAssistantError
+
+from .registers import (
+    MAX_READ_REGISTERS,
+    async_read_register_range,
+    async_read_registers,
+    async_write_registers,
+    plan_register_ranges,
+    register_count,
+    supports_register_reads,
+)
+from .scheduler import InverterScheduler, RequestPriority
+
+_LOGGER = logging.getLogger(__name__)
+
+# Max number of registers written by single command (modbus limit)
+_MAX_WRITE_REGISTERS = 123
+# Prefix of the parameters addressing raw modbus register (e.g. modbus-47511)
+_MODBUS_PREFIX = "modbus-"
+
+
+@dataclass(frozen=True)
+class _RegisterWrite:
+    """Write of the parameter registers, new value is encoded from the current one."""
+
+    parameter: str
+    offset: int
+    count: int
+    encode: Callable[[bytes], bytes]
+
+
+async def async_read_parameters(
+    inverter: Inverter, scheduler: InverterScheduler, parameters: Iterable[str]
+) -> dict[str, Any]:
+    """Read the parameters in as few requests as possible, answer their values.
+
+    Settings in adjacent registers are read by single (multi-register) command.
+    Raise ValueError for unknown parameter, InverterError when it could not be read.
+    """
+    parameters = list(dict.fromkeys(parameters))
+    values: dict[str, Any] = {}
+    if supports_register_reads(inverter):
+        for register_range in plan_register_ranges(
+            s for s in inverter.settings() if s.id_ in parameters
+        ):
+            try:
+                values.update(
+                    await scheduler.async_request(
+                        lambda inv, r=register_range: async_read_register_range(inv, r),
+                        RequestPriority.INTERACTIVE,
+                        key=("registers", register_range.offset, register_range.count),
+                    )
+                )
+            except RequestRejectedException:
+                # Some of the registers are not supported, read them one by one
+                _LOGGER.debug("Parameters %s read rejected", register_range.sensors)
+    for parameter in parameters:
+        if parameter not in values:
+            values[parameter] = await scheduler.async_request(
+                lambda inv, p=parameter: inv.read_setting(p),
+                RequestPriority.INTERACTIVE,
+                key=("setting", parameter),
+            )
+    return {parameter: values[parameter] for parameter in parameters}
+
+
+async def async_write_parameters(
+    inverter: Inverter, scheduler: InverterScheduler, parameters: dict[str, Any]
+) -> None:
+    """Write all the parameters or none of them.
+
+    All the values are encoded before anything is written, settings in adjacent
+    registers are written by single (multi-register) command and all the written
+    registers are read back. When any write or its verification fails, the already
+    written registers are restored to their original values.
+    Raise ValueError for unknown parameter or invalid value, HomeAssistantError
+    when the parameters could not be written.
+    """
+    if supports_register_reads(inverter):
+        action = partial(
+            _async_write_registers, writes=_plan_register_writes(inverter, parameters)
+        )
+    else:
+        action = partial(_async_write_settings, parameters=parameters)
+    await scheduler.async_request(action, RequestPriority.WRITE)
+
+
+def _setting_encoder(setting: Sensor, value: Any) -> Callable[[bytes], bytes]:
+    if setting.size_ == 1:
+        # Single byte setting, the other byte of the register is kept
+        return lambda current: setting.encode_value(value, current)
+    return lambda _: setting.encode_value(value)
+
+
+def _register_encoder(value: Any) -> Callable[[bytes], bytes]:
+    return lambda _: int(value).to_bytes(2, byteorder="big", signed=True)
+
+
+def _plan_register_writes(
+    inverter: Inverter, parameters: dict[str, Any]
+) -> list[_RegisterWrite]:
+    """Answer the register writes of the parameters, raise ValueError if invalid."""
+    settings = {s.id_: s for s in inverter.settings()}
+    writes: list[_RegisterWrite] = []
+    for parameter, value in parameters.items():
+        if (setting := settings.get(parameter)) is not None:
+            write = _RegisterWrite(
+                parameter,
+                setting.offset,
+                register_count(setting),
+                _setting_encoder(setting, value),
+            )
+        elif parameter.startswith(_MODBUS_PREFIX) and parameter[7:].isdigit():
+            write = _RegisterWrite(
+                parameter, int(parameter[7:]), 1, _register_encoder(value)
+            )
+        else:
+            raise ValueError(f'Unknown setting "{parameter}"')
+        try:
+            encoded = write.encode(bytes(write.count * 2))
+        except (TypeError, ValueError, OverflowError) as err:
+            raise ValueError(f'Invalid value "{value}" of "{parameter}"') from err
+        if len(encoded) != write.count * 2:
+            raise ValueError(f'Invalid value "{value}" of "{parameter}"')
+        writes.append(write)
+    return writes
+
+
+async def _async_read_raw(
+    inverter: Inverter, registers: Iterable[int]
+) -> dict[int, bytes]:
+    """Read the registers in as few commands as possible, answer their raw values.
+
+    Only adjacent registers are read together, the registers in between
+    the parameters may not be supported (and the read rejected).
+    """
+    raw: dict[int, bytes] = {}
+    for offset, count in _spans(sorted(set(registers)), 0, MAX_READ_REGISTERS):
+        data = (await async_read_registers(inverter, offset, count)).response_data()
+        for index in range(count):
+            raw[offset + index] = bytes(data[index * 2 : index * 2 + 2])
+    return raw
+
+
+def _spans(registers: list[int], max_gap: int, max_count: int) -> list[tuple[int, int]]:
+    """Group the sorted registers into (offset, count) spans."""
+    spans: list[tuple[int, int]] = []
+    for register in registers:
+        if spans:
+            offset, count = spans[-1]
+            if register - (offset + count) <= max_gap and register - offset < max_count:
+                spans[-1] = (offset, register - offset + 1)
+                continue
+        spans.append((register, 1))
+    return spans
+
+
+async def _async_write_blocks(inverter: Inverter, raw: dict[int, bytes]) -> None:
+    """Write the registers, the adjacent ones by single command."""
+    for offset, count in _spans(sorted(raw), 0, _MAX_WRITE_REGISTERS):
+        await async_write_registers(
+            inverter, offset, b"".join(raw[offset + i] for i in range(count))
+        )
+
+
+async def _async_write_registers(
+    inverter: Inverter, writes: list[_RegisterWrite]
+) -> None:
+    """Write the registers of the parameters, verify them and restore them on failure."""
+    registers = [w.offset + i for w in writes for i in range(w.count)]
+    try:
+        original = await _async_read_raw(inverter, registers)
+    except InverterError as err:
+        raise HomeAssistantError(f"Failed to read inverter parameters: {err}") from err
+    # Encode on top of the current values (settings may share a register)
+    target = dict(original)
+    for write in writes:
+        current = b"".join(target[write.offset + i] for i in range(write.count))
+        encoded = write.encode(current)
+        for index in range(write.count):
+            target[write.offset + index] = encoded[index * 2 : index * 2 + 2]
+    changed = {r: target[r] for r in registers if target[r] != original[r]}
+    if not changed:
+        return
+
+    try:
+        await _async_write_blocks(inverter, changed)
+        actual = await _async_read_raw(inverter, changed)
+        if failed := sorted(
+            {
+                w.parameter
+                for w in writes
+                for r in range(w.offset, w.offset + w.count)
+                if r in changed and actual[r] != changed[r]
+            }
+        ):
+            raise HomeAssistantError(f"Inverter did not accept values of {failed}")
+    except (InverterError, HomeAssistantError) as err:
+        # Failed write may still have reached the inverter, restore all of them
+        await _async_restore(inverter, {r: original[r] for r in changed})
+        if isinstance(err, HomeAssistantError):
+            raise
+        raise HomeAssistantError(f"Failed to write inverter parameters: {err}") from err
+
+
+async def _async_restore(inverter: Inverter, original: dict[int, bytes]) -> None:
+    """Write back the original values of the registers (best effort)."""
+    _LOGGER.debug("Restoring inverter registers %s", sorted(original))
+    try:
+        await _async_write_blocks(inverter, original)
+    except InverterError as err:
+        _LOGGER.warning("Failed to restore inverter parameters: %s", err)
+
+
+async def _async_write_settings(inverter: Inverter, parameters: dict[str, Any]) -> None:
+    """Write the settings one by one, verify them and restore them on failure."""
+    try:
+        original = {p: await inverter.read_setting(p) for p in parameters}
+    except InverterError as err:
+        raise HomeAssistantError(f"Failed to read inverter parameters: {err}") from err
+    written: list[str] = []
+    try:
+        for parameter, value in parameters.items():
+            written.append(parameter)
+            await inverter.write_setting(parameter, value)
+        if failed := [
+            p
+            for p, v in parameters.items()
+            if not _same(await inverter.read_setting(p), v)
+        ]:
+            raise HomeAssistantError(f"Inverter did not accept values of {failed}")
+    except (InverterError, HomeAssistantError) as err:
+        for parameter in reversed(written):
+            try:
+                await inverter.write_setting(parameter, original[parameter])
+            except InverterError as restore_err:
+                _LOGGER.warning("Failed to restore %s: %s", parameter, restore_err)
+        if isinstance(err, HomeAssistantError):
+            raise
+        raise HomeAssistantError(f"Failed to write inverter parameters: {err}") from err
+
+
+def _same(actual: Any, expected: Any) -> bool:
+    """Answer if the value read back equals the (maybe differently typed) written one."""
+    try:
+        return float(actual) == float(expected)
+    except (TypeError, ValueError):
+        return actual == expected
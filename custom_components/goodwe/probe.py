@@ -0,0 +1,150 @@
+"""Setup time probe of the inverter settings supported by the entity platforms."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable, Mapping
+import logging
+from math import inf
+from typing import Any
+
+from goodwe import Inverter, InverterError
+from goodwe.exceptions import RequestRejectedException
+
+from .button import BUTTONS
+from .number import NUMBERS
+from .registers import (
+    RegisterRange,
+    async_read_register_range,
+    plan_register_ranges,
+    supports_register_reads,
+)
+from .scheduler import InverterScheduler, RequestPriority
+from .select import (
+    EMS_MODE,
+    MODE_TO_OPTION,
+    OPERATION_MODE,
+    SUPPORTED_MODES,
+    async_read_supported_modes,
+)
+from .switch import SWITCHES
+
+_LOGGER = logging.getLogger(__name__)
+
+# Max number of probe requests awaiting the inverter at the same time
+_PROBE_CONCURRENCY = 4
+
+type SettingReader = Callable[[Inverter], Awaitable[Any]]
+
+
+def platform_probes() -> tuple[set[str], dict[str, SettingReader]]:
+    """Answer the settings (and custom readers) needed by the entity platforms.
+
+    Plain settings are read by their id, values which need inverter family
+    specific logic are read by custom readers stored under the entity key.
+    """
+    settings = {description.setting for description in BUTTONS}
+    settings.update(description.setting for description in SWITCHES)
+    settings.update(
+        description.setting for description in NUMBERS if description.setting
+    )
+    settings.add("eco_mode_1")
+    readers: dict[str, SettingReader] = {
+        description.key: description.getter
+        for description in NUMBERS
+        if not description.setting
+    }
+    readers[OPERATION_MODE.key] = lambda inv: inv.get_operation_mode()
+    readers[EMS_MODE.key] = lambda inv: inv.get_ems_mode()
+    readers[SUPPORTED_MODES] = async_read_supported_modes
+    return settings, readers
+
+
+async def async_probe_settings(
+    inverter: Inverter,
+    settings: Iterable[str],
+    readers: Mapping[str, SettingReader],
+    scheduler: InverterScheduler | None = None,
+    failed: set[str] | None = None,
+) -> dict[str, Any]:
+    """Read the requested settings and answer the values of the supported ones.
+
+    Settings of modbus based inverters are read in coalesced register ranges,
+    the rest of them (and custom readers) individually with bounded concurrency.
+    Settings (readers) not supported by the inverter (rejected by it) are not
+    present in the result. Settings which could not be read because of failed
+    communication (e.g. timeout) are not present either, they are added to the
+    optional failed set, so the caller can tell them from the unsupported ones.
+    When scheduler is provided, the reads are sent through it as periodic polls.
+    """
+    semaphore = asyncio.Semaphore(_PROBE_CONCURRENCY)
+    result: dict[str, Any] = {}
+
+    async def _request(reader: SettingReader) -> Any:
+        if scheduler is None:
+            return await reader(inverter)
+        # No deadline, unsent request would be mistaken for unsupported setting
+        return await scheduler.async_request(reader, RequestPriority.POLL, deadline=inf)
+
+    async def _read(key: str, reader: SettingReader) -> None:
+        async with semaphore:
+            try:
+                result[key] = await _request(reader)
+            except (RequestRejectedException, ValueError):
+                # Inverter model does not support this setting
+                _LOGGER.debug("Inverter setting %s not supported", key)
+            except InverterError as err:
+                _LOGGER.debug("Could not read inverter setting %s: %s", key, err)
+                if failed is not None:
+                    failed.add(key)
+
+    async def _read_setting(setting_id: str) -> None:
+        await _read(setting_id, lambda inv: inv.read_setting(setting_id))
+
+    async def _read_range(register_range: RegisterRange) -> None:
+        async with semaphore:
+            try:
+                result.update(
+                    await _request(
+                        lambda inv: async_read_register_range(inv, register_range)
+                    )
+                )
+                return
+            except InverterError:
+                _LOGGER.debug(
+                    "Could not read registers %d-%d, reading settings individually",
+                    register_range.offset,
+                    register_range.offset + register_range.count - 1,
+                )
+        await asyncio.gather(*(_read_setting(s.id_) for s in register_range.sensors))
+
+    tasks = [_read(key, reader) for key, reader in readers.items()]
+    if supports_register_reads(inverter):
+        known = [s for s in inverter.settings() if s.id_ in settings]
+        tasks.extend(_read_range(r) for r in plan_register_ranges(known))
+    else:
+        tasks.extend(_read_setting(setting_id) for setting_id in settings)
+    await asyncio.gather(*tasks)
+
+    _LOGGER.debug("Probed inverter settings: %s", list(result))
+    return result
+
+
+def entity_values(settings: Mapping[str, Any]) -> dict[str, Any]:
+    """Answer the values of the setting entities (by their key) of the probed settings."""
+    values: dict[str, Any] = {
+        description.key: settings[description.setting]
+        for description in SWITCHES
+        if description.setting in settings
+    }
+    for description in NUMBERS:
+        if (probe_key := description.setting or description.key) in settings:
+            try:
+                values[description.key] = description.mapper(settings[probe_key])
+            except (TypeError, ValueError):
+                _LOGGER.debug("Could not map inverter setting %s", probe_key)
+    if (mode := settings.get(OPERATION_MODE.key)) in MODE_TO_OPTION:
+        values[OPERATION_MODE.key] = MODE_TO_OPTION[mode]
+    if (ems_mode := settings.get(EMS_MODE.key)) is not None:
+        values[EMS_MODE.key] = ems_mode.name.lower()
+    return values
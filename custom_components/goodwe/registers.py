@@ -0,0 +1,202 @@
+"""Coalesced modbus register reads for Goodwe inverters."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from contextlib import nullcontext
+from dataclasses import dataclass
+import logging
+from typing import TYPE_CHECKING, Any
+
+from goodwe import Inverter, Sensor
+from goodwe.dt import DT
+from goodwe.et import ET
+from goodwe.protocol import ProtocolResponse
+
+if TYPE_CHECKING:
+    from .metrics import InverterMetrics
+
+_LOGGER = logging.getLogger(__name__)
+
+# Max number of registers requested in single read command
+MAX_READ_REGISTERS = 64
+# Max number of unused registers tolerated between two sensors of the same range
+MAX_REGISTER_GAP = 4
+
+
+@dataclass(frozen=True)
+class RegisterRange:
+    """Continuous range of modbus registers covering one or more sensors/settings."""
+
+    offset: int
+    count: int
+    sensors: tuple[Sensor, ...]
+
+
+def supports_register_reads(inverter: Inverter) -> bool:
+    """Answer if inverter sensors/settings are plain modbus registers readable in ranges.
+
+    The ES family (and its AA55 protocol) uses different addressing of its sensors
+    and some settings, so they have to be read by the library's own commands.
+    """
+    return isinstance(inverter, (ET, DT))
+
+
+class _FootprintTracer:
+    """Fake protocol response recording the bytes read when decoding a sensor."""
+
+    def __init__(self) -> None:
+        self._position: int = 0
+        self.start: int | None = None
+        self.end: int = 0
+
+    def seek(self, address: int) -> None:
+        self._position = address * 2
+
+    def read(self, size: int) -> bytes:
+        if size > 0:
+            if self.start is None or self._position < self.start:
+                self.start = self._position
+            self.end = max(self.end, self._position + size)
+        self._position += size
+        return bytes(size)
+
+
+def register_footprint(sensor: Sensor) -> tuple[int, int] | None:
+    """Answer the (first register, count) of registers needed to decode the sensor.
+
+    Calculated sensors do not declare their registers, so the footprint is
+    recorded by decoding the sensor from fake (zero filled) response.
+    Answer None when the footprint could not be determined.
+    """
+    tracer = _FootprintTracer()
+    try:
+        sensor.read(tracer)
+    except Exception as err:  # noqa: BLE001 # pylint: disable=broad-except
+        # Decoders (e.g. calculated sensors) may fail on zero values in any way,
+        # the registers read before the failure are known
+        _LOGGER.debug("Decoding of sensor %s stopped: %s", sensor.id_, err)
+    start = tracer.start
+    end = tracer.end
+    if sensor.size_:
+        start = min(
+            sensor.offset * 2, start if start is not None else sensor.offset * 2
+        )
+        end = max(end, (sensor.offset + register_count(sensor)) * 2)
+    if start is None:
+        return None
+    return start // 2, (end + 1) // 2 - start // 2
+
+
+def register_count(sensor: Sensor) -> int:
+    """Answer the number of registers of the sensor/setting value."""
+    return (sensor.size_ + (sensor.size_ % 2)) // 2
+
+
+def plan_register_ranges(
+    sensors: Iterable[Sensor],
+    max_gap: int = MAX_REGISTER_GAP,
+    max_count: int = MAX_READ_REGISTERS,
+) -> list[RegisterRange]:
+    """Group the sensors/settings into as few register ranges as possible.
+
+    Sensors which registers could not be determined are left out.
+    """
+    footprints: list[tuple[int, int, Sensor]] = []
+    for sensor in sensors:
+        if (footprint := register_footprint(sensor)) is None:
+            _LOGGER.debug("Unknown registers of sensor %s", sensor.id_)
+            continue
+        footprints.append((footprint[0], footprint[0] + footprint[1], sensor))
+    footprints.sort(key=lambda f: f[0])
+
+    ranges: list[RegisterRange] = []
+    start = end = 0
+    members: list[Sensor] = []
+    for sensor_start, sensor_end, sensor in footprints:
+        if members and (
+            sensor_start - end <= max_gap and max(end, sensor_end) - start <= max_count
+        ):
+            members.append(sensor)
+            end = max(end, sensor_end)
+            continue
+        if members:
+            ranges.append(RegisterRange(start, end - start, tuple(members)))
+        start, end, members = sensor_start, sensor_end, [sensor]
+    if members:
+        ranges.append(RegisterRange(start, end - start, tuple(members)))
+    return ranges
+
+
+def derive_range_values(inverter: Inverter, data: dict[str, Any]) -> dict[str, Any]:
+    """Answer the values the library derives in its full runtime data read.
+
+    Sensors read by register ranges skip the library's post-processing of the
+    runtime data read. The DT family computes house consumption from the meter
+    values only there. The ET post-processing detects the inverter features
+    (battery, meter), those are re-evaluated by the periodic full read.
+    """
+    if isinstance(inverter, DT) and data.get("meter_active_power") is not None:
+        return {
+            "house_consumption": abs(
+                (data.get("ppv") or 0) - data["meter_active_power"]
+            )
+        }
+    return {}
+
+
+async def async_read_registers(
+    inverter: Inverter, offset: int, count: int
+) -> ProtocolResponse:
+    """Read the raw registers with single command.
+
+    Raise InverterError when the registers could not be read.
+    """
+    # pylint: disable=protected-access
+    return await inverter._read_from_socket(inverter._read_command(offset, count))
+
+
+async def async_write_registers(inverter: Inverter, offset: int, data: bytes) -> None:
+    """Write the raw registers with single command.
+
+    Raise InverterError when the registers could not be written.
+    """
+    # pylint: disable=protected-access
+    if len(data) == 2:
+        command = inverter._write_command(
+            offset, int.from_bytes(data, byteorder="big", signed=True)
+        )
+    else:
+        command = inverter._write_multi_command(offset, data)
+    await inverter._read_from_socket(command)
+
+
+def decode_register_range(
+    register_range: RegisterRange, response: ProtocolResponse
+) -> dict[str, Any]:
+    """Decode the sensors/settings of the register range from its response."""
+    values: dict[str, Any] = {}
+    for sensor in register_range.sensors:
+        try:
+            values[sensor.id_] = sensor.read(response)
+        except ValueError:
+            _LOGGER.debug("Could not decode sensor/setting %s", sensor.id_)
+    return values
+
+
+async def async_read_register_range(
+    inverter: Inverter,
+    register_range: RegisterRange,
+    metrics: InverterMetrics | None = None,
+) -> dict[str, Any]:
+    """Read the register range with single command and decode its sensors/settings.
+
+    Raise InverterError when the range could not be read (e.g. some of its
+    registers are not supported by the inverter model).
+    The decoding time is added to the optional metrics.
+    """
+    response = await async_read_registers(
+        inverter, register_range.offset, register_range.count
+    )
+    with metrics.measure_decode() if metrics else nullcontext():
+        return decode_register_range(register_range, response)
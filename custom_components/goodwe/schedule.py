@@ -0,0 +1,369 @@
+"""Time-of-use schedule of the inverter settings."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime, time
+from functools import partial
+import logging
+from typing import Any
+
+from goodwe import Inverter, InverterError, OperationMode
+import voluptuous as vol
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_call_later, async_track_time_change
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import ATTR_END, ATTR_START, DOMAIN, SIGNAL_SETTINGS_UPDATED
+from .number import NUMBERS, GoodweNumberEntityDescription
+from .scheduler import InverterScheduler, RequestPriority
+from .select import EMS_MODE, MODE_TO_OPTION, OPERATION_MODE, OPTION_TO_MODE
+from .writes import InverterWriteQueue
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# Delay (s) of retrying the failed write of the active window settings
+_RETRY_DELAY = 60
+
+ECO_MODE_POWER = "eco_mode_power"
+ECO_MODE_SOC = "eco_mode_soc"
+
+# Numeric settings written by their number entity setters
+_NUMBER_KEYS = {d.key for d in NUMBERS if d.setter is not None}
+# Eco mode power and SoC are written (and read) together with the operation mode
+_ECO_NUMBERS = {d.key: d for d in NUMBERS if d.key in (ECO_MODE_POWER, ECO_MODE_SOC)}
+_MODE_KEYS = {OPERATION_MODE.key, ECO_MODE_POWER, ECO_MODE_SOC}
+_ECO_OPTIONS = {
+    MODE_TO_OPTION[OperationMode.ECO_CHARGE],
+    MODE_TO_OPTION[OperationMode.ECO_DISCHARGE],
+}
+
+_PERCENTAGE = vol.All(vol.Coerce(int), vol.Range(min=0, max=100))
+
+WINDOW_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_START): cv.time,
+        vol.Required(ATTR_END): cv.time,
+        vol.Optional(OPERATION_MODE.key): vol.In(OPTION_TO_MODE),
+        vol.Optional(ECO_MODE_POWER): _PERCENTAGE,
+        vol.Optional(ECO_MODE_SOC): _PERCENTAGE,
+        vol.Optional(EMS_MODE.key): vol.In(EMS_MODE.options),
+        **{vol.Optional(key): vol.Coerce(int) for key in _NUMBER_KEYS},
+    }
+)
+
+
+@dataclass(frozen=True, slots=True)
+class ScheduleWindow:
+    """Daily time window (may span midnight, end excluded) with the target settings."""
+
+    start: time
+    end: time
+    targets: dict[str, Any]
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> ScheduleWindow:
+        """Create the window from its (service or persisted) data."""
+        targets = WINDOW_SCHEMA(data)
+        start = targets.pop(ATTR_START)
+        end = targets.pop(ATTR_END)
+        if start == end:
+            raise vol.Invalid(f"Window {start} - {end} is empty")
+        if not targets:
+            raise vol.Invalid(f"Window {start} - {end} has no target settings")
+        return cls(start, end, targets)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Answer the (JSON compatible) data of the window."""
+        return {
+            ATTR_START: self.start.isoformat(),
+            ATTR_END: self.end.isoformat(),
+            **self.targets,
+        }
+
+    def contains(self, moment: time) -> bool:
+        """Answer if the time of day is within the window."""
+        if self.start < self.end:
+            return self.start <= moment < self.end
+        return moment >= self.start or moment < self.end
+
+
+def schedule_windows(value: Any) -> list[ScheduleWindow]:
+    """Validate the (non overlapping) schedule windows."""
+    windows = [ScheduleWindow.from_dict(data) for data in cv.ensure_list(value)]
+    for index, window in enumerate(windows):
+        for other in windows[index + 1 :]:
+            if window.contains(other.start) or other.contains(window.start):
+                raise vol.Invalid(
+                    f"Window {window.start} - {window.end} overlaps "
+                    f"{other.start} - {other.end}"
+                )
+    return windows
+
+
+def _schedule_store(hass: HomeAssistant, key: str) -> Store[dict[str, Any]]:
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{key}.schedule")
+
+
+async def async_remove_schedule(hass: HomeAssistant, key: str) -> None:
+    """Remove the persisted schedule (of removed config entry)."""
+    await _schedule_store(hass, key).async_remove()
+
+
+def _supported_numbers(
+    inverter: Inverter, settings: dict[str, Any]
+) -> dict[str, GoodweNumberEntityDescription]:
+    """Answer the numeric settings supported by the inverter (as probed)."""
+    return {
+        description.key: description
+        for description in NUMBERS
+        if description.key in _NUMBER_KEYS
+        and description.filter(inverter)
+        and (description.setting or description.key) in settings
+    }
+
+
+def _supported_targets(
+    settings: dict[str, Any], numbers: dict[str, GoodweNumberEntityDescription]
+) -> set[str]:
+    """Answer the target settings supported by the inverter (as probed)."""
+    supported = set(numbers)
+    if OPERATION_MODE.key in settings and "eco_mode_1" in settings:
+        supported |= _MODE_KEYS
+    if EMS_MODE.key in settings:
+        supported.add(EMS_MODE.key)
+    return supported
+
+
+class InverterSchedule:
+    """Time-of-use schedule of the inverter settings.
+
+    At start of each window (and when the schedule is started or changed) the
+    target settings of the active window are compared with the current settings
+    of the inverter and only the different ones are written, all of them by single
+    scheduled request together with their read back. Settings are left as they
+    are outside of the windows. The schedule is persisted across restarts.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        key: str,
+        inverter: Inverter,
+        scheduler: InverterScheduler,
+        writes: InverterWriteQueue,
+        settings: dict[str, Any],
+    ) -> None:
+        """Initialize the (empty) schedule."""
+        self._hass = hass
+        self._store = _schedule_store(hass, key)
+        self._inverter = inverter
+        self._scheduler = scheduler
+        self._writes = writes
+        self._numbers = _supported_numbers(inverter, settings)
+        self._supported = _supported_targets(settings, self._numbers)
+        self._windows: list[ScheduleWindow] = []
+        self._lock = asyncio.Lock()
+        self._unsub_boundaries: list[CALLBACK_TYPE] = []
+        self._unsub_retry: CALLBACK_TYPE | None = None
+        self._started = False
+
+    @property
+    def windows(self) -> list[ScheduleWindow]:
+        """Answer the windows of the schedule."""
+        return self._windows
+
+    def active_window(self, moment: time) -> ScheduleWindow | None:
+        """Answer the window active at the time of day (None outside of windows)."""
+        return next((w for w in self._windows if w.contains(moment)), None)
+
+    async def async_load(self) -> None:
+        """Load the schedule persisted by previous run."""
+        data = await self._store.async_load()
+        if not data:
+            return
+        try:
+            self._windows = schedule_windows(data["windows"])
+        except (KeyError, vol.Invalid) as err:
+            _LOGGER.warning("Ignoring invalid persisted schedule: %s", err)
+
+    @callback
+    def async_start(self) -> None:
+        """Start following the schedule (settings of the active window are applied)."""
+        self._started = True
+        self._track_boundaries()
+        if self._windows:
+            self._hass.async_create_background_task(
+                self._async_boundary(), f"{self._inverter.serial_number} schedule"
+            )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop following the schedule."""
+        self._started = False
+        self._cancel_boundaries()
+        self._cancel_retry()
+
+    async def async_set(self, windows: Iterable[ScheduleWindow]) -> None:
+        """Replace the schedule, apply the settings of its active window.
+
+        Raise ValueError for settings not supported by the inverter,
+        HomeAssistantError when the settings of active window could not be written.
+        """
+        windows = list(windows)
+        if unsupported := sorted(
+            {key for w in windows for key in w.targets} - self._supported
+        ):
+            raise ValueError(f"Settings {unsupported} not supported by the inverter")
+        self._windows = windows
+        await self._store.async_save(
+            {"windows": [window.as_dict() for window in windows]}
+        )
+        if self._started:
+            self._track_boundaries()
+            await self.async_apply()
+
+    async def async_apply(self) -> dict[str, Any]:
+        """Write the settings of the active window differing from the current ones.
+
+        Answer the written settings (as read back from the inverter).
+        Raise HomeAssistantError when they could not be written.
+        """
+        self._cancel_retry()
+        if (window := self.active_window(dt_util.now().time())) is None:
+            return {}
+        async with self._lock:
+            # Settings changes still waiting in the queue are written first
+            await self._writes.async_flush()
+            try:
+                written = await self._scheduler.async_request(
+                    partial(
+                        _async_write_targets,
+                        targets=window.targets,
+                        numbers=self._numbers,
+                    ),
+                    RequestPriority.WRITE,
+                )
+            except InverterError as err:
+                raise HomeAssistantError(
+                    f"Failed to write schedule settings: {err}"
+                ) from err
+        if written:
+            _LOGGER.debug(
+                "Schedule window %s - %s written %s", window.start, window.end, written
+            )
+            async_dispatcher_send(
+                self._hass,
+                SIGNAL_SETTINGS_UPDATED.format(self._inverter.serial_number),
+                written,
+            )
+        return written
+
+    def _track_boundaries(self) -> None:
+        self._cancel_boundaries()
+        for start in {window.start for window in self._windows}:
+            self._unsub_boundaries.append(
+                async_track_time_change(
+                    self._hass,
+                    self._async_boundary,
+                    hour=start.hour,
+                    minute=start.minute,
+                    second=start.second,
+                )
+            )
+
+    def _cancel_boundaries(self) -> None:
+        for unsub in self._unsub_boundaries:
+            unsub()
+        self._unsub_boundaries = []
+
+    def _cancel_retry(self) -> None:
+        if self._unsub_retry is not None:
+            self._unsub_retry()
+            self._unsub_retry = None
+
+    async def _async_boundary(self, _now: datetime | None = None) -> None:
+        """Apply the settings of the window (just) started, retry later on failure."""
+        try:
+            await self.async_apply()
+        except HomeAssistantError as err:
+            _LOGGER.warning("%s, retrying in %d s", err, _RETRY_DELAY)
+            if self._started:
+                self._unsub_retry = async_call_later(
+                    self._hass, _RETRY_DELAY, self._async_retry
+                )
+
+    async def _async_retry(self, _now: datetime) -> None:
+        self._unsub_retry = None
+        await self._async_boundary()
+
+
+async def _async_read_targets(
+    inverter: Inverter,
+    keys: Iterable[str],
+    numbers: dict[str, GoodweNumberEntityDescription],
+) -> dict[str, Any]:
+    """Read the current values of the target settings."""
+    keys = set(keys)
+    values: dict[str, Any] = {}
+    if keys & _MODE_KEYS:
+        values[OPERATION_MODE.key] = MODE_TO_OPTION.get(
+            await inverter.get_operation_mode()
+        )
+        eco_mode = await inverter.read_setting("eco_mode_1")
+        for key, description in _ECO_NUMBERS.items():
+            values[key] = description.mapper(eco_mode)
+    if EMS_MODE.key in keys:
+        values[EMS_MODE.key] = (await inverter.get_ems_mode()).name.lower()
+    for key in keys & numbers.keys():
+        description = numbers[key]
+        values[key] = description.mapper(await description.getter(inverter))
+    return values
+
+
+async def _async_write_targets(
+    inverter: Inverter,
+    targets: dict[str, Any],
+    numbers: dict[str, GoodweNumberEntityDescription],
+) -> dict[str, Any]:
+    """Write the target settings differing from the current ones, verify them.
+
+    Answer the written settings as read back (with the eco mode values when
+    the operation mode was written).
+    """
+    current = await _async_read_targets(inverter, targets, numbers)
+    changed = {key: value for key, value in targets.items() if current[key] != value}
+    if targets.get(OPERATION_MODE.key, current.get(OPERATION_MODE.key)) not in (
+        _ECO_OPTIONS
+    ):
+        # Eco mode power and SoC are used by the eco modes only
+        changed.pop(ECO_MODE_POWER, None)
+        changed.pop(ECO_MODE_SOC, None)
+    if not changed:
+        return {}
+
+    if changed.keys() & _MODE_KEYS:
+        mode = {key: changed.get(key, current[key]) for key in _MODE_KEYS}
+        await inverter.set_operation_mode(
+            OPTION_TO_MODE[mode[OPERATION_MODE.key]],
+            mode[ECO_MODE_POWER],
+            mode[ECO_MODE_SOC],
+        )
+    if EMS_MODE.key in changed:
+        await inverter.set_ems_mode(EMS_MODE.options[changed[EMS_MODE.key]])
+    for key in changed.keys() & numbers.keys():
+        await numbers[key].setter(inverter, changed[key])
+
+    actual = await _async_read_targets(inverter, changed, numbers)
+    if failed := sorted(key for key in changed if actual[key] != changed[key]):
+        raise HomeAssistantError(f"Inverter did not accept values of {failed}")
+    return actual
@@ -0,0 +1,170 @@
+"""Single-flight scheduler of the requests to the inverter."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from contextlib import AbstractAsyncContextManager, nullcontext
+from dataclasses import dataclass, field
+from enum import IntEnum
+import heapq
+import itertools
+import logging
+from typing import Any
+
+from goodwe import Inverter, RequestFailedException
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+type RequestAction = Callable[[Inverter], Awaitable[Any]]
+
+
+class RequestPriority(IntEnum):
+    """Priority of the inverter request (lower value is sent first)."""
+
+    WRITE = 0
+    INTERACTIVE = 1
+    POLL = 2
+
+
+# Default time (s) within which the request has to be sent to the inverter
+_DEADLINES: dict[RequestPriority, float] = {
+    RequestPriority.WRITE: 60,
+    RequestPriority.INTERACTIVE: 30,
+    RequestPriority.POLL: 10,
+}
+
+
+@dataclass(order=True)
+class _Request:
+    priority: RequestPriority
+    sequence: int
+    deadline: float = field(compare=False)
+    action: RequestAction = field(compare=False)
+    key: Hashable | None = field(compare=False)
+    future: asyncio.Future[Any] = field(compare=False)
+
+
+def _retrieve_exception(future: asyncio.Future[Any]) -> None:
+    # Avoid "exception never retrieved" when all the callers were cancelled
+    if not future.cancelled():
+        future.exception()
+
+
+class InverterScheduler:
+    """Per inverter scheduler sending single request to the inverter at a time.
+
+    Requests are sent by their priority (writes, interactive reads, periodic polls),
+    identical reads (same key) queued or in progress are shared by all their callers
+    and requests not sent within their deadline fail without reaching the inverter.
+    Optional limiter (e.g. semaphore shared by more inverters) is held while
+    the request is sent. The requests are processed by background task
+    of the config entry, so they are cancelled when the entry is unloaded.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        inverter: Inverter,
+        limiter: AbstractAsyncContextManager[Any] | None = None,
+    ) -> None:
+        """Initialize the scheduler."""
+        self._hass = hass
+        self._entry = entry
+        self._inverter = inverter
+        self._limiter = limiter or nullcontext()
+        self._queue: list[_Request] = []
+        self._reads: dict[Hashable, asyncio.Future[Any]] = {}
+        self._sequence = itertools.count()
+        self._worker: asyncio.Task[None] | None = None
+        # Number of consecutive requests not sent within their deadline
+        self._expired_count = 0
+        # Priority of the request being sent (None when idle)
+        self.active_priority: RequestPriority | None = None
+        # Time of the last request answered by the inverter
+        self.last_activity: float = hass.loop.time()
+
+    async def async_request(
+        self,
+        action: RequestAction,
+        priority: RequestPriority,
+        key: Hashable | None = None,
+        deadline: float | None = None,
+    ) -> Any:
+        """Schedule the request and answer its result.
+
+        Reads should provide a key identifying the read data, so concurrent
+        callers share the single response. Writes must not provide a key.
+        The deadline (s) applies to the time the request waits in the queue,
+        requests already sent are not interrupted.
+        """
+        if key is not None and (future := self._reads.get(key)) is not None:
+            _LOGGER.debug("Sharing response of pending request %s", key)
+            return await asyncio.shield(future)
+
+        future = self._hass.loop.create_future()
+        future.add_done_callback(_retrieve_exception)
+        if key is not None:
+            self._reads[key] = future
+        heapq.heappush(
+            self._queue,
+            _Request(
+                priority,
+                next(self._sequence),
+                self._hass.loop.time()
+                + (deadline if deadline is not None else _DEADLINES[priority]),
+                action,
+                key,
+                future,
+            ),
+        )
+        if self._worker is None or self._worker.done():
+            self._worker = self._entry.async_create_background_task(
+                self._hass,
+                self._async_process(),
+                f"{self._inverter.serial_number} requests",
+            )
+        return await asyncio.shield(future)
+
+    async def _async_process(self) -> None:
+        """Send the queued requests one by one."""
+        while self._queue:
+            request = heapq.heappop(self._queue)
+            try:
+                self._check_deadline(request)
+                async with self._limiter:
+                    self.active_priority = request.priority
+                    try:
+                        result = await request.action(self._inverter)
+                    finally:
+                        self.active_priority = None
+            except asyncio.CancelledError:
+                # Shutting down, cancel all the waiting callers
+                for pending in (request, *self._queue):
+                    pending.future.cancel()
+                self._queue.clear()
+                self._reads.clear()
+                raise
+            except Exception as err:  # noqa: BLE001 # pylint: disable=broad-except
+                # Any failure of the action belongs to its caller, not the worker
+                request.future.set_exception(err)
+            else:
+                self.last_activity = self._hass.loop.time()
+                request.future.set_result(result)
+            if request.key is not None:
+                self._reads.pop(request.key, None)
+
+    def _check_deadline(self, request: _Request) -> None:
+        """Raise RequestFailedException if the request was not sent in time."""
+        if self._hass.loop.time() <= request.deadline:
+            self._expired_count = 0
+            return
+        # Saturated queue, let the callers know the inverter is unavailable
+        self._expired_count += 1
+        raise RequestFailedException(
+            f"Request {request.key or ''} not sent within its deadline",
+            self._expired_count,
+        )
@@ -2,6 +2,7 @@
 
 from dataclasses import dataclass
 import logging
+from typing import Any
 
 from goodwe import Inverter, InverterError, OperationMode
 from goodwe.inverter import EMSMode
@@ -12,19 +13,22 @@ from homeassistant.const import (
     EntityCategory,
     Platform,
 )
-from homeassistant.core import Event, HomeAssistant
+from homeassistant.core import Event, HomeAssistant, callback
 from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 from homeassistant.helpers.event import async_track_state_change_event
 
-from .const import DOMAIN
+from .const import DOMAIN, SIGNAL_SETTINGS_UPDATED
 from .coordinator import GoodweConfigEntry
+from .scheduler import InverterScheduler, RequestPriority
+from .writes import InverterWriteQueue
 
 _LOGGER = logging.getLogger(__name__)
 
 
-_MODE_TO_OPTION: dict[OperationMode, str] = {
+MODE_TO_OPTION: dict[OperationMode, str] = {
     OperationMode.GENERAL: "general",
     OperationMode.OFF_GRID: "off_grid",
     OperationMode.BACKUP: "backup",
@@ -35,10 +39,19 @@ _MODE_TO_OPTION: dict[OperationMode, str] = {
     OperationMode.ECO_DISCHARGE: "eco_discharge",
 }
 
-_OPTION_TO_MODE: dict[str, OperationMode] = {
-    value: key for key, value in _MODE_TO_OPTION.items()
+OPTION_TO_MODE: dict[str, OperationMode] = {
+    value: key for key, value in MODE_TO_OPTION.items()
 }
 
+# Probed setting of the operation modes (options) supported by the inverter
+SUPPORTED_MODES = "operation_modes"
+
+
+async def async_read_supported_modes(inverter: Inverter) -> list[str]:
+    """Read the (emulated included) operation modes as the select options."""
+    modes = await inverter.get_operation_modes(True)
+    return [option for mode, option in MODE_TO_OPTION.items() if mode in modes]
+
 
 @dataclass(frozen=True, kw_only=True)
 class GoodweSelectEntityDescription(SelectEntityDescription):
@@ -69,25 +82,29 @@ async def async_setup_entry(
     """Set up the inverter select entities from a config entry."""
     inverter = config_entry.runtime_data.inverter
     device_info = config_entry.runtime_data.device_info
+    settings = config_entry.runtime_data.settings
+    scheduler = config_entry.runtime_data.coordinator.scheduler
+    writes = config_entry.runtime_data.writes
 
-    supported_modes = await inverter.get_operation_modes(True)
-    # read current operating mode from the inverter
-    try:
-        active_mode = await inverter.get_operation_mode()
-        eco_mode = await inverter.read_setting("eco_mode_1")
-        current_eco_power = abs(eco_mode.power) if eco_mode.power else 0
-        current_eco_soc = eco_mode.soc or 0
-    except (InverterError, ValueError):
+    supported_modes = settings.get(SUPPORTED_MODES, [])
+    # current operating mode as probed from the inverter
+    if OPERATION_MODE.key not in settings or "eco_mode_1" not in settings:
         # Inverter model does not support this setting
-        _LOGGER.debug("Could not read inverter operation mode", exc_info=True)
+        _LOGGER.debug("Inverter operation mode not supported")
     else:
-        active_mode_option = _MODE_TO_OPTION.get(active_mode)
+        active_mode = settings[OPERATION_MODE.key]
+        eco_mode = settings["eco_mode_1"]
+        current_eco_power = abs(eco_mode.power) if eco_mode.power else 0
+        current_eco_soc = eco_mode.soc or 0
+        active_mode_option = MODE_TO_OPTION.get(active_mode)
         if active_mode_option is not None:
             entity = InverterOperationModeEntity(
                 device_info,
                 OPERATION_MODE,
                 inverter,
-                [v for k, v in _MODE_TO_OPTION.items() if k in supported_modes],
+                scheduler,
+                writes,
+                supported_modes,
                 active_mode_option,
                 current_eco_power,
                 current_eco_soc,
@@ -122,18 +139,18 @@ async def async_setup_entry(
                 entity.update_eco_mode_soc,
             )
 
-    # read current EMS mode from the inverter
-    try:
-        ems_mode = await inverter.get_ems_mode()
-    except (InverterError, ValueError):
+    # current EMS mode as probed from the inverter
+    if EMS_MODE.key not in settings:
         # Inverter model does not support EMS modes
-        _LOGGER.debug("Could not read inverter EMS mode", exc_info=True)
+        _LOGGER.debug("Inverter EMS mode not supported")
     else:
         entity = InverterEMSModeEntity(
             device_info,
             EMS_MODE,
             inverter,
-            ems_mode,
+            scheduler,
+            writes,
+            settings[EMS_MODE.key],
         )
         async_add_entities([entity])
 
@@ -149,6 +166,8 @@ class InverterOperationModeEntity(SelectEntity):
         device_info: DeviceInfo,
         description: SelectEntityDescription,
         inverter: Inverter,
+        scheduler: InverterScheduler,
+        writes: InverterWriteQueue,
         supported_options: list[str],
         current_mode: str,
         current_eco_power: int,
@@ -161,9 +180,31 @@ class InverterOperationModeEntity(SelectEntity):
         self._attr_options = supported_options
         self._attr_current_option = current_mode
         self._inverter: Inverter = inverter
+        self._scheduler: InverterScheduler = scheduler
+        self._writes: InverterWriteQueue = writes
+        self._requested_option = current_mode
         self._eco_mode_power = current_eco_power
         self._eco_mode_soc = current_eco_soc
 
+    async def async_added_to_hass(self) -> None:
+        """Follow the settings written by the schedule."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_SETTINGS_UPDATED.format(self._inverter.serial_number),
+                self._async_settings_updated,
+            )
+        )
+
+    @callback
+    def _async_settings_updated(self, values: dict[str, Any]) -> None:
+        if (option := values.get(self.entity_description.key)) is None:
+            return
+        self._eco_mode_power = values.get("eco_mode_power", self._eco_mode_power)
+        self._eco_mode_soc = values.get("eco_mode_soc", self._eco_mode_soc)
+        self._attr_current_option = self._requested_option = option
+        self.async_write_ha_state()
+
     async def async_select_option(self, option: str) -> None:
         """Change the selected option."""
         _LOGGER.debug(
@@ -172,22 +213,27 @@ class InverterOperationModeEntity(SelectEntity):
             self._eco_mode_power,
             self._eco_mode_soc,
         )
+        self._requested_option = option
         try:
-            await self._inverter.set_operation_mode(
-                _OPTION_TO_MODE[option], self._eco_mode_power, self._eco_mode_soc
-            )
+            await self._async_write_operation_mode()
         except InverterError as err:
             _LOGGER.warning(
                 "Failed to set operation mode to %s: %s", option, err
             )
+            self._requested_option = self._attr_current_option
             return
         self._attr_current_option = option
         self.async_write_ha_state()
 
     async def async_update(self) -> None:
         """Get the current value from inverter."""
-        value = await self._inverter.get_operation_mode()
-        self._attr_current_option = _MODE_TO_OPTION[value]
+        value = await self._scheduler.async_request(
+            lambda inv: inv.get_operation_mode(),
+            RequestPriority.INTERACTIVE,
+            key=(Platform.SELECT, self.entity_description.key),
+        )
+        self._attr_current_option = MODE_TO_OPTION[value]
+        self._requested_option = self._attr_current_option
 
     async def update_eco_mode_power(self, event: Event) -> None:
         """Update eco mode power value in inverter (when in eco mode)."""
@@ -195,24 +241,21 @@ class InverterOperationModeEntity(SelectEntity):
         if state is None or state.state in (STATE_UNKNOWN, "", STATE_UNAVAILABLE):
             return
 
-        self._eco_mode_power = int(float(state.state))
-        if event.data.get("old_state"):
-            operation_mode = _OPTION_TO_MODE[self.current_option]
-            if operation_mode in (
-                OperationMode.ECO_CHARGE,
-                OperationMode.ECO_DISCHARGE,
-            ):
-                _LOGGER.debug("Setting eco mode power to %d", self._eco_mode_power)
-                try:
-                    await self._inverter.set_operation_mode(
-                        operation_mode, self._eco_mode_power, self._eco_mode_soc
-                    )
-                except InverterError as err:
-                    _LOGGER.warning(
-                        "Failed to update eco mode power to %d: %s",
-                        self._eco_mode_power,
-                        err,
-                    )
+        eco_mode_power = int(float(state.state))
+        if eco_mode_power == self._eco_mode_power:
+            # Already written (e.g. by the schedule)
+            return
+        self._eco_mode_power = eco_mode_power
+        if event.data.get("old_state") and self._is_eco_mode():
+            _LOGGER.debug("Setting eco mode power to %d", self._eco_mode_power)
+            try:
+                await self._async_write_operation_mode()
+            except InverterError as err:
+                _LOGGER.warning(
+                    "Failed to update eco mode power to %d: %s",
+                    self._eco_mode_power,
+                    err,
+                )
 
     async def update_eco_mode_soc(self, event: Event) -> None:
         """Update eco mode SoC value in inverter (when in eco mode)."""
@@ -220,24 +263,42 @@ class InverterOperationModeEntity(SelectEntity):
         if state is None or state.state in (STATE_UNKNOWN, "", STATE_UNAVAILABLE):
             return
 
-        self._eco_mode_soc = int(float(state.state))
-        if event.data.get("old_state"):
-            operation_mode = _OPTION_TO_MODE[self.current_option]
-            if operation_mode in (
-                OperationMode.ECO_CHARGE,
-                OperationMode.ECO_DISCHARGE,
-            ):
-                _LOGGER.debug("Setting eco mode SoC to %d", self._eco_mode_soc)
-                try:
-                    await self._inverter.set_operation_mode(
-                        operation_mode, self._eco_mode_power, self._eco_mode_soc
-                    )
-                except InverterError as err:
-                    _LOGGER.warning(
-                        "Failed to update eco mode SoC to %d: %s",
-                        self._eco_mode_soc,
-                        err,
-                    )
+        eco_mode_soc = int(float(state.state))
+        if eco_mode_soc == self._eco_mode_soc:
+            # Already written (e.g. by the schedule)
+            return
+        self._eco_mode_soc = eco_mode_soc
+        if event.data.get("old_state") and self._is_eco_mode():
+            _LOGGER.debug("Setting eco mode SoC to %d", self._eco_mode_soc)
+            try:
+                await self._async_write_operation_mode()
+            except InverterError as err:
+                _LOGGER.warning(
+                    "Failed to update eco mode SoC to %d: %s",
+                    self._eco_mode_soc,
+                    err,
+                )
+
+    def _is_eco_mode(self) -> bool:
+        return OPTION_TO_MODE[self._requested_option] in (
+            OperationMode.ECO_CHARGE,
+            OperationMode.ECO_DISCHARGE,
+        )
+
+    async def _async_write_operation_mode(self) -> None:
+        """Queue the write of the (requested) operation mode and eco mode values.
+
+        The values are evaluated at time of the actual write, so changes of mode,
+        eco mode power and SoC within the settle window result in single write.
+        """
+        await self._writes.async_write(
+            self.entity_description.key,
+            lambda inv: inv.set_operation_mode(
+                OPTION_TO_MODE[self._requested_option],
+                self._eco_mode_power,
+                self._eco_mode_soc,
+            ),
+        )
 
 
 class InverterEMSModeEntity(SelectEntity):
@@ -252,6 +313,8 @@ class InverterEMSModeEntity(SelectEntity):
         device_info: DeviceInfo,
         description: GoodweSelectEntityDescription,
         inverter: Inverter,
+        scheduler: InverterScheduler,
+        writes: InverterWriteQueue,
         current_mode: EMSMode,
     ) -> None:
         """Initialize the inverter operation mode setting entity."""
@@ -261,12 +324,33 @@ class InverterEMSModeEntity(SelectEntity):
         self._attr_options = list(description.options.keys())
         self._attr_current_option = current_mode.name.lower()
         self._inverter: Inverter = inverter
+        self._scheduler: InverterScheduler = scheduler
+        self._writes: InverterWriteQueue = writes
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the settings written by the schedule."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_SETTINGS_UPDATED.format(self._inverter.serial_number),
+                self._async_settings_updated,
+            )
+        )
+
+    @callback
+    def _async_settings_updated(self, values: dict[str, Any]) -> None:
+        if (option := values.get(self.entity_description.key)) is not None:
+            self._attr_current_option = option
+            self.async_write_ha_state()
 
     async def async_select_option(self, option: str) -> None:
         """Change the EMS mode."""
         _LOGGER.debug("Setting EMS mode to %s", option)
         try:
-            await self._inverter.set_ems_mode(self.entity_description.options[option])
+            await self._writes.async_write(
+                self.entity_description.key,
+                lambda inv: inv.set_ems_mode(self.entity_description.options[option]),
+            )
         except InverterError as err:
             _LOGGER.warning("Failed to set EMS mode to %s: %s", option, err)
             return
@@ -275,5 +359,9 @@ class InverterEMSModeEntity(SelectEntity):
 
     async def async_update(self) -> None:
         """Get the current EMS mode from inverter."""
-        value = await self._inverter.get_ems_mode()
+        value = await self._scheduler.async_request(
+            lambda inv: inv.get_ems_mode(),
+            RequestPriority.INTERACTIVE,
+            key=(Platform.SELECT, self.entity_description.key),
+        )
         self._attr_current_option = value.name.lower()
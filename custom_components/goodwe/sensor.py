@@ -10,6 +10,9 @@ import logging
 from typing import Any
 
 from goodwe import Inverter, Sensor, SensorKind
+from goodwe.dt import DT
+from goodwe.es import ES
+from goodwe.et import ET
 from goodwe.sensor import (
     Enum,
     Enum2,
@@ -33,6 +36,7 @@ from homeassistant.const import (
     UnitOfElectricPotential,
     UnitOfEnergy,
     UnitOfFrequency,
+    UnitOfInformation,
     UnitOfPower,
     UnitOfReactivePower,
     UnitOfTemperature,
@@ -42,12 +46,16 @@ from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.helpers.start import async_at_started
 from homeassistant.helpers.typing import StateType
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN
+from .blueprint import model_blueprint
+from .const import ATTR_LAST_READ, ATTR_LAST_READ_CYCLE, CONF_DEFERRED_ENTITIES, DOMAIN
 from .coordinator import GoodweConfigEntry, GoodweUpdateCoordinator
+from .fleet import GoodweFleet, async_get_fleet
+from .metrics import CycleMetrics
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -87,8 +95,8 @@ _ICONS: dict[SensorKind, str] = {
 class GoodweSensorEntityDescription(SensorEntityDescription):
     """Class describing Goodwe sensor entities."""
 
-    value: Callable[[GoodweUpdateCoordinator, str], Any] = lambda coordinator, sensor: (
-        coordinator.sensor_value(sensor)
+    value: Callable[[GoodweUpdateCoordinator, int], Any] = lambda coordinator, slot: (
+        coordinator.sensor_value(slot)
     )
     available: Callable[[GoodweUpdateCoordinator], bool] = lambda coordinator: (
         coordinator.last_update_success
@@ -119,7 +127,7 @@ _DESCRIPTIONS: dict[str, GoodweSensorEntityDescription] = {
         device_class=SensorDeviceClass.ENERGY,
         state_class=SensorStateClass.TOTAL_INCREASING,
         native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
-        value=lambda coordinator, sensor: coordinator.total_sensor_value(sensor),
+        value=lambda coordinator, slot: coordinator.total_sensor_value(slot),
         available=lambda coordinator: coordinator.data is not None,
     ),
     "VA": GoodweSensorEntityDescription(
@@ -174,29 +182,281 @@ ENUM_SENSOR = GoodweSensorEntityDescription(
 )
 
 
+@dataclass(frozen=True, slots=True)
+class SensorBlueprint:
+    """Entity attributes of the inverter sensor (same for all inverters of a model)."""
+
+    name: str
+    description: GoodweSensorEntityDescription
+    entity_category: EntityCategory | None
+    icon: str | None
+    device_class: SensorDeviceClass | None
+    native_unit_of_measurement: str | None
+    options: list[str] | None
+
+
+def _sensor_blueprint(sensor: Sensor) -> SensorBlueprint:
+    """Resolve the entity attributes of the inverter sensor."""
+    device_class = None
+    unit = None
+    options = None
+    try:
+        description = _DESCRIPTIONS[sensor.unit]
+    except KeyError:
+        if isinstance(sensor, (Enum, EnumH, EnumL, Enum2, EnumCalculated)):
+            description = ENUM_SENSOR
+            options = list(sensor._labels.values())
+        elif (
+            isinstance(sensor, (EnumBitmap4, EnumBitmap22)) or sensor.id_ == "timestamp"
+        ):
+            description = TEXT_SENSOR
+        else:
+            description = DIAG_SENSOR
+            unit = sensor.unit
+    # Set the inverter SoC as main device battery sensor
+    if sensor.id_ == BATTERY_SOC:
+        device_class = SensorDeviceClass.BATTERY
+    return SensorBlueprint(
+        name=sensor.name.strip(),
+        description=description,
+        entity_category=(
+            EntityCategory.DIAGNOSTIC if sensor.id_ not in _MAIN_SENSORS else None
+        ),
+        icon=_ICONS.get(sensor.kind),
+        device_class=device_class,
+        native_unit_of_measurement=unit,
+        options=options,
+    )
+
+
+def sensor_blueprints(inverter: Inverter) -> dict[str, SensorBlueprint]:
+    """Answer the blueprints of the inverter sensors (by sensor id).
+
+    Blueprints are memoized per inverter model and firmware, only sensors
+    not seen yet (e.g. of a battery connected to just this inverter) are resolved.
+    """
+    blueprints: dict[str, SensorBlueprint] = model_blueprint(inverter).sensors
+    for sensor in inverter.sensors():
+        if sensor.id_ not in blueprints:
+            blueprints[sensor.id_] = _sensor_blueprint(sensor)
+    return blueprints
+
+
+@dataclass(frozen=True, kw_only=True)
+class GoodweFleetSensorEntityDescription(SensorEntityDescription):
+    """Class describing Goodwe fleet (all inverters total) sensor entities."""
+
+    value: Callable[[Inverter, dict[str, Any]], Any]
+
+
+# Grid power (positive when exported) measured by the meter of the inverter family
+_GRID_POWER_SENSORS: dict[type[Inverter], str] = {
+    ET: "active_power",
+    ES: "pgrid",
+    DT: "meter_active_power",
+}
+
+
+def _export_power(inverter: Inverter, data: dict[str, Any]) -> Any:
+    """Answer the power exported to grid, None for inverters without grid meter."""
+    sensor = next(
+        (s for f, s in _GRID_POWER_SENSORS.items() if isinstance(inverter, f)), None
+    )
+    # Meter sensors of inverters without meter (e.g. DT) are not reported at all
+    if sensor is None or not any(s.id_ == sensor for s in inverter.sensors()):
+        return None
+    power = data.get(sensor)
+    return max(power, 0) if isinstance(power, (int, float)) else None
+
+
+FLEET_SENSORS = (
+    GoodweFleetSensorEntityDescription(
+        key="fleet_ppv",
+        name="Total PV power",
+        icon="mdi:solar-power",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        value=lambda _, data: data.get("ppv"),
+    ),
+    GoodweFleetSensorEntityDescription(
+        key="fleet_export_power",
+        name="Total export power",
+        icon="mdi:transmission-tower-export",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        value=_export_power,
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class GoodweMetricSensorEntityDescription(SensorEntityDescription):
+    """Class describing Goodwe polling performance (diagnostic) sensor entities."""
+
+    value: Callable[[CycleMetrics], Any]
+    entity_category: EntityCategory | None = EntityCategory.DIAGNOSTIC
+    entity_registry_enabled_default: bool = False
+    state_class: SensorStateClass | str | None = SensorStateClass.MEASUREMENT
+
+
+METRIC_SENSORS = (
+    GoodweMetricSensorEntityDescription(
+        key="metric_round_trip",
+        name="Request round-trip time",
+        icon="mdi:timer-sync-outline",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=0,
+        value=lambda cycle: cycle.round_trip_ms,
+    ),
+    GoodweMetricSensorEntityDescription(
+        key="metric_retries",
+        name="Request retries",
+        icon="mdi:repeat",
+        value=lambda cycle: cycle.retries,
+    ),
+    GoodweMetricSensorEntityDescription(
+        key="metric_timeouts",
+        name="Request timeouts",
+        icon="mdi:timer-alert-outline",
+        value=lambda cycle: cycle.timeouts,
+    ),
+    GoodweMetricSensorEntityDescription(
+        key="metric_decode_time",
+        name="Decode time",
+        icon="mdi:timer-cog-outline",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=1,
+        value=lambda cycle: cycle.decode_ms,
+    ),
+    GoodweMetricSensorEntityDescription(
+        key="metric_bytes_received",
+        name="Bytes received",
+        icon="mdi:download-network-outline",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        value=lambda cycle: cycle.bytes_received,
+    ),
+    GoodweMetricSensorEntityDescription(
+        key="metric_cycle_duration",
+        name="Update cycle duration",
+        icon="mdi:timer-outline",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=0,
+        value=lambda cycle: cycle.duration_ms,
+    ),
+    GoodweMetricSensorEntityDescription(
+        key="metric_failure_streak",
+        name="Failed updates streak",
+        icon="mdi:lan-disconnect",
+        value=lambda cycle: cycle.failure_streak,
+    ),
+)
+
+FLEET_DEVICE_INFO = DeviceInfo(
+    identifiers={(DOMAIN, "fleet")},
+    name="GoodWe fleet",
+    manufacturer="GoodWe",
+)
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: GoodweConfigEntry,
     async_add_entities: AddConfigEntryEntitiesCallback,
 ) -> None:
     """Set up the GoodWe inverter from a config entry."""
-    entities: list[InverterSensor] = []
+    entities: list[SensorEntity] = []
     inverter = config_entry.runtime_data.inverter
     coordinator = config_entry.runtime_data.coordinator
     device_info = config_entry.runtime_data.device_info
 
     # Individual inverter sensors entities
+    blueprints = sensor_blueprints(inverter)
+
+    def create_sensor(sensor: Sensor) -> InverterSensor:
+        return InverterSensor(
+            coordinator, device_info, inverter, sensor, blueprints[sensor.id_]
+        )
+
+    if config_entry.options.get(CONF_DEFERRED_ENTITIES, False):
+        # Main sensors now, the rest after startup when they report a value
+        deferred: dict[str, Sensor] = {}
+        for sensor in inverter.sensors():
+            if sensor.id_ in _MAIN_SENSORS:
+                entities.append(create_sensor(sensor))
+            else:
+                deferred[sensor.id_] = sensor
+
+        @callback
+        def add_deferred_sensors(_: HomeAssistant) -> None:
+            _add_deferred_sensors(
+                config_entry, deferred, create_sensor, async_add_entities
+            )
+
+        config_entry.async_on_unload(async_at_started(hass, add_deferred_sensors))
+    else:
+        entities.extend(create_sensor(sensor) for sensor in inverter.sensors())
+
+    # Polling performance of the inverter (disabled by default)
     entities.extend(
-        InverterSensor(coordinator, device_info, inverter, sensor)
-        for sensor in inverter.sensors()
+        MetricSensor(coordinator, device_info, inverter, description)
+        for description in METRIC_SENSORS
     )
+
+    # Totals of all the inverters (created by single config entry)
+    fleet = async_get_fleet(hass)
+    if fleet.async_claim_sensors(config_entry):
+        entities.extend(
+            FleetSensor(fleet, description) for description in FLEET_SENSORS
+        )
     async_add_entities(entities)
 
 
+@callback
+def _add_deferred_sensors(
+    config_entry: GoodweConfigEntry,
+    deferred: dict[str, Sensor],
+    create_sensor: Callable[[Sensor], InverterSensor],
+    async_add_entities: AddConfigEntryEntitiesCallback,
+) -> None:
+    """Add the deferred sensors reporting a value, the others once they report one.
+
+    Sensors of the missing equipment (e.g. 2nd MPPT, meter or battery)
+    never report a value, so their entities are never created.
+    """
+    coordinator = config_entry.runtime_data.coordinator
+
+    @callback
+    def add_reporting_sensors() -> None:
+        if not deferred or not coordinator.data:
+            return
+        reporting = [
+            deferred.pop(sensor_id)
+            for sensor_id in list(deferred)
+            if coordinator.data.get(sensor_id) is not None
+        ]
+        if reporting:
+            _LOGGER.debug("Adding deferred sensors %s", [s.id_ for s in reporting])
+            async_add_entities(create_sensor(sensor) for sensor in reporting)
+
+    add_reporting_sensors()
+    if deferred:
+        config_entry.async_on_unload(
+            coordinator.async_add_listener(add_reporting_sensors)
+        )
+
+
 class InverterSensor(CoordinatorEntity[GoodweUpdateCoordinator], SensorEntity):
     """Entity representing individual inverter sensor."""
 
     _attr_has_entity_name = True
+    # Read time of stale values changes too often to be recorded
+    _unrecorded_attributes = frozenset({ATTR_LAST_READ, ATTR_LAST_READ_CYCLE})
     entity_description: GoodweSensorEntityDescription
 
     def __init__(
@@ -205,40 +465,31 @@ class InverterSensor(CoordinatorEntity[GoodweUpdateCoordinator], SensorEntity):
         device_info: DeviceInfo,
         inverter: Inverter,
         sensor: Sensor,
+        blueprint: SensorBlueprint,
     ) -> None:
         """Initialize an inverter sensor."""
         super().__init__(coordinator)
-        self._attr_name = sensor.name.strip()
+        self._attr_name = blueprint.name
         self._attr_unique_id = f"{DOMAIN}-{sensor.id_}-{inverter.serial_number}"
         self._attr_device_info = device_info
-        self._attr_entity_category = (
-            EntityCategory.DIAGNOSTIC if sensor.id_ not in _MAIN_SENSORS else None
-        )
-        try:
-            self.entity_description = _DESCRIPTIONS[sensor.unit]
-        except KeyError:
-            if isinstance(sensor, (Enum, EnumH, EnumL, Enum2, EnumCalculated)):
-                self.entity_description = ENUM_SENSOR
-                self._attr_options = list(sensor._labels.values())
-            elif (
-                isinstance(sensor, (EnumBitmap4, EnumBitmap22))
-                or sensor.id_ == "timestamp"
-            ):
-                self.entity_description = TEXT_SENSOR
-            else:
-                self.entity_description = DIAG_SENSOR
-                self._attr_native_unit_of_measurement = sensor.unit
-        self._attr_icon = _ICONS.get(sensor.kind)
-        # Set the inverter SoC as main device battery sensor
-        if sensor.id_ == BATTERY_SOC:
-            self._attr_device_class = SensorDeviceClass.BATTERY
+        self._attr_entity_category = blueprint.entity_category
+        self.entity_description = blueprint.description
+        if blueprint.options is not None:
+            self._attr_options = blueprint.options
+        if blueprint.native_unit_of_measurement is not None:
+            self._attr_native_unit_of_measurement = blueprint.native_unit_of_measurement
+        self._attr_icon = blueprint.icon
+        if blueprint.device_class is not None:
+            self._attr_device_class = blueprint.device_class
         self._sensor = sensor
+        # Slot of the sensor value in the coordinator values store
+        self._slot = coordinator.values.slot(sensor.id_)
         self._stop_reset: Callable[[], None] | None = None
 
     @property
     def native_value(self) -> StateType | date | datetime | Decimal:
         """Return the value reported by the sensor."""
-        return self.entity_description.value(self.coordinator, self._sensor.id_)
+        return self.entity_description.value(self.coordinator, self._slot)
 
     @property
     def available(self) -> bool:
@@ -251,6 +502,17 @@ class InverterSensor(CoordinatorEntity[GoodweUpdateCoordinator], SensorEntity):
         """
         return self.entity_description.available(self.coordinator)
 
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return if the value is stale and when the last known value was read."""
+        return self.coordinator.sensor_staleness(self._sensor.id_)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the entity state only when its value (or availability) changed."""
+        if self.coordinator.sensor_changed(self._sensor.id_):
+            self.async_write_ha_state()
+
     @callback
     def async_reset(self, now):
         """Reset the value back to 0 at midnight.
@@ -271,7 +533,8 @@ class InverterSensor(CoordinatorEntity[GoodweUpdateCoordinator], SensorEntity):
         )
 
     async def async_added_to_hass(self) -> None:
-        """Schedule reset task at midnight."""
+        """Register sensor for reading and schedule reset task at midnight."""
+        self.coordinator.sensor_entity_enabled(self._sensor.id_, True)
         if self._sensor.id_ in DAILY_RESET:
             next_midnight = dt_util.start_of_local_day(
                 dt_util.now() + timedelta(days=1)
@@ -282,7 +545,75 @@ class InverterSensor(CoordinatorEntity[GoodweUpdateCoordinator], SensorEntity):
         await super().async_added_to_hass()
 
     async def async_will_remove_from_hass(self) -> None:
-        """Remove reset task at midnight."""
+        """Unregister sensor from reading and remove reset task at midnight."""
+        self.coordinator.sensor_entity_enabled(self._sensor.id_, False)
         if self._sensor.id_ in DAILY_RESET and self._stop_reset is not None:
             self._stop_reset()
         await super().async_will_remove_from_hass()
+
+
+class MetricSensor(CoordinatorEntity[GoodweUpdateCoordinator], SensorEntity):
+    """Entity representing polling performance metric of the last update cycle."""
+
+    _attr_has_entity_name = True
+    entity_description: GoodweMetricSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: GoodweUpdateCoordinator,
+        device_info: DeviceInfo,
+        inverter: Inverter,
+        description: GoodweMetricSensorEntityDescription,
+    ) -> None:
+        """Initialize the metric sensor."""
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_unique_id = f"{DOMAIN}-{description.key}-{inverter.serial_number}"
+        self._attr_device_info = device_info
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the metric of the last update cycle."""
+        if (cycle := self.coordinator.metrics.last) is None:
+            return None
+        return self.entity_description.value(cycle)
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available (also when the inverter does not respond)."""
+        return self.coordinator.metrics.last is not None
+
+
+class FleetSensor(SensorEntity):
+    """Entity representing total value of all the inverters."""
+
+    _attr_should_poll = False
+    _attr_has_entity_name = True
+    _attr_device_info = FLEET_DEVICE_INFO
+    entity_description: GoodweFleetSensorEntityDescription
+
+    def __init__(
+        self, fleet: GoodweFleet, description: GoodweFleetSensorEntityDescription
+    ) -> None:
+        """Initialize the fleet sensor."""
+        self.entity_description = description
+        self._attr_unique_id = f"{DOMAIN}-{description.key}"
+        self._fleet = fleet
+        self._attr_native_value = fleet.total(description.value)
+
+    @property
+    def available(self) -> bool:
+        """Return if any of the inverters provides the value."""
+        return self._attr_native_value is not None
+
+    async def async_added_to_hass(self) -> None:
+        """Listen to updates of the inverters data."""
+        self.async_on_remove(self._fleet.async_add_listener(self._handle_fleet_update))
+
+    @callback
+    def _handle_fleet_update(self) -> None:
+        """Write the state when the total value changed."""
+        value = self._fleet.total(self.entity_description.value)
+        if value != self._attr_native_value:
+            self._attr_native_value = value
+            self.async_write_ha_state()
@@ -2,22 +2,50 @@
 
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Awaitable, Callable
+from datetime import date, datetime, time
 import logging
+from typing import Any
 
+from goodwe import InverterError
 import voluptuous as vol
 
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import (
+    config_validation as cv,
+    device_registry as dr,
+    entity_registry as er,
+)
 
 from .const import (
+    ATTR_AREA_ID,
     ATTR_DEVICE_ID,
     ATTR_ENTITY_ID,
     ATTR_PARAMETER,
+    ATTR_PARAMETERS,
+    ATTR_SERIAL_NUMBER,
     ATTR_VALUE,
+    ATTR_WINDOWS,
     DOMAIN,
     SERVICE_GET_PARAMETER,
+    SERVICE_GET_PARAMETERS,
+    SERVICE_GET_SCHEDULE,
     SERVICE_SET_PARAMETER,
+    SERVICE_SET_PARAMETERS,
+    SERVICE_SET_SCHEDULE,
 )
+from .coordinator import GoodweRuntimeData
+from .inverters import async_get_inverter_index
+from .parameters import async_read_parameters, async_write_parameters
+from .schedule import ScheduleWindow, schedule_windows
+from .scheduler import RequestPriority
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -29,14 +57,156 @@ SERVICE_GET_PARAMETER_SCHEMA = vol.Schema(
     }
 )
 
-SERVICE_SET_PARAMETER_SCHEMA = vol.Schema(
-    {
-        vol.Required(ATTR_DEVICE_ID): str,
-        vol.Required(ATTR_PARAMETER): str,
-        vol.Required(ATTR_VALUE): vol.Any(str, int, bool),
-    }
+# Inverters targeted by device, entity, area or serial number (at least one of them)
+_TARGET_FIELDS = {
+    vol.Optional(ATTR_DEVICE_ID): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+    vol.Optional(ATTR_AREA_ID): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional(ATTR_SERIAL_NUMBER): vol.All(cv.ensure_list, [cv.string]),
+}
+_HAS_TARGET = cv.has_at_least_one_key(
+    ATTR_DEVICE_ID, ATTR_ENTITY_ID, ATTR_AREA_ID, ATTR_SERIAL_NUMBER
+)
+
+SERVICE_SET_PARAMETER_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            **_TARGET_FIELDS,
+            vol.Required(ATTR_PARAMETER): str,
+            vol.Required(ATTR_VALUE): vol.Any(str, int, bool),
+        }
+    ),
+    _HAS_TARGET,
 )
 
+SERVICE_GET_PARAMETERS_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            **_TARGET_FIELDS,
+            vol.Required(ATTR_PARAMETERS): vol.All(
+                cv.ensure_list, [cv.string], vol.Length(min=1)
+            ),
+        }
+    ),
+    _HAS_TARGET,
+)
+
+SERVICE_SET_PARAMETERS_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            **_TARGET_FIELDS,
+            vol.Required(ATTR_PARAMETERS): vol.All(
+                {cv.string: vol.Any(str, int, float, bool)}, vol.Length(min=1)
+            ),
+        }
+    ),
+    _HAS_TARGET,
+)
+
+SERVICE_GET_SCHEDULE_SCHEMA = vol.All(vol.Schema(_TARGET_FIELDS), _HAS_TARGET)
+
+SERVICE_SET_SCHEDULE_SCHEMA = vol.All(
+    vol.Schema({**_TARGET_FIELDS, vol.Required(ATTR_WINDOWS): schedule_windows}),
+    _HAS_TARGET,
+)
+
+
+def response_value(value: Any) -> Any:
+    """Answer the parameter value as JSON compatible service response value."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _runtime_data_by_device_id(
+    hass: HomeAssistant, device_id: str
+) -> GoodweRuntimeData:
+    """Answer the runtime data of the inverter device."""
+    if (runtime_data := async_get_inverter_index(hass).by_device_id(device_id)) is None:
+        raise ServiceValidationError(f"Inverter for device id {device_id} not found")
+    return runtime_data
+
+
+def _targeted_inverters(
+    hass: HomeAssistant, data: dict[str, Any]
+) -> dict[str, GoodweRuntimeData]:
+    """Answer the runtime data of the inverters targeted by the service call.
+
+    Explicitly targeted devices and serial numbers must be loaded inverters,
+    devices of the targeted entities and areas which are not inverters are ignored.
+    Inverters are answered by their serial number.
+    """
+    index = async_get_inverter_index(hass)
+    inverters: dict[str, GoodweRuntimeData] = {}
+    for device_id in data.get(ATTR_DEVICE_ID, ()):
+        runtime_data = _runtime_data_by_device_id(hass, device_id)
+        inverters[runtime_data.inverter.serial_number] = runtime_data
+    for serial_number in data.get(ATTR_SERIAL_NUMBER, ()):
+        if (runtime_data := index.by_serial_number(serial_number)) is None:
+            raise ServiceValidationError(
+                f"Inverter with serial number {serial_number} not found"
+            )
+        inverters[serial_number] = runtime_data
+
+    device_ids: set[str] = set()
+    entity_registry = er.async_get(hass)
+    for entity_id in data.get(ATTR_ENTITY_ID, ()):
+        if (entity := entity_registry.async_get(entity_id)) and entity.device_id:
+            device_ids.add(entity.device_id)
+    if area_ids := data.get(ATTR_AREA_ID):
+        device_registry = dr.async_get(hass)
+        for area_id in area_ids:
+            device_ids.update(
+                device.id
+                for device in dr.async_entries_for_area(device_registry, area_id)
+            )
+            device_ids.update(
+                entity.device_id
+                for entity in er.async_entries_for_area(entity_registry, area_id)
+                if entity.device_id
+            )
+    for device_id in device_ids:
+        if (runtime_data := index.by_device_id(device_id)) is not None:
+            inverters[runtime_data.inverter.serial_number] = runtime_data
+
+    if not inverters:
+        raise ServiceValidationError("No inverter targeted")
+    return inverters
+
+
+async def _async_fan_out[T](
+    inverters: dict[str, GoodweRuntimeData],
+    action: Callable[[GoodweRuntimeData], Awaitable[T]],
+) -> dict[str, T]:
+    """Run the action on all the inverters concurrently, answer its results.
+
+    All the inverters are processed even if some of them fail. Failure of single
+    inverter is re-raised, failures of more of them are reported together.
+    """
+    results = await asyncio.gather(
+        *(action(runtime_data) for runtime_data in inverters.values()),
+        return_exceptions=True,
+    )
+    failures = {
+        serial_number: result
+        for serial_number, result in zip(inverters, results, strict=True)
+        if isinstance(result, BaseException)
+    }
+    if len(failures) == 1:
+        raise next(iter(failures.values()))
+    if failures:
+        error = (
+            ServiceValidationError
+            if all(isinstance(f, ServiceValidationError) for f in failures.values())
+            else HomeAssistantError
+        )
+        raise error(
+            "; ".join(f"{serial}: {failure}" for serial, failure in failures.items())
+        )
+    return dict(zip(inverters, results, strict=True))
+
 
 async def async_setup_services(hass: HomeAssistant) -> None:
     """Set up services for Goodwe integration."""
@@ -44,14 +214,6 @@ async def async_setup_services(hass: HomeAssistant) -> None:
     if hass.services.has_service(DOMAIN, SERVICE_GET_PARAMETER):
         return
 
-    async def _get_inverter_by_device_id(hass: HomeAssistant, device_id: str):
-        """Return a inverter instance given a device_id."""
-        device = dr.async_get(hass).async_get(device_id)
-        for runtime_data in hass.data[DOMAIN].values():
-            if device.identifiers == runtime_data.device_info.get("identifiers"):
-                return runtime_data.inverter
-        raise ValueError(f"Inverter for device id {device_id} not found")
-
     async def async_get_parameter(call):
         """Service for setting inverter parameter."""
         device_id = call.data[ATTR_DEVICE_ID]
@@ -59,8 +221,12 @@ async def async_setup_services(hass: HomeAssistant) -> None:
         entity_id = call.data[ATTR_ENTITY_ID]
 
         _LOGGER.debug("Reading inverter parameter '%s'", parameter)
-        inverter = await _get_inverter_by_device_id(hass, device_id)
-        value = await inverter.read_setting(parameter)
+        runtime_data = _runtime_data_by_device_id(hass, device_id)
+        value = await runtime_data.coordinator.scheduler.async_request(
+            lambda inv: inv.read_setting(parameter),
+            RequestPriority.INTERACTIVE,
+            key=("setting", parameter),
+        )
 
         entity = er.async_get(hass).async_get(entity_id)
         await hass.services.async_call(
@@ -71,14 +237,98 @@ async def async_setup_services(hass: HomeAssistant) -> None:
         )
 
     async def async_set_parameter(call):
-        """Service for setting inverter parameter."""
-        device_id = call.data[ATTR_DEVICE_ID]
+        """Service for setting inverter parameter (of all the targeted inverters)."""
         parameter = call.data[ATTR_PARAMETER]
         value = call.data[ATTR_VALUE]
 
         _LOGGER.info("Setting inverter parameter '%s' to '%s'", parameter, value)
-        inverter = await _get_inverter_by_device_id(hass, device_id)
-        await inverter.write_setting(parameter, value)
+        # Wait for the (coalesced) writes to complete, failure is reported to caller
+        await _async_fan_out(
+            _targeted_inverters(hass, call.data),
+            lambda runtime_data: runtime_data.writes.async_write(
+                parameter, lambda inv: inv.write_setting(parameter, value)
+            ),
+        )
+
+    async def _async_read_parameters(
+        runtime_data: GoodweRuntimeData, parameters: list[str]
+    ) -> dict[str, Any]:
+        try:
+            values = await async_read_parameters(
+                runtime_data.inverter, runtime_data.coordinator.scheduler, parameters
+            )
+        except ValueError as err:
+            raise ServiceValidationError(str(err)) from err
+        except InverterError as err:
+            raise HomeAssistantError(
+                f"Failed to read inverter parameters: {err}"
+            ) from err
+        return {
+            ATTR_PARAMETERS: {
+                parameter: response_value(value) for parameter, value in values.items()
+            }
+        }
+
+    async def async_get_parameters(call: ServiceCall) -> ServiceResponse:
+        """Service for reading inverter parameters (in as few requests as possible)."""
+        parameters = call.data[ATTR_PARAMETERS]
+        return await _async_fan_out(
+            _targeted_inverters(hass, call.data),
+            lambda runtime_data: _async_read_parameters(runtime_data, parameters),
+        )
+
+    async def _async_write_parameters(
+        runtime_data: GoodweRuntimeData, parameters: dict[str, Any]
+    ) -> None:
+        # Settings changes still waiting in the queue are written first
+        await runtime_data.writes.async_flush()
+        try:
+            await async_write_parameters(
+                runtime_data.inverter, runtime_data.coordinator.scheduler, parameters
+            )
+        except ValueError as err:
+            raise ServiceValidationError(str(err)) from err
+        except InverterError as err:
+            raise HomeAssistantError(
+                f"Failed to write inverter parameters: {err}"
+            ) from err
+
+    async def async_set_parameters(call: ServiceCall) -> None:
+        """Service for setting inverter parameters (all of them or none per inverter)."""
+        parameters = call.data[ATTR_PARAMETERS]
+
+        _LOGGER.info("Setting inverter parameters %s", parameters)
+        await _async_fan_out(
+            _targeted_inverters(hass, call.data),
+            lambda runtime_data: _async_write_parameters(runtime_data, parameters),
+        )
+
+    async def _async_get_schedule(runtime_data: GoodweRuntimeData) -> dict[str, Any]:
+        return {ATTR_WINDOWS: [w.as_dict() for w in runtime_data.schedule.windows]}
+
+    async def async_get_schedule(call: ServiceCall) -> ServiceResponse:
+        """Service for reading the inverter time-of-use schedule."""
+        return await _async_fan_out(
+            _targeted_inverters(hass, call.data), _async_get_schedule
+        )
+
+    async def _async_set_schedule(
+        runtime_data: GoodweRuntimeData, windows: list[ScheduleWindow]
+    ) -> None:
+        try:
+            await runtime_data.schedule.async_set(windows)
+        except ValueError as err:
+            raise ServiceValidationError(str(err)) from err
+
+    async def async_set_schedule(call: ServiceCall) -> None:
+        """Service for replacing the inverter time-of-use schedule."""
+        windows = call.data[ATTR_WINDOWS]
+
+        _LOGGER.info("Setting inverter schedule %s", [w.as_dict() for w in windows])
+        await _async_fan_out(
+            _targeted_inverters(hass, call.data),
+            lambda runtime_data: _async_set_schedule(runtime_data, windows),
+        )
 
     hass.services.async_register(
         DOMAIN,
@@ -92,6 +342,32 @@ async def async_setup_services(hass: HomeAssistant) -> None:
         async_set_parameter,
         schema=SERVICE_SET_PARAMETER_SCHEMA,
     )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_PARAMETERS,
+        async_get_parameters,
+        schema=SERVICE_GET_PARAMETERS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_PARAMETERS,
+        async_set_parameters,
+        schema=SERVICE_SET_PARAMETERS_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_SCHEDULE,
+        async_get_schedule,
+        schema=SERVICE_GET_SCHEDULE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_SCHEDULE,
+        async_set_schedule,
+        schema=SERVICE_SET_SCHEDULE_SCHEMA,
+    )
 
 
 async def async_unload_services(hass: HomeAssistant) -> None:
@@ -102,3 +378,15 @@ async def async_unload_services(hass: HomeAssistant) -> None:
 
     if hass.services.has_service(DOMAIN, SERVICE_SET_PARAMETER):
         hass.services.async_remove(DOMAIN, SERVICE_SET_PARAMETER)
+
+    if hass.services.has_service(DOMAIN, SERVICE_GET_PARAMETERS):
+        hass.services.async_remove(DOMAIN, SERVICE_GET_PARAMETERS)
+
+    if hass.services.has_service(DOMAIN, SERVICE_SET_PARAMETERS):
+        hass.services.async_remove(DOMAIN, SERVICE_SET_PARAMETERS)
+
+    if hass.services.has_service(DOMAIN, SERVICE_GET_SCHEDULE):
+        hass.services.async_remove(DOMAIN, SERVICE_GET_SCHEDULE)
+
+    if hass.services.has_service(DOMAIN, SERVICE_SET_SCHEDULE):
+        hass.services.async_remove(DOMAIN, SERVICE_SET_SCHEDULE)
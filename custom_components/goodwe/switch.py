@@ -4,19 +4,23 @@ from dataclasses import dataclass
 import logging
 from typing import Any
 
-from goodwe import Inverter, InverterError
+from goodwe import Inverter
 from homeassistant.components.switch import (
     SwitchDeviceClass,
     SwitchEntity,
     SwitchEntityDescription,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo, EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import BaseCoordinatorEntity
 
+from .const import SIGNAL_SETTINGS_UPDATED
 from .coordinator import GoodweUpdateCoordinator
+from .scheduler import RequestPriority
+from .writes import InverterWriteQueue
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -76,15 +80,15 @@ async def async_setup_entry(
     inverter = config_entry.runtime_data.inverter
     coordinator = config_entry.runtime_data.coordinator
     device_info = config_entry.runtime_data.device_info
+    settings = config_entry.runtime_data.settings
+    writes = config_entry.runtime_data.writes
 
     entities = []
 
     for description in SWITCHES:
-        try:
-            current_state = await inverter.read_setting(description.setting)
-        except (InverterError, ValueError):
+        if description.setting not in settings:
             # Inverter model does not support this feature
-            _LOGGER.debug("Could not read %s value", description.setting)
+            _LOGGER.debug("Inverter setting %s not supported", description.setting)
         else:
             entities.append(
                 InverterSwitchEntity(
@@ -92,7 +96,8 @@ async def async_setup_entry(
                     device_info,
                     description,
                     inverter,
-                    current_state == 1,
+                    writes,
+                    settings[description.setting] == 1,
                 )
             )
 
@@ -114,6 +119,7 @@ class InverterSwitchEntity(
         device_info: DeviceInfo,
         description: GoodweSwitchEntityDescription,
         inverter: Inverter,
+        writes: InverterWriteQueue,
         current_is_on: bool,
     ) -> None:
         """Initialize the inverter operation mode setting entity."""
@@ -123,31 +129,75 @@ class InverterSwitchEntity(
         self._attr_device_info = device_info
         self._attr_is_on = current_is_on
         self._inverter: Inverter = inverter
+        self._writes: InverterWriteQueue = writes
+
+    async def async_added_to_hass(self) -> None:
+        """Register the entity for state polling (if needed) and settings updates."""
+        await super().async_added_to_hass()
         self._notify_coordinator()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_SETTINGS_UPDATED.format(self._inverter.serial_number),
+                self._async_settings_updated,
+            )
+        )
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Unregister the entity from state polling."""
+        await super().async_will_remove_from_hass()
+        if self.entity_description.polling_interval:
+            self.coordinator.entity_state_polling(
+                self, self.entity_description.setting, 0
+            )
 
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn the switch on."""
-        await self._inverter.write_setting(self.entity_description.setting, 1)
+        await self._write_setting(1)
         self._attr_is_on = True
         self._notify_coordinator()
         self.async_write_ha_state()
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the switch off."""
-        await self._inverter.write_setting(self.entity_description.setting, 0)
+        await self._write_setting(0)
         self._attr_is_on = False
         self._notify_coordinator()
         self.async_write_ha_state()
 
     async def async_update(self) -> None:
         """Get the current value from inverter."""
-        value = await self._inverter.read_setting(self.entity_description.setting)
+        setting = self.entity_description.setting
+        value = await self.coordinator.scheduler.async_request(
+            lambda inv: inv.read_setting(setting),
+            RequestPriority.INTERACTIVE,
+            key=("setting", setting),
+        )
         self._attr_is_on = value == 1
         self._notify_coordinator()
 
+    @callback
+    def polled_setting_updated(self, value: Any) -> None:
+        """Update the state from the setting value polled by the coordinator."""
+        self._attr_is_on = value == 1
+        self._notify_coordinator()
+        self.async_write_ha_state()
+
+    @callback
+    def _async_settings_updated(self, values: dict[str, Any]) -> None:
+        if (value := values.get(self.entity_description.key)) is not None:
+            self.polled_setting_updated(value)
+
+    async def _write_setting(self, value: int) -> None:
+        setting = self.entity_description.setting
+        await self._writes.async_write(
+            setting, lambda inv: inv.write_setting(setting, value)
+        )
+
     def _notify_coordinator(self) -> None:
         if self.entity_description.polling_interval:
             self.coordinator.entity_state_polling(
                 self,
+                self.entity_description.setting,
                 self.entity_description.polling_interval if self._attr_is_on else 0,
             )
@@ -0,0 +1,182 @@
+"""Adaptive network timeout and retries of the requests to Goodwe inverter."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Hashable
+from dataclasses import asdict, dataclass
+import logging
+import time
+from typing import Any
+
+from goodwe import RequestFailedException
+from goodwe.protocol import (
+    Aa55ProtocolCommand,
+    Aa55ReadCommand,
+    InverterProtocol,
+    ModbusRtuReadCommand,
+    ModbusTcpReadCommand,
+    ProtocolCommand,
+    ProtocolResponse,
+)
+
+from .instrumentation import RequestInstrumentation, RequestObserver
+
+_LOGGER = logging.getLogger(__name__)
+
+# Bounds of the adaptive request timeout (s)
+MIN_TIMEOUT = 0.05
+MAX_TIMEOUT = 10
+# Gains of the smoothed round-trip time and its variance (RFC 6298)
+_RTT_ALPHA = 1 / 8
+_RTT_BETA = 1 / 4
+# Weight of the round-trip time variance in the timeout
+_RTT_K = 4
+
+_READ_COMMANDS = (Aa55ReadCommand, ModbusRtuReadCommand, ModbusTcpReadCommand)
+
+
+def request_class(command: ProtocolCommand) -> Hashable:
+    """Answer the class of requests with similar round-trip time.
+
+    Reads are classed by the (power of 2) number of registers, since
+    the response time grows with its size, other commands by their type.
+    """
+    if isinstance(command, _READ_COMMANDS):
+        return f"read {1 << (command.value.bit_length() - 1)}+"
+    if type(command) is Aa55ProtocolCommand:
+        # Fixed commands (e.g. device info, runtime data)
+        return command.request.hex()
+    return type(command).__name__
+
+
+@dataclass
+class RoundTripEstimate:
+    """Smoothed round-trip time, its variance and timeout of a request class."""
+
+    timeout: float
+    srtt: float | None = None
+    rttvar: float = 0
+
+    def add_sample(self, round_trip: float) -> None:
+        """Update the round-trip time estimate and the timeout derived from it."""
+        if self.srtt is None:
+            self.srtt = round_trip
+            self.rttvar = round_trip / 2
+        else:
+            self.rttvar = (1 - _RTT_BETA) * self.rttvar + _RTT_BETA * abs(
+                self.srtt - round_trip
+            )
+            self.srtt = (1 - _RTT_ALPHA) * self.srtt + _RTT_ALPHA * round_trip
+        self.timeout = min(
+            max(self.srtt + _RTT_K * self.rttvar, MIN_TIMEOUT), MAX_TIMEOUT
+        )
+
+
+class AdaptiveTransport(RequestObserver):
+    """Request timeout derived from the inverter round-trip time and retry budget.
+
+    Smoothed round-trip time (SRTT) and its variance (RTTVAR) are estimated
+    as in TCP (RFC 6298) from the requests answered without retry (Karn's
+    algorithm) and the request timeout is set to SRTT + 4 * RTTVAR.
+    Failed request doubles the timeout until next valid sample.
+    The estimates are kept per request class (e.g. small and large reads),
+    so the quick requests do not shorten the timeout of the slow ones.
+    The configured timeout is used until the first sample of the class
+    (or always, when the timeout is not adaptive).
+
+    Retries of the (polling) requests sent within an update cycle share the cycle
+    budget of configured retries and are limited so the cycle finishes within its
+    deadline. Other requests (e.g. writes sent in between) are not budgeted.
+    """
+
+    def __init__(
+        self,
+        instrumentation: RequestInstrumentation,
+        timeout: float,
+        retries: int,
+        adaptive: bool = True,
+        budgeted: Callable[[], bool] = lambda: True,
+    ) -> None:
+        """Initialize the transport policy and observe the inverter requests.
+
+        The budgeted predicate answers if the request being sent is part of
+        the update cycle.
+        """
+        self.estimates: dict[Hashable, RoundTripEstimate] = {}
+        self._timeout = timeout
+        self._adaptive = adaptive
+        self._retries = retries
+        self._budgeted = budgeted
+        self._cycle_retries: int = 0
+        self._deadline: float | None = None
+        instrumentation.add_observer(self)
+
+    def start_cycle(self, budget: float) -> None:
+        """Start update cycle, its requests have to finish within budget (s)."""
+        self._deadline = time.monotonic() + budget
+        self._cycle_retries = 0
+
+    def end_cycle(self) -> None:
+        """Finish update cycle, following requests use all the configured retries."""
+        self._deadline = None
+
+    def estimate(self, command: ProtocolCommand) -> RoundTripEstimate:
+        """Answer the round-trip time estimate of the command request class."""
+        key = request_class(command)
+        if (estimate := self.estimates.get(key)) is None:
+            estimate = self.estimates[key] = RoundTripEstimate(self._timeout)
+        return estimate
+
+    def request_policy(
+        self, command: ProtocolCommand, budgeted: bool = True
+    ) -> tuple[float, int]:
+        """Answer the timeout and number of retries of the command request."""
+        timeout = self.estimate(command).timeout
+        if self._deadline is None or not budgeted:
+            return timeout, self._retries
+        remaining = self._deadline - time.monotonic()
+        timeout = min(timeout, max(remaining, MIN_TIMEOUT))
+        # Each attempt may take up to the timeout
+        retries = min(self._retries - self._cycle_retries, int(remaining / timeout) - 1)
+        return timeout, max(retries, 0)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Answer the estimates of the request classes (for diagnostics)."""
+        return {str(key): asdict(value) for key, value in self.estimates.items()}
+
+    def request_started(
+        self, protocol: InverterProtocol, command: ProtocolCommand
+    ) -> None:
+        """Set the timeout and retries of the request."""
+        protocol.timeout, protocol.retries = self.request_policy(
+            command, self._budgeted()
+        )
+
+    def request_retried(self, command: ProtocolCommand) -> None:
+        """Count the retry in the cycle budget."""
+        if self._budgeted():
+            self._cycle_retries += 1
+
+    def request_answered(
+        self,
+        command: ProtocolCommand,
+        response: ProtocolResponse,
+        elapsed: float,
+        retried: bool,
+    ) -> None:
+        """Sample the round-trip time of request answered without retry."""
+        if self._adaptive and not retried:
+            self.estimate(command).add_sample(elapsed)
+
+    def request_failed(
+        self, command: ProtocolCommand, err: Exception, elapsed: float
+    ) -> None:
+        """Back off the timeout of the request class after failed request."""
+        if self._adaptive and isinstance(err, RequestFailedException):
+            estimate = self.estimate(command)
+            estimate.timeout = min(estimate.timeout * 2, MAX_TIMEOUT)
+            _LOGGER.debug(
+                "Request %s failed, timeout set to %.3fs",
+                request_class(command),
+                estimate.timeout,
+            )
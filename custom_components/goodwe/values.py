@@ -0,0 +1,181 @@
+"""Last known values of the inverter sensors."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# Period (s) of persisting the changed values (pending values are written on shutdown)
+_SAVE_DELAY = 300
+# Only plain values can be persisted
+_PLAIN_TYPES = (bool, int, float, str)
+
+
+@dataclass(slots=True)
+class KnownValue:
+    """Last good value of the sensor, when and in which update cycle it was read."""
+
+    value: Any
+    updated: datetime
+    cycle: int
+
+
+class SensorValueStore:
+    """Last good values of the inverter sensors, persisted across restarts.
+
+    Values are kept in preallocated arrays indexed by fixed sensor slots
+    (entities read their values by slot). Values read in (partial) update
+    cycles are merged into the store, missing (None) values never replace
+    the known ones.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, serial_number: str, sensors: Iterable[str] = ()
+    ) -> None:
+        """Initialize the store with slots of the (known) sensors."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{serial_number}.values"
+        )
+        self._slots: dict[str, int] = {}
+        self._values: list[Any] = []
+        self._previous: list[Any] = []
+        self._updated: list[datetime | None] = []
+        self._cycles: list[int] = []
+        self.cycle: int = 0
+        self._save_scheduled = False
+        for sensor in sensors:
+            self.slot(sensor)
+
+    def slot(self, sensor: str) -> int:
+        """Answer the slot of the sensor value, allocate new one if needed."""
+        if (slot := self._slots.get(sensor)) is None:
+            slot = self._slots[sensor] = len(self._values)
+            self._values.append(None)
+            self._previous.append(None)
+            self._updated.append(None)
+            self._cycles.append(0)
+        return slot
+
+    async def async_load(self) -> None:
+        """Load the values persisted by previous run."""
+        data = await self._store.async_load()
+        if not data:
+            return
+        try:
+            cycle = data["cycle"]
+            for sensor, (value, updated, read_cycle) in data["values"].items():
+                if (timestamp := dt_util.parse_datetime(updated)) is not None:
+                    slot = self.slot(sensor)
+                    self._values[slot] = value
+                    self._updated[slot] = timestamp
+                    self._cycles[slot] = read_cycle
+        except (KeyError, TypeError, ValueError):
+            _LOGGER.debug("Ignoring invalid persisted sensor values %s", data)
+            for slot in range(len(self._values)):
+                self._values[slot] = self._updated[slot] = None
+                self._cycles[slot] = 0
+        else:
+            self.cycle = cycle
+
+    async def async_flush(self) -> None:
+        """Persist the values now (e.g. before the entry is reloaded)."""
+        await self._store.async_save(self._data_to_save())
+
+    async def async_remove(self) -> None:
+        """Remove the persisted values."""
+        await self._store.async_remove()
+
+    def _schedule_save(self) -> None:
+        """Schedule persisting of the values (unless already scheduled).
+
+        Store restarts the delay on every call, so scheduling it on each update
+        cycle would postpone the save for as long as the inverter is polled.
+        """
+        if not self._save_scheduled:
+            self._save_scheduled = True
+            self._store.async_delay_save(self._data_to_save, _SAVE_DELAY)
+
+    def _data_to_save(self) -> dict[str, Any]:
+        self._save_scheduled = False
+        return {
+            "cycle": self.cycle,
+            "values": {
+                sensor: [
+                    self._values[slot],
+                    self._updated[slot].isoformat(),
+                    self._cycles[slot],
+                ]
+                for sensor, slot in self._slots.items()
+                if type(self._values[slot]) in _PLAIN_TYPES
+            },
+        }
+
+    def start_cycle(self) -> int:
+        """Start new update cycle, answer its number."""
+        self.cycle += 1
+        return self.cycle
+
+    def merge(self, data: dict[str, Any]) -> None:
+        """Merge the values read in current update cycle."""
+        now = dt_util.utcnow()
+        slots = self._slots
+        values = self._values
+        for sensor, value in data.items():
+            if value is None:
+                continue
+            if (slot := slots.get(sensor)) is None:
+                slot = self.slot(sensor)
+            self._previous[slot] = values[slot]
+            values[slot] = value
+            self._updated[slot] = now
+            self._cycles[slot] = self.cycle
+        self._schedule_save()
+
+    def reset(self, sensor: str, value: Any) -> None:
+        """Set the sensor value (also as its previous value)."""
+        slot = self.slot(sensor)
+        self._values[slot] = self._previous[slot] = value
+        self._updated[slot] = dt_util.utcnow()
+        self._cycles[slot] = self.cycle
+        self._schedule_save()
+
+    def known(self, sensor: str) -> KnownValue | None:
+        """Answer the last known value of the sensor (with its read time and cycle)."""
+        slot = self._slots.get(sensor)
+        if slot is None or (updated := self._updated[slot]) is None:
+            return None
+        return KnownValue(self._values[slot], updated, self._cycles[slot])
+
+    def value(self, sensor: str) -> Any:
+        """Answer the last known value of the sensor (None if it was never read)."""
+        slot = self._slots.get(sensor)
+        return self._values[slot] if slot is not None else None
+
+    def value_at(self, slot: int) -> Any:
+        """Answer the last known value in the slot."""
+        return self._values[slot]
+
+    def previous_at(self, slot: int) -> Any:
+        """Answer the value in the slot before it was last read."""
+        return self._previous[slot]
+
+    def as_data(self) -> dict[str, Any]:
+        """Answer all the last known values."""
+        return {
+            sensor: value
+            for sensor, slot in self._slots.items()
+            if (value := self._values[slot]) is not None
+        }
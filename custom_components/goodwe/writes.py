@@ -0,0 +1,105 @@
+"""Coalesced writes of the inverter settings."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import logging
+from typing import Any
+
+from goodwe import Inverter, InverterError
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+from .scheduler import InverterScheduler, RequestPriority
+
+_LOGGER = logging.getLogger(__name__)
+
+type WriteAction = Callable[[Inverter], Awaitable[Any]]
+
+
+class InverterWriteQueue:
+    """Per inverter queue of pending settings writes.
+
+    Writes are debounced by the settle window, pending writes of the same setting
+    (key) are merged into single (last requested) write and the writes are sent
+    by the scheduler (with priority over reads).
+    Callers await the completion (or failure) of the actual write.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        inverter: Inverter,
+        scheduler: InverterScheduler,
+        settle_window: float,
+    ) -> None:
+        """Initialize the write queue."""
+        self._hass = hass
+        self._inverter = inverter
+        self._scheduler = scheduler
+        self._settle_window = settle_window
+        self._pending: dict[str, tuple[WriteAction, list[asyncio.Future[None]]]] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flush_task: asyncio.Task[None] | None = None
+
+    async def async_write(self, key: str, action: WriteAction) -> None:
+        """Queue the write of the setting (key) and wait for its completion.
+
+        Raise the exception (e.g. InverterError) of the failed write.
+        """
+        future: asyncio.Future[None] = self._hass.loop.create_future()
+        _, waiters = self._pending.get(key, (None, []))
+        if waiters:
+            _LOGGER.debug("Merging pending write of %s", key)
+        self._pending[key] = (action, [*waiters, future])
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self._flush_handle = self._hass.loop.call_later(
+            self._settle_window, self._schedule_flush
+        )
+        await future
+
+    def _schedule_flush(self) -> None:
+        self._flush_handle = None
+        self._flush_task = self._hass.async_create_background_task(
+            self.async_flush(), f"{self._inverter.serial_number} settings writes"
+        )
+
+    async def async_flush(self) -> None:
+        """Execute all the pending writes (now).
+
+        Writes already being executed by the scheduled flush are awaited as well,
+        so the entry unload does not cut them off.
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if (
+            (task := self._flush_task) is not None
+            and task is not asyncio.current_task()
+            and not task.done()
+        ):
+            await asyncio.shield(task)
+        pending, self._pending = self._pending, {}
+        try:
+            for key, (action, waiters) in pending.items():
+                _LOGGER.debug("Writing inverter setting %s", key)
+                try:
+                    await self._scheduler.async_request(action, RequestPriority.WRITE)
+                except (InverterError, HomeAssistantError, ValueError) as err:
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_exception(err)
+                else:
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_result(None)
+        finally:
+            # Do not leave the callers waiting when the flush was interrupted
+            for key, (_, waiters) in pending.items():
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(
+                            HomeAssistantError(f"Write of setting {key} was cancelled")
+                        )
@@ -0,0 +1,564 @@
+"""Benchmark of the integration setup and refresh cycle against simulated inverters.
+
+Runs Home Assistant (installed in the python environment) with the integration
+configured for 1, 10 and 50 virtual inverters (see inverter_simulator.py) and
+measures for each fleet size:
+
+  - setup wall time of all the config entries (and of the individual platforms)
+  - p50/p99 latency of the coordinator refresh (excluding the fleet poll slot wait)
+  - entity state writes per refresh
+  - memory allocated (peak) per refresh and retained over the measured cycles
+  - event loop blocking (lag of a periodic timer)
+
+Results are stored as JSON and can be compared with results of previous version:
+
+    python inverter_benchmark.py --output after.json --baseline before.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from collections.abc import AsyncIterator, Callable, Mapping
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+from importlib import import_module, metadata
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any
+
+from homeassistant import bootstrap, runner
+from homeassistant.config_entries import SOURCE_USER, ConfigEntry, ConfigEntryState
+from homeassistant.const import (
+    CONF_HOST,
+    CONF_PORT,
+    CONF_PROTOCOL,
+    CONF_SCAN_INTERVAL,
+    EVENT_STATE_CHANGED,
+)
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.data_entry_flow import FlowResultType
+from homeassistant.helpers import entity_registry as er
+from homeassistant.setup import async_get_setup_timings
+
+from inverter_simulator import (
+    Faults,
+    async_start_inverters,
+    create_inverters,
+    inverter_address,
+    stop_inverters,
+)
+
+try:
+    from homeassistant.const import EVENT_STATE_REPORTED
+except ImportError:  # Home Assistant < 2024.5
+    EVENT_STATE_REPORTED = None
+
+_LOGGER = logging.getLogger(__name__)
+
+COMPONENT = Path(__file__).parent / "custom_components" / "goodwe"
+DOMAIN = "goodwe"
+
+FLEET_SIZES = (1, 10, 50)
+# Lag of the periodic timer considered as blocked event loop
+BLOCKING_LAG = 0.01
+LAG_PROBE_INTERVAL = 0.005
+
+# Metrics compared with the baseline (lower is better)
+COMPARED_METRICS = (
+    "start_s",
+    "setup_s",
+    "refresh_p50_ms",
+    "refresh_p99_ms",
+    "state_writes_per_refresh",
+    "alloc_peak_kib_per_refresh",
+    "loop_blocked_ms",
+)
+
+CONFIGURATION_YAML = """
+homeassistant:
+  name: Benchmark
+  latitude: 50.08
+  longitude: 14.42
+  elevation: 0
+  unit_system: metric
+  time_zone: UTC
+"""
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    """Answer the (nearest rank) percentile of the values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def _ms(value: float | None) -> float | None:
+    return round(value * 1000, 3) if value is not None else None
+
+
+class RefreshStats:
+    """Durations of the coordinators refreshes, fleet poll slot waits excluded."""
+
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+        self.allocations: list[int] = []
+        self.failures = 0
+        self.refreshes: dict[str, int] = defaultdict(int)
+        self.trace_allocations = False
+        self._slot_waits: dict[asyncio.Task, float] = defaultdict(float)
+        self._cycles_done: asyncio.Event = asyncio.Event()
+        self._cycles = 0
+
+    def instrument_fleet(self, fleet: Any) -> None:
+        """Record the time refreshes wait for their fleet poll slot."""
+        wait_poll_slot = fleet.async_wait_poll_slot
+
+        async def _timed_wait_poll_slot(interval: float) -> None:
+            start = time.perf_counter()
+            try:
+                await wait_poll_slot(interval)
+            finally:
+                self._slot_waits[asyncio.current_task()] += time.perf_counter() - start
+
+        fleet.async_wait_poll_slot = _timed_wait_poll_slot
+
+    def instrument_coordinator(self, entry_id: str, coordinator: Any) -> None:
+        """Record the duration of the coordinator refreshes."""
+        update_data = coordinator._async_update_data  # pylint: disable=protected-access
+        self.refreshes[entry_id] = 0
+
+        async def _timed_update_data() -> Any:
+            task = asyncio.current_task()
+            self._slot_waits.pop(task, None)
+            if self.trace_allocations:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            try:
+                return await update_data()
+            except Exception:
+                self.failures += 1
+                raise
+            finally:
+                duration = time.perf_counter() - start
+                self.latencies.append(duration - self._slot_waits.pop(task, 0))
+                if self.trace_allocations:
+                    self.allocations.append(tracemalloc.get_traced_memory()[1] - base)
+                self.refreshes[entry_id] += 1
+                if self._cycles and min(self.refreshes.values()) >= self._cycles:
+                    self._cycles_done.set()
+
+        coordinator._async_update_data = _timed_update_data  # pylint: disable=protected-access
+
+    def reset(self) -> None:
+        """Start new measurement."""
+        self.latencies.clear()
+        self.allocations.clear()
+        self.failures = 0
+        for entry_id in self.refreshes:
+            self.refreshes[entry_id] = 0
+
+    async def async_wait_cycles(self, cycles: int, timeout: float) -> None:
+        """Wait until all the coordinators have refreshed given number of times."""
+        self._cycles = cycles
+        self._cycles_done.clear()
+        try:
+            await asyncio.wait_for(self._cycles_done.wait(), timeout)
+        except TimeoutError:
+            _LOGGER.warning(
+                "Only %d refresh cycles completed in %ds",
+                min(self.refreshes.values(), default=0),
+                timeout,
+            )
+        self._cycles = 0
+
+
+class LoopLagMonitor:
+    """Measure the event loop lag (blocking) by periodic timer."""
+
+    def __init__(self) -> None:
+        self.lags: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start monitoring."""
+        self.lags.clear()
+        self._task = asyncio.create_task(self._async_monitor())
+
+    def stop(self) -> None:
+        """Stop monitoring."""
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _async_monitor(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            self.lags.append(max(0.0, loop.time() - start - LAG_PROBE_INTERVAL))
+
+
+class StateWriteCounter:
+    """Count the state writes of the integration entities."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.writes = 0
+        self._hass = hass
+        self._entity_ids: set[str] = set()
+        self._unsubscribe: list[Callable[[], None]] = []
+
+    def start(self) -> None:
+        """Start counting."""
+        self.writes = 0
+        self._entity_ids = {
+            entity.entity_id
+            for entity in er.async_get(self._hass).entities.values()
+            if entity.platform == DOMAIN
+        }
+        self._unsubscribe = [
+            self._hass.bus.async_listen(
+                event_type, self._async_count, event_filter=self._async_filter
+            )
+            for event_type in (EVENT_STATE_CHANGED, EVENT_STATE_REPORTED)
+            if event_type is not None
+        ]
+
+    def stop(self) -> None:
+        """Stop counting."""
+        for unsubscribe in self._unsubscribe:
+            unsubscribe()
+        self._unsubscribe = []
+
+    @callback
+    def _async_filter(self, event_data: Mapping[str, Any]) -> bool:
+        return event_data.get("entity_id") in self._entity_ids
+
+    @callback
+    def _async_count(self, event: Event) -> None:
+        self.writes += 1
+
+
+def _instrument_platforms(durations: dict[str, list[float]]) -> None:
+    """Record the duration of the platforms async_setup_entry."""
+    const = import_module(f"custom_components.{DOMAIN}.const")
+    for platform_name in const.PLATFORMS:
+        module = import_module(f"custom_components.{DOMAIN}.{platform_name}")
+        setup_entry = module.async_setup_entry
+
+        async def _timed_setup_entry(
+            *args, _setup=setup_entry, _name=str(platform_name)
+        ):
+            start = time.perf_counter()
+            try:
+                return await _setup(*args)
+            finally:
+                durations[_name].append(time.perf_counter() - start)
+
+        module.async_setup_entry = _timed_setup_entry
+
+
+def _prepare_config_dir(config_dir: str) -> None:
+    """Create Home Assistant configuration with the integration."""
+    Path(config_dir, "configuration.yaml").write_text(CONFIGURATION_YAML)
+    Path(config_dir, "custom_components").mkdir()
+    Path(config_dir, "custom_components", DOMAIN).symlink_to(COMPONENT.resolve())
+
+
+async def _async_start_hass(config_dir: str) -> HomeAssistant:
+    """Start Home Assistant (and the configured inverters)."""
+    hass = await bootstrap.async_setup_hass(
+        runner.RuntimeConfig(config_dir=config_dir, skip_pip=True)
+    )
+    if hass is None:
+        raise RuntimeError("Home Assistant could not be started")
+    if hass.config.recovery_mode:
+        # Custom integrations are not loaded in recovery mode
+        raise RuntimeError(
+            f"Home Assistant started in recovery mode, see {config_dir}/home-assistant.log"
+        )
+    await hass.async_start()
+    await hass.async_block_till_done()
+    return hass
+
+
+@asynccontextmanager
+async def _simulated_inverters(
+    args: argparse.Namespace, count: int
+) -> AsyncIterator[None]:
+    """Run the virtual inverters."""
+    capture = None
+    if args.capture:
+        capture = json.loads(Path(args.capture).read_text(encoding="utf-8"))
+    servers = await async_start_inverters(
+        create_inverters(count, args.family, capture, noise=args.noise),
+        Faults(args.latency, args.jitter, args.loss),
+        args.host,
+        args.port,
+        udp=args.protocol == "UDP",
+        tcp=args.protocol == "TCP",
+        spread=args.protocol == "UDP",
+    )
+    try:
+        yield
+    finally:
+        stop_inverters(servers)
+
+
+async def async_configure(
+    args: argparse.Namespace, count: int, config_dir: str
+) -> None:
+    """Configure the integration for the virtual inverters (by its config flow)."""
+    const = import_module(f"custom_components.{DOMAIN}.const")
+    async with _simulated_inverters(args, count):
+        hass = await _async_start_hass(config_dir)
+        try:
+            for index in range(count):
+                host, port = inverter_address(
+                    args.host, args.port, index, args.protocol == "UDP"
+                )
+                result = await hass.config_entries.flow.async_init(
+                    DOMAIN,
+                    context={"source": SOURCE_USER},
+                    data={
+                        CONF_HOST: host,
+                        CONF_PORT: port,
+                        CONF_PROTOCOL: args.protocol,
+                        const.CONF_MODEL_FAMILY: args.family,
+                    },
+                )
+                if result["type"] is not FlowResultType.CREATE_ENTRY:
+                    raise RuntimeError(
+                        f"Inverter {host}:{port} not configured: {result}"
+                    )
+                # Fixed polling interval, so the refresh cycles are comparable
+                hass.config_entries.async_update_entry(
+                    result["result"],
+                    options={
+                        CONF_SCAN_INTERVAL: args.scan_interval,
+                        const.CONF_MIN_SCAN_INTERVAL: args.scan_interval,
+                        const.CONF_MAX_SCAN_INTERVAL: args.scan_interval,
+                    },
+                )
+                await hass.async_block_till_done()
+        finally:
+            await hass.async_stop()
+
+
+async def async_benchmark(
+    args: argparse.Namespace, count: int, config_dir: str
+) -> dict[str, Any]:
+    """Start Home Assistant with the configured inverters and measure them."""
+    platform_durations: dict[str, list[float]] = defaultdict(list)
+    _instrument_platforms(platform_durations)
+    async with _simulated_inverters(args, count):
+        start = time.perf_counter()
+        hass = await _async_start_hass(config_dir)
+        start_time = time.perf_counter() - start
+        try:
+            entries = hass.config_entries.async_entries(DOMAIN)
+            if not_loaded := [
+                e for e in entries if e.state is not ConfigEntryState.LOADED
+            ]:
+                raise RuntimeError(f"Inverters not set up: {not_loaded}")
+            result = {
+                "inverters": count,
+                "start_s": round(start_time, 3),
+                # Config entries are set up in parallel
+                "setup_s": round(async_get_setup_timings(hass)[DOMAIN], 3),
+                "platform_setup_ms": {
+                    name: _ms(percentile(values, 50))
+                    for name, values in sorted(platform_durations.items())
+                },
+            }
+            result.update(await _async_measure_refresh(hass, args, entries))
+            return result
+        finally:
+            await hass.async_stop()
+
+
+async def _async_measure_refresh(
+    hass: HomeAssistant, args: argparse.Namespace, entries: list[ConfigEntry]
+) -> dict[str, Any]:
+    """Measure the refresh cycles of the inverters."""
+    stats = RefreshStats()
+    stats.instrument_fleet(
+        import_module(f"custom_components.{DOMAIN}.fleet").async_get_fleet(hass)
+    )
+    for entry in entries:
+        stats.instrument_coordinator(entry.entry_id, entry.runtime_data.coordinator)
+    timeout = args.cycles * args.scan_interval * 3 + 30
+
+    # Warm up (first refreshes write all the states)
+    await stats.async_wait_cycles(1, timeout)
+
+    # Latency, state writes and loop blocking
+    stats.reset()
+    writes = StateWriteCounter(hass)
+    loop_lag = LoopLagMonitor()
+    writes.start()
+    loop_lag.start()
+    await stats.async_wait_cycles(args.cycles, timeout)
+    loop_lag.stop()
+    writes.stop()
+    latencies = list(stats.latencies)
+    refreshes = sum(stats.refreshes.values())
+    failures = stats.failures
+
+    # Allocations (traced separately, tracing slows everything down)
+    stats.reset()
+    tracemalloc.start()
+    stats.trace_allocations = True
+    snapshot = tracemalloc.take_snapshot()
+    await stats.async_wait_cycles(args.alloc_cycles, timeout)
+    retained = sum(
+        stat.size_diff
+        for stat in tracemalloc.take_snapshot().compare_to(snapshot, "filename")
+    )
+    stats.trace_allocations = False
+    tracemalloc.stop()
+
+    return {
+        "refreshes": refreshes,
+        "failed_refreshes": failures,
+        "refresh_p50_ms": _ms(percentile(latencies, 50)),
+        "refresh_p99_ms": _ms(percentile(latencies, 99)),
+        "refresh_max_ms": _ms(max(latencies, default=None)),
+        "state_writes_per_refresh": round(writes.writes / refreshes, 2)
+        if refreshes
+        else None,
+        "alloc_peak_kib_per_refresh": round(percentile(stats.allocations, 50) / 1024, 1)
+        if stats.allocations
+        else None,
+        "retained_kib": round(retained / 1024, 1),
+        "loop_lag_p99_ms": _ms(percentile(loop_lag.lags, 99)),
+        "loop_lag_max_ms": _ms(max(loop_lag.lags, default=None)),
+        "loop_blocked_ms": _ms(
+            sum(lag for lag in loop_lag.lags if lag >= BLOCKING_LAG)
+        ),
+    }
+
+
+def configure(args: argparse.Namespace, count: int, config_dir: str) -> None:
+    """Configure the integration for the virtual inverters (in new event loop)."""
+    asyncio.run(async_configure(args, count, config_dir))
+
+
+def benchmark(args: argparse.Namespace, count: int, config_dir: str) -> dict[str, Any]:
+    """Run the benchmark of the configured inverters (in new event loop)."""
+    return asyncio.run(async_benchmark(args, count, config_dir))
+
+
+def _in_new_process(function: Callable[..., Any], *args: Any) -> Any:
+    # Home Assistant can be set up only once per process
+    with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(function, *args).result()
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> bool:
+    """Print comparison of the results with the baseline, answer if within tolerance."""
+    passed = True
+    previous = {result["inverters"]: result for result in baseline["results"]}
+    print(f"\nComparison with {baseline['version']} ({baseline['timestamp']}):")
+    for result in results["results"]:
+        if (base := previous.get(result["inverters"])) is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old = base.get(metric)
+            new = result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regression = change > tolerance
+            passed &= not regression
+            print(
+                f"\t{result['inverters']:3} inverters {metric:28} "
+                f"{old:>10} -> {new:>10} ({change:+.0%}){' REGRESSION' if regression else ''}"
+            )
+    return passed
+
+
+def main() -> None:
+    """Run the benchmark from command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--inverters", type=int, nargs="+", default=FLEET_SIZES, help="fleet sizes"
+    )
+    parser.add_argument("--family", choices=("ET", "DT", "ES"), default="ET")
+    parser.add_argument("--capture", help="capture file to replay")
+    parser.add_argument("--protocol", choices=("UDP", "TCP"), default="UDP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="port of 1st inverter")
+    parser.add_argument("--scan-interval", type=int, default=5, help="(s)")
+    parser.add_argument("--cycles", type=int, default=20, help="measured refreshes")
+    parser.add_argument("--alloc-cycles", type=int, default=5)
+    parser.add_argument("--noise", type=float, default=0.05, help="value change (0-1)")
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="response delay (s)"
+    )
+    parser.add_argument("--jitter", type=float, default=0.01, help="latency jitter (s)")
+    parser.add_argument("--loss", type=float, default=0, help="packet loss (0-1)")
+    parser.add_argument("--output", default="benchmark.json", help="results file")
+    parser.add_argument("--baseline", help="results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="of regression")
+    args = parser.parse_args()
+    if args.port is None:
+        # The library talks UDP only to port 8899
+        args.port = 8899 if args.protocol == "UDP" else 18899
+
+    logging.basicConfig(
+        format="%(asctime)-15s %(funcName)s(%(lineno)d) - %(levelname)s: %(message)s",
+        stream=sys.stderr,
+        level=logging.ERROR,
+    )
+
+    manifest = json.loads((COMPONENT / "manifest.json").read_text(encoding="utf-8"))
+    results: dict[str, Any] = {
+        "version": manifest["version"],
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "homeassistant": metadata.version("homeassistant"),
+        "goodwe": metadata.version("goodwe"),
+        "settings": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "baseline", "tolerance")
+        },
+        "results": [],
+    }
+    for count in args.inverters:
+        print(f"Benchmarking {count} inverter(s) ...")
+        with tempfile.TemporaryDirectory() as config_dir:
+            _prepare_config_dir(config_dir)
+            # Setup is measured on (re)start, as the entries are set up usually
+            _in_new_process(configure, args, count, config_dir)
+            result = _in_new_process(benchmark, args, count, config_dir)
+        results["results"].append(result)
+        for metric, value in result.items():
+            print(f"\t{metric:28}: {value}")
+
+    Path(args.output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"\nResults stored in {os.path.abspath(args.output)}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
-"""Simple test script to scan inverter present on local network"""
+"""Simple test script to scan inverters present on local network
+
+Usage: python inverter_scan.py [broadcast address [discovery port]]
+"""
 import asyncio
-import goodwe
+import importlib.util
 import logging
+from pathlib import Path
 import sys
 
 logging.basicConfig(
@@ -10,10 +14,25 @@ logging.basicConfig(
     level=getattr(logging, "ERROR", None),
 )
 
-result = asyncio.run(goodwe.search_inverters()).decode("utf-8").split(",")
-print(f"Located inverter at IP: {result[0]}, mac: {result[1]}, name: {result[2]}")
-
-inverter = asyncio.run(goodwe.discover(result[0], 8899))
-print(
-    f"Identified inverter model: {inverter.model_name}, serialNr: {inverter.serial_number}"
+# Load the discovery module alone (without the Home Assistant integration)
+spec = importlib.util.spec_from_file_location(
+    "goodwe_discovery",
+    Path(__file__).parent / "custom_components" / "goodwe" / "discovery.py",
 )
+discovery = importlib.util.module_from_spec(spec)
+sys.modules[spec.name] = discovery
+spec.loader.exec_module(discovery)
+
+address = sys.argv[1] if len(sys.argv) > 1 else discovery.BROADCAST_ADDRESS
+port = int(sys.argv[2]) if len(sys.argv) > 2 else discovery.DISCOVERY_PORT
+
+inverters = asyncio.run(discovery.async_discover_inverters(address=address, port=port))
+if not inverters:
+    print("No inverter found")
+for found in inverters:
+    print(
+        f"Located inverter at IP: {found.discovered.host}, mac: {found.discovered.mac}, name: {found.discovered.name}"
+    )
+    print(
+        f"Identified inverter model: {found.inverter.model_name}, serialNr: {found.inverter.serial_number}, port: {found.port}"
+    )
@@ -0,0 +1,565 @@
+"""Simulator of Goodwe inverters for testing and benchmarking without real hardware.
+
+Virtual inverters listen on localhost UDP and/or TCP ports and speak the same
+protocols as the real ones - AA55 (ES family) and Modbus RTU over UDP / Modbus TCP
+(ET and DT families). Their data are either synthetic (just the device info) or
+replayed from capture file recorded from real inverter:
+
+    python inverter_simulator.py capture 192.168.2.14 --family ET --output et.json
+    python inverter_simulator.py serve --capture et.json --count 10 --port 18899
+
+Capture file is JSON with "family", "comm_addr", "registers" (Modbus families,
+start register to hex encoded data) and "responses" (AA55 family, request
+payload to hex encoded response payload).
+
+Network faults can be injected - response latency (with jitter), packet loss
+and sleep periods (inverter not responding at all, like at night).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime
+from ipaddress import ip_address
+from typing import Any
+
+import goodwe
+from goodwe import Sensor
+from goodwe.dt import DT
+from goodwe.es import ES
+from goodwe.et import ET
+from goodwe.protocol import (
+    Aa55ReadCommand,
+    ModbusRtuReadCommand,
+    ModbusTcpReadCommand,
+    ProtocolCommand,
+)
+from goodwe.sensor import Timestamp, encode_datetime
+
+_LOGGER = logging.getLogger(__name__)
+
+MODBUS_READ_CMD = 0x03
+MODBUS_WRITE_CMD = 0x06
+MODBUS_WRITE_MULTI_CMD = 0x10
+ILLEGAL_DATA_ADDRESS = 0x02
+
+DISCOVERY_PORT = 48899
+DISCOVERY_REQUEST = b"WIFIKIT-214028-READ"
+
+# Default communication address of the families
+_COMM_ADDR = {"ET": 0xF7, "DT": 0x7F, "ES": 0xF7}
+# First register of device info of the modbus families
+_DEVICE_INFO = {"ET": 0x88B8, "DT": 0x7531}
+
+
+def _crc16(data: bytes) -> int:
+    """Calculate modbus CRC-16 checksum."""
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+
+def _aa55_checksum(data: bytes) -> bytes:
+    return (sum(data) & 0xFFFF).to_bytes(2, "big")
+
+
+def _text(value: str, size: int) -> bytes:
+    return value.encode("ascii").ljust(size)[:size]
+
+
+def _timestamps(sensors: Iterable[Sensor], scale: int) -> dict[int, bytes]:
+    """Answer current time encoded at (byte) offsets of the timestamp sensors."""
+    now = encode_datetime(datetime.now())
+    return {s.offset * scale: now for s in sensors if isinstance(s, Timestamp)}
+
+
+@dataclass
+class Faults:
+    """Network faults injected into the inverter communication."""
+
+    latency: float = 0
+    jitter: float = 0
+    loss: float = 0
+    awake: float = 0
+    asleep: float = 0
+
+    def is_asleep(self) -> bool:
+        """Answer if the inverter is in (periodic) sleep period right now."""
+        if not self.asleep:
+            return False
+        return time.monotonic() % (self.awake + self.asleep) >= self.awake
+
+    def is_lost(self) -> bool:
+        """Answer if the request (or its response) is lost."""
+        return random.random() < self.loss
+
+    def delay(self) -> float:
+        """Answer the response delay."""
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+
+class VirtualInverter:
+    """Data (registers or AA55 responses) and protocol logic of single virtual inverter."""
+
+    def __init__(
+        self,
+        family: str,
+        comm_addr: int,
+        registers: dict[int, int] | None = None,
+        responses: dict[str, bytes] | None = None,
+        strict: bool = False,
+        noise: float = 0,
+    ) -> None:
+        """Initialize the inverter."""
+        self.family = family
+        self.comm_addr = comm_addr
+        self.registers: dict[int, int] = registers or {}
+        self.responses: dict[str, bytes] = responses or {}
+        self.strict = strict
+        self.noise = noise
+        self.requests = 0
+        # Registers which are not subject of the noise
+        self._fixed = set(self.registers) if noise else set()
+
+    @classmethod
+    def synthetic(
+        cls, family: str, index: int = 0, strict: bool = False, noise: float = 0
+    ) -> VirtualInverter:
+        """Create inverter with synthetic device info (and mostly zero values)."""
+        serial = f"10000{family}U{index:08d}"
+        # AA55 device info, the common discovery command of all families
+        discovery = bytearray(86)
+        discovery[0:5] = _text("02041", 5)
+        discovery[5:15] = _text(f"GW10K-{family}", 10)
+        discovery[31:47] = _text(serial, 16)
+        discovery[51:63] = _text("02041-21-S00", 12)
+        responses = {"010200": bytes(discovery)}
+        registers: dict[int, int] = {}
+        if family == "ET":
+            info = bytearray(66)
+            info[0:6] = bytes.fromhex("0001 2710 0001")
+            info[6:22] = _text(serial, 16)
+            info[22:32] = _text(f"GW10K-{family}", 10)
+            info[32:42] = bytes.fromhex("0014 0014 0000 0015 0000")
+            info[42:54] = _text("04029-20-S11", 12)
+            info[54:66] = _text("02041-21-S00", 12)
+            registers = _words(_DEVICE_INFO[family], info)
+            for offset, value in _timestamps(ET("localhost", 0).sensors(), 2).items():
+                _patch_words(registers, offset // 2, value)
+            # EMS mode auto (zero is not valid mode)
+            registers[47511] = 1
+        elif family == "DT":
+            info = bytearray(80)
+            info[6:22] = _text(serial, 16)
+            info[22:32] = _text(f"GW10K-{family}", 10)
+            info[66:76] = bytes.fromhex("0014 0014 0010 0000 0000")
+            registers = _words(_DEVICE_INFO[family], info)
+            for offset, value in _timestamps(DT("localhost", 0).sensors(), 2).items():
+                _patch_words(registers, offset // 2, value)
+        elif family == "ES":
+            inverter = ES("localhost", 0)
+            runtime = bytearray(max(s.offset + s.size_ for s in inverter.sensors()))
+            for offset, value in _timestamps(inverter.sensors(), 1).items():
+                runtime[offset : offset + len(value)] = value
+            # Eco modes and other settings above are addressed as modbus registers
+            settings = max(
+                s.offset + s.size_ for s in inverter.settings() if s.offset < 0x700
+            )
+            responses["010600"] = bytes(runtime)
+            responses["010900"] = bytes(settings)
+        else:
+            raise ValueError(f"Unknown inverter family {family}")
+        return cls(family, _COMM_ADDR[family], registers, responses, strict, noise)
+
+    @classmethod
+    def from_capture(
+        cls, capture: dict[str, Any], strict: bool = False, noise: float = 0
+    ) -> VirtualInverter:
+        """Create inverter replaying the captured data."""
+        registers: dict[int, int] = {}
+        for start, data in capture.get("registers", {}).items():
+            registers.update(_words(int(start), bytes.fromhex(data)))
+        responses = {
+            request: bytes.fromhex(data)
+            for request, data in capture.get("responses", {}).items()
+        }
+        return cls(
+            capture["family"], capture["comm_addr"], registers, responses, strict, noise
+        )
+
+    def patch_serial_number(self, index: int) -> None:
+        """Replace the last digits of serial number to tell the inverters apart."""
+        suffix = f"{index:04d}".encode("ascii")
+        if (info_offset := _DEVICE_INFO.get(self.family)) is not None:
+            # Serial number occupies registers 3-10 of the device info
+            _patch_words(self.registers, info_offset + 9, suffix)
+        if (info := self.responses.get("010200")) is not None:
+            self.responses["010200"] = info[:43] + suffix + info[47:]
+
+    def read_registers(self, offset: int, count: int) -> bytes | None:
+        """Answer the register values, None when unknown (in strict mode)."""
+        addresses = range(offset, offset + count)
+        if self.strict and any(a not in self.registers for a in addresses):
+            return None
+        if offset in _DEVICE_INFO.values() and offset not in self.registers:
+            # Device info of other family, do not let the inverter be mistaken for it
+            return None
+        if self.noise:
+            for address in addresses:
+                if address not in self._fixed and random.random() < self.noise:
+                    # Keep the values positive and floats finite
+                    value = self.registers.get(address, 0) + random.choice((1, -1))
+                    self.registers[address] = min(max(value, 0), 0x7F00)
+        return b"".join(self.registers.get(a, 0).to_bytes(2, "big") for a in addresses)
+
+    def handle_modbus_rtu(self, request: bytes) -> bytes | None:
+        """Answer response to the Modbus RTU (UDP) request."""
+        if len(request) < 8 or request[0] not in (self.comm_addr, 0):
+            return None
+        if _crc16(request[:-2]) != int.from_bytes(request[-2:], "little"):
+            return None
+        payload = self._handle_modbus_pdu(request[1:-2])
+        if payload is None:
+            return None
+        body = bytes([self.comm_addr]) + payload
+        return b"\xaa\x55" + body + _crc16(body).to_bytes(2, "little")
+
+    def handle_modbus_tcp(self, request: bytes) -> bytes | None:
+        """Answer response to the Modbus TCP request."""
+        if len(request) < 12:
+            return None
+        payload = self._handle_modbus_pdu(request[7:])
+        if payload is None:
+            return None
+        body = request[6:7] + payload
+        return request[0:4] + len(body).to_bytes(2, "big") + body
+
+    def _handle_modbus_pdu(self, pdu: bytes) -> bytes | None:
+        cmd = pdu[0]
+        offset = int.from_bytes(pdu[1:3], "big")
+        value = int.from_bytes(pdu[3:5], "big")
+        self.requests += 1
+        if cmd == MODBUS_READ_CMD:
+            data = self.read_registers(offset, value)
+            if data is None:
+                return bytes([cmd | 0x80, ILLEGAL_DATA_ADDRESS])
+            return bytes([cmd, len(data)]) + data
+        if cmd == MODBUS_WRITE_CMD:
+            self.registers[offset] = value
+            return pdu[0:5]
+        if cmd == MODBUS_WRITE_MULTI_CMD:
+            _patch_words(self.registers, offset, pdu[6 : 6 + pdu[5]])
+            return pdu[0:5]
+        return bytes([cmd | 0x80, 0x01])
+
+    def handle_aa55(self, request: bytes) -> bytes | None:
+        """Answer response to the AA55 request."""
+        if len(request) < 9 or request[0:2] != b"\xaa\x55":
+            return None
+        payload = request[4:-2].hex().upper()
+        self.requests += 1
+        if payload.startswith("011A03"):
+            # Modbus register(s) read over AA55
+            data = self.read_registers(int(payload[6:10], 16), int(payload[10:12], 16))
+        else:
+            # Replayed response or (presumably write) acknowledgement
+            data = self.responses.get(payload[0:6].lower(), b"")
+        if data is None:
+            return None
+        body = (
+            b"\xaa\x55\x7f\xc0"
+            + bytes([request[4], request[5] | 0x80, len(data)])
+            + data
+        )
+        return body + _aa55_checksum(body)
+
+    def handle(self, request: bytes, tcp: bool) -> bytes | None:
+        """Answer response to the request (None when it should be ignored)."""
+        if request.startswith(b"\xaa\x55"):
+            return self.handle_aa55(request)
+        if self.family == "ES":
+            return None
+        if tcp:
+            return self.handle_modbus_tcp(request)
+        return self.handle_modbus_rtu(request)
+
+
+def _words(offset: int, data: bytes) -> dict[int, int]:
+    return {
+        offset + i // 2: int.from_bytes(data[i : i + 2].ljust(2, b"\x00"), "big")
+        for i in range(0, len(data), 2)
+    }
+
+
+def _patch_words(registers: dict[int, int], offset: int, data: bytes) -> None:
+    registers.update(_words(offset, data))
+
+
+class _SimulatorProtocol(asyncio.DatagramProtocol, asyncio.Protocol):
+    """UDP/TCP server protocol of the virtual inverter."""
+
+    def __init__(self, inverter: VirtualInverter, faults: Faults, tcp: bool) -> None:
+        self._inverter = inverter
+        self._faults = faults
+        self._tcp = tcp
+        self._transport: asyncio.BaseTransport | None = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self._transport = transport
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        self._respond(data, addr)
+
+    def data_received(self, data: bytes) -> None:
+        self._respond(data, None)
+
+    def _respond(self, data: bytes, addr: tuple[str, int] | None) -> None:
+        if self._faults.is_asleep() or self._faults.is_lost():
+            _LOGGER.debug("Ignoring request %s", data.hex())
+            return
+        response = self._inverter.handle(data, self._tcp)
+        if response is None:
+            return
+        asyncio.get_running_loop().call_later(
+            self._faults.delay(), self._send, response, addr
+        )
+
+    def _send(self, response: bytes, addr: tuple[str, int] | None) -> None:
+        if self._transport is None or self._transport.is_closing():
+            return
+        if addr is None:
+            self._transport.write(response)
+        else:
+            self._transport.sendto(response, addr)
+
+
+class _DiscoveryProtocol(asyncio.DatagramProtocol):
+    """Answers the (broadcast) discovery requests for all the virtual inverters."""
+
+    def __init__(self, hosts: list[str]) -> None:
+        self._hosts = hosts
+        self._transport: asyncio.DatagramTransport | None = None
+
+    def connection_made(self, transport: asyncio.DatagramTransport) -> None:
+        self._transport = transport
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        if data != DISCOVERY_REQUEST or self._transport is None:
+            return
+        for index, host in enumerate(self._hosts):
+            self._transport.sendto(
+                f"{host},0000000000{index:02X},Solar-WiFi{index:04d}".encode(), addr
+            )
+
+
+def inverter_address(
+    host: str, port: int, index: int, spread: bool = False
+) -> tuple[str, int]:
+    """Answer the (host, port) of the index-th virtual inverter.
+
+    Inverters listen on consecutive ports, or on consecutive (loopback) addresses
+    and the same port when spread. The goodwe library talks UDP only to port 8899,
+    so multiple inverters reachable over UDP have to be spread.
+    """
+    if spread:
+        return str(ip_address(host) + index), port
+    return host, port + index
+
+
+async def async_start_inverters(
+    inverters: list[VirtualInverter],
+    faults: Faults,
+    host: str = "127.0.0.1",
+    port: int = 18899,
+    udp: bool = True,
+    tcp: bool = True,
+    spread: bool = False,
+    discovery_port: int | None = None,
+) -> list[asyncio.BaseTransport | asyncio.AbstractServer]:
+    """Start the virtual inverters, answer their transports/servers."""
+    loop = asyncio.get_running_loop()
+    servers: list[asyncio.BaseTransport | asyncio.AbstractServer] = []
+    hosts: list[str] = []
+    for index, inverter in enumerate(inverters):
+        inverter_host, inverter_port = inverter_address(host, port, index, spread)
+        hosts.append(inverter_host)
+        if udp:
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda inv=inverter: _SimulatorProtocol(inv, faults, False),
+                local_addr=(inverter_host, inverter_port),
+            )
+            servers.append(transport)
+        if tcp:
+            servers.append(
+                await loop.create_server(
+                    lambda inv=inverter: _SimulatorProtocol(inv, faults, True),
+                    inverter_host,
+                    inverter_port,
+                )
+            )
+    if discovery_port:
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DiscoveryProtocol(hosts), local_addr=(host, discovery_port)
+        )
+        servers.append(transport)
+    return servers
+
+
+def stop_inverters(
+    servers: list[asyncio.BaseTransport | asyncio.AbstractServer],
+) -> None:
+    """Stop the virtual inverters."""
+    for server in servers:
+        server.close()
+
+
+def create_inverters(
+    count: int,
+    family: str = "ET",
+    capture: dict[str, Any] | None = None,
+    strict: bool = False,
+    noise: float = 0,
+) -> list[VirtualInverter]:
+    """Create the virtual inverters (synthetic or replaying the capture)."""
+    if capture:
+        inverters = [
+            VirtualInverter.from_capture(capture, strict, noise) for _ in range(count)
+        ]
+        if count > 1:
+            for index, inverter in enumerate(inverters):
+                inverter.patch_serial_number(index)
+        return inverters
+    return [
+        VirtualInverter.synthetic(family, index, strict, noise)
+        for index in range(count)
+    ]
+
+
+async def async_capture(host: str, port: int, family: str | None) -> dict[str, Any]:
+    """Record the responses of real inverter, answer the capture (file content)."""
+    inverter = await goodwe.connect(host=host, port=port, family=family, retries=3)
+    registers: dict[str, str] = {}
+    responses: dict[str, str] = {}
+    read_from_socket = inverter._read_from_socket  # pylint: disable=protected-access
+
+    async def _recording_read(command: ProtocolCommand):
+        response = await read_from_socket(command)
+        if isinstance(
+            command, (Aa55ReadCommand, ModbusRtuReadCommand, ModbusTcpReadCommand)
+        ):
+            registers[str(command.first_address)] = response.response_data().hex()
+        elif not isinstance(inverter, (ET, DT)):
+            responses[command.request[4:7].hex()] = response.response_data().hex()
+        return response
+
+    inverter._read_from_socket = _recording_read  # pylint: disable=protected-access
+    await inverter.read_device_info()
+    await inverter.read_runtime_data()
+    for setting in inverter.settings():
+        try:
+            await inverter.read_setting(setting.id_)
+        except (goodwe.InverterError, ValueError):
+            _LOGGER.debug("Setting %s not captured", setting.id_)
+    print(f"Captured {inverter.model_name} ({inverter.serial_number})")
+    return {
+        "family": type(inverter).__name__,
+        "comm_addr": inverter._protocol._comm_addr,  # pylint: disable=protected-access
+        "registers": registers,
+        "responses": responses,
+    }
+
+
+async def async_serve(args: argparse.Namespace, capture: dict[str, Any] | None) -> None:
+    """Run the virtual inverters until interrupted."""
+    inverters = create_inverters(
+        args.count, args.family, capture, args.strict, args.noise
+    )
+    servers = await async_start_inverters(
+        inverters,
+        Faults(args.latency, args.jitter, args.loss, args.awake, args.asleep),
+        args.host,
+        args.port,
+        args.protocol in ("udp", "both"),
+        args.protocol in ("tcp", "both"),
+        args.spread,
+        args.discovery_port,
+    )
+    last_host, last_port = inverter_address(
+        args.host, args.port, args.count - 1, args.spread
+    )
+    print(
+        f"Started {args.count} {inverters[0].family} inverter(s) "
+        f"on {args.host}:{args.port} - {last_host}:{last_port}"
+    )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        stop_inverters(servers)
+
+
+def main() -> None:
+    """Run the simulator from command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run virtual inverters")
+    serve.add_argument("--family", choices=("ET", "DT", "ES"), default="ET")
+    serve.add_argument("--capture", help="capture file to replay")
+    serve.add_argument("--count", type=int, default=1, help="number of inverters")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=18899, help="port of 1st inverter")
+    serve.add_argument(
+        "--spread", action="store_true", help="use consecutive hosts, not ports"
+    )
+    serve.add_argument("--protocol", choices=("udp", "tcp", "both"), default="both")
+    serve.add_argument("--discovery-port", type=int, help="answer discovery requests")
+    serve.add_argument("--latency", type=float, default=0, help="response delay (s)")
+    serve.add_argument("--jitter", type=float, default=0, help="latency jitter (s)")
+    serve.add_argument("--loss", type=float, default=0, help="packet loss (0-1)")
+    serve.add_argument("--awake", type=float, default=0, help="awake period (s)")
+    serve.add_argument("--asleep", type=float, default=0, help="sleep period (s)")
+    serve.add_argument("--noise", type=float, default=0, help="value change (0-1)")
+    serve.add_argument(
+        "--strict", action="store_true", help="reject reads of unknown registers"
+    )
+
+    capture = commands.add_parser("capture", help="record real inverter responses")
+    capture.add_argument("host")
+    capture.add_argument("--port", type=int, default=8899)
+    capture.add_argument("--family", choices=("ET", "DT", "ES"))
+    capture.add_argument("--output", default="capture.json")
+
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(
+        format="%(asctime)-15s %(funcName)s(%(lineno)d) - %(levelname)s: %(message)s",
+        stream=sys.stderr,
+        level=logging.DEBUG if args.debug else logging.ERROR,
+    )
+    try:
+        if args.command == "capture":
+            capture = asyncio.run(async_capture(args.host, args.port, args.family))
+            with open(args.output, "w", encoding="utf-8") as file:
+                json.dump(capture, file, indent=2)
+        elif args.capture:
+            with open(args.capture, encoding="utf-8") as file:
+                asyncio.run(async_serve(args, json.load(file)))
+        else:
+            asyncio.run(async_serve(args, None))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()